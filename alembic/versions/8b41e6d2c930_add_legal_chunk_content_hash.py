@@ -0,0 +1,27 @@
+"""Add legal_chunks.content_hash
+
+Revision ID: 8b41e6d2c930
+Revises: 3f2a9c1d7e45
+Create Date: 2026-10-18 11:02:17.552031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41e6d2c930'
+down_revision: Union[str, None] = '3f2a9c1d7e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows stay NULL and are re-embedded once on the next ingest
+    op.add_column('legal_chunks', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('legal_chunks', 'content_hash')
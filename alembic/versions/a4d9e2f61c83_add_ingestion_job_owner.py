@@ -0,0 +1,27 @@
+"""Add ingestion_jobs.owner
+
+Revision ID: a4d9e2f61c83
+Revises: e7a3c2b91f04
+Create Date: 2026-10-18 18:20:41.118304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9e2f61c83'
+down_revision: Union[str, None] = 'e7a3c2b91f04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Running jobs from before owners were recorded have NULL and are treated as abandoned
+    op.add_column('ingestion_jobs', sa.Column('owner', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ingestion_jobs', 'owner')
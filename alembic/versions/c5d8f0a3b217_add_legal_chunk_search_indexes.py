@@ -0,0 +1,37 @@
+"""Add full-text and trigram indexes on legal_chunks.content
+
+Revision ID: c5d8f0a3b217
+Revises: 8b41e6d2c930
+Create Date: 2026-10-18 11:40:03.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d8f0a3b217'
+down_revision: Union[str, None] = '8b41e6d2c930'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Expression must match LegalRAG._keyword_search_postgres exactly for the planner to use it
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_legal_chunks_content_fts ON legal_chunks "
+        "USING GIN (to_tsvector('simple'::regconfig, COALESCE(content, '')))"
+    )
+    # Serves the phrase ILIKE '%...%' match and word_similarity ranking
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_legal_chunks_content_trgm ON legal_chunks "
+        "USING GIN (content gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_legal_chunks_content_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_legal_chunks_content_fts")
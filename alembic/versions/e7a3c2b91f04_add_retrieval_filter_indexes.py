@@ -0,0 +1,35 @@
+"""Add legal_documents.document_date and indexes for filtered retrieval
+
+Revision ID: e7a3c2b91f04
+Revises: c5d8f0a3b217
+Create Date: 2026-10-18 16:21:45.310872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c2b91f04'
+down_revision: Union[str, None] = 'c5d8f0a3b217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing documents stay NULL (excluded by date filters) until re-ingested with metadata.document_date
+    op.add_column('legal_documents', sa.Column('document_date', sa.Date(), nullable=True))
+    op.create_index(op.f('ix_legal_documents_document_date'), 'legal_documents', ['document_date'], unique=False)
+    # Serves document_id IN (...) for source/date-scoped keyword search
+    op.create_index(op.f('ix_legal_chunks_document_id'), 'legal_chunks', ['document_id'], unique=False)
+    # Serves hierarchy @> ARRAY[...] for section-scoped keyword search
+    op.execute("CREATE INDEX IF NOT EXISTS ix_legal_chunks_hierarchy_gin ON legal_chunks USING GIN (hierarchy)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_legal_chunks_hierarchy_gin")
+    op.drop_index(op.f('ix_legal_chunks_document_id'), table_name='legal_chunks')
+    op.drop_index(op.f('ix_legal_documents_document_date'), table_name='legal_documents')
+    op.drop_column('legal_documents', 'document_date')
@@ -1,12 +1,13 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from src.data.db import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.data.db import SessionLocal, AsyncSessionLocal
 from src.core.config import settings
 from src.data.schemas import TokenData
-from src.data.crud.user import get_user_by_email
+from src.data.crud.user import get_user_by_email_async
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
@@ -17,7 +18,15 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_async_sessionmaker():
+    """For writes that outlive the request's own session (e.g. after a streamed response)."""
+    return AsyncSessionLocal
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -32,7 +41,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
         
-    user = get_user_by_email(db, email=token_data.email)
+    # Awaited, so auth never waits on a threadpool that slow requests may have filled
+    user = await get_user_by_email_async(db, email=token_data.email)
     if user is None:
         raise credentials_exception
+    # End the read transaction so the connection goes back to the pool during generation
+    await db.commit()
     return user
@@ -1,35 +1,116 @@
-from fastapi import APIRouter, Depends, UploadFile, File, BackgroundTasks
+import asyncio
+import queue
+from fastapi import APIRouter, Depends, UploadFile, File, BackgroundTasks, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from src.api.dependencies import get_db, get_current_user
-from src.data.schemas import User
+from src.core.config import settings
+from src.data.schemas import User, IngestionJob
+from src.data.crud.ingestion_job import get_ingestion_job, create_ingestion_job
 from src.services.ingestion_service import IngestionService
-import shutil
-import os
 
 router = APIRouter()
 
-@router.post("/ingest")
-async def ingest_file(
+def _job_response(job) -> IngestionJob:
+    return IngestionJob.model_validate(job).model_copy(update=IngestionService.job_progress(job))
+
+@router.post("/ingest", response_model=IngestionJob)
+def ingest_file(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Save file temporarily
-    temp_file = f"temp_{file.filename}"
-    with open(temp_file, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # Run ingestion in background
-    def ingest_task(path):
-        try:
-             # Need new session for background task usually, but passed ssn might work if not closed.
-             # Better to create new session or block. For scaffolding, blocking is safer or use context manager inside.
-             IngestionService.process_and_ingest(db, path)
-        finally:
-             if os.path.exists(path):
-                 os.remove(path)
+    # Persist the upload with a job record so the run can resume after a crash
+    job = IngestionService.create_job(db, file.file, filename=file.filename, user_id=current_user.id)
+    
+    # Run ingestion in background (the job opens its own DB sessions)
+    background_tasks.add_task(IngestionService.run_job, job.id)
+    
+    return _job_response(job)
+
+@router.post("/ingest/stream", response_model=IngestionJob)
+async def ingest_stream(
+    request: Request,
+    filename: str = "stream.jsonl",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Ingests a raw JSONL request body (e.g. `curl --data-binary @corpus.jsonl`) as it arrives.
+    Nothing is written to local disk, so the job cannot be resumed. Responds once the whole body
+    has been handed to the pipeline; poll /ingest/{job_id} for the rest of the run.
+    """
+    # Sync session: every DB call goes through the threadpool, never on the event loop
+    total_bytes = int(request.headers.get("content-length") or 0)
+    job = await run_in_threadpool(
+        create_ingestion_job, db, filename=filename, file_path=None, total_bytes=total_bytes, user_id=current_user.id
+    )
+    
+    # Bounded hand-off: reading the body pauses whenever the pipeline falls behind
+    body = queue.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+    
+    def byte_chunks():
+        while True:
+            chunk = body.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk # Truncated body: fail the job instead of pruning chunks we never saw
+            yield chunk
+    
+    ingestion = asyncio.get_running_loop().run_in_executor(None, IngestionService.run_job, job.id, byte_chunks())
+    
+    def feed(chunk) -> bool:
+        while not ingestion.done():
+            try:
+                body.put(chunk, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False # Pipeline stopped (e.g. failed); stop reading the body
+    
+    end = None
+    try:
+        async for chunk in request.stream():
+            if chunk and not await run_in_threadpool(feed, chunk):
+                break
+    except Exception as e:
+        end = ConnectionError(f"Upload aborted: {e}")
+        raise
+    finally:
+        # The body can only be read while the request is open; embedding, writes and
+        # index rebuilds carry on in the background after responding
+        await run_in_threadpool(feed, end)
+    
+    await run_in_threadpool(db.refresh, job)
+    return _job_response(job)
+
+@router.get("/ingest/{job_id}", response_model=IngestionJob)
+def ingest_status(job_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    job = get_ingestion_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return _job_response(job)
 
-    background_tasks.add_task(ingest_task, temp_file)
+@router.post("/ingest/{job_id}/resume", response_model=IngestionJob)
+def resume_ingest(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    job = get_ingestion_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    if job.status == "completed":
+        raise HTTPException(status_code=409, detail="Ingestion job already completed")
+    if not job.file_path:
+        raise HTTPException(status_code=409, detail="Streamed ingestion jobs cannot be resumed; upload the file again")
     
-    return {"status": "Ingestion started", "filename": file.filename}
+    # Claim atomically here, so a job still owned by a live worker is refused instead of silently skipped
+    job = IngestionService.claim_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=409, detail="Ingestion job is already running")
+    background_tasks.add_task(IngestionService.run_job, job.id, claimed=True)
+    return _job_response(job)
@@ -1,27 +1,71 @@
+import asyncio
+import json
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from src.api.dependencies import get_db, get_current_user
-from src.data.schemas import QueryRequest, User, ChatSessionCreate
-from src.services.rag_service import ask_question
-from src.data.crud.chat import add_message, create_chat_session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.api.dependencies import get_async_db, get_async_sessionmaker, get_current_user
+from src.data.schemas import QueryRequest, User
+from src.services.rag_service import ask_question, stream_question
+from src.data.crud.chat import add_chat_turn_async
 
 router = APIRouter()
 
+# Chat routes are async end to end: SQL through the async engine, retrieval on its own pool and
+# generation on the LLM scheduler's workers, so slow answers never fill Starlette's threadpool.
+# No transaction (or pooled connection) is held while the answer is generated.
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @router.post("/query")
-def chat_endpoint(request: QueryRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # 1. Create Session if not exists (simplified logic)
-    session_id = request.session_id
-    if not session_id:
-        chat_session = create_chat_session(db, user_id=current_user.id, session_in=ChatSessionCreate(title="New Query"))
-        session_id = chat_session.id
-    
-    # 2. Save User Message
-    add_message(db, session_id=session_id, role="user", content=request.query)
-    
-    # 3. Get Answer
-    answer = ask_question(db, request.query)
-    
-    # 4. Save AI Response
-    add_message(db, session_id=session_id, role="assistant", content=answer)
-    
+async def chat_endpoint(request: QueryRequest, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    # 1. Get Answer
+    answer = await ask_question(request.query, request.retrieval)
+
+    # 2. Create Session if not exists and save both messages, in one transaction
+    session_id = await add_chat_turn_async(
+        db, current_user.id, request.session_id, [("user", request.query), ("assistant", answer)]
+    )
+
     return {"response": answer, "session_id": session_id}
+
+async def _save_turn(session_factory, user_id: int, session_id, messages) -> int:
+    # The generator below outlives the request, and with it the request's session
+    async with session_factory() as db:
+        return await add_chat_turn_async(db, user_id, session_id, messages)
+
+@router.post("/query/stream")
+async def chat_stream_endpoint(request: QueryRequest, current_user: User = Depends(get_current_user), session_factory=Depends(get_async_sessionmaker)):
+    """
+    Server-Sent Events variant of /query. Emits one `token` event per generated piece, then
+    `done` with the session id (or `error`). As in /query, the question and the answer are saved
+    together in one transaction, and only once generation completes: a stream that fails or is
+    abandoned by the client saves nothing.
+    """
+    # 1. Retrieve now, so retrieval and admission errors (429/503) surface as a normal HTTP error
+    pieces = await stream_question(request.query, request.retrieval)
+
+    async def events():
+        answer = []
+        try:
+            async for piece in pieces:
+                answer.append(piece)
+                yield _sse("token", {"token": piece})
+            # 2. Create Session if not exists and save both messages, in one transaction
+            # (shielded: a disconnect cancels this generator, but not a commit under way)
+            session_id = await asyncio.shield(_save_turn(
+                session_factory, current_user.id, request.session_id,
+                [("user", request.query), ("assistant", "".join(answer))],
+            ))
+            yield _sse("done", {"session_id": session_id})
+        except Exception as e:
+            print(f"LLM Streaming Error: {e}")
+            yield _sse("error", {"detail": "Answer generation failed"})
+        finally:
+            await pieces.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # Don't let proxies buffer tokens
+    )
@@ -1,8 +1,30 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from src.core.config import settings
+from src.ml.loader import ModelLoader, model_status
 
 router = APIRouter()
 
+# Async (no threadpool), so probes are answered even while slow requests occupy worker threads
+
 @router.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok", "app": settings.PROJECT_NAME}
+
+@router.get("/health/live")
+async def liveness():
+    """The process is up and serving; says nothing about models."""
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    200 once the models needed for chat are loaded, else 503 with status "loading", or "failed"
+    and the errors if one of them could not be loaded. Reports each model's state and load time.
+    """
+    ready = ModelLoader.is_ready()
+    failed = ModelLoader.failed_models()
+    content = {"status": "ready" if ready else "failed" if failed else "loading", "models": model_status}
+    if failed:
+        content["errors"] = failed
+    return JSONResponse(status_code=200 if ready else 503, content=content)
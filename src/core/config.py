@@ -7,8 +7,29 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     
     DATABASE_URL: str
+    # Connection pool (per engine; the app runs a sync and an async engine)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10 # Extra connections allowed under bursts, closed when returned
+    DB_POOL_TIMEOUT: float = 10.0 # Seconds to wait for a free connection before erroring
+    DB_POOL_RECYCLE: int = 1800 # Reconnect connections older than this (seconds)
+    DB_POOL_PRE_PING: bool = True
+    DB_CONNECT_TIMEOUT: int = 10
+    DB_STATEMENT_TIMEOUT_MS: int = 60000 # Server-side statement_timeout; 0 disables
+    DB_TRANSACTION_POOLER: Optional[bool] = None # Behind a transaction-mode pooler (no prepared statements); None: guess from port 6543
     QDRANT_URL: str
     QDRANT_API_KEY: Optional[str] = None
+    QDRANT_COLLECTION: str = "bangla_legal"
+    QDRANT_VECTOR_SIZE: int = 384 # Embedding model output dimension
+
+    # Qdrant collection tuning (applied to existing collections by src/scripts/migrate_qdrant.py)
+    QDRANT_HNSW_M: int = 16 # Graph degree; higher improves recall at the cost of index memory
+    QDRANT_HNSW_EF_CONSTRUCT: int = 128
+    QDRANT_HNSW_EF: int = 64 # Per-query candidate list size
+    QDRANT_QUANTIZATION: bool = True # int8 scalar quantization (vectors 4x smaller in RAM)
+    QDRANT_QUANTIZATION_QUANTILE: float = 0.99
+    QDRANT_RESCORE: bool = True # Re-rank quantized candidates with the original vectors
+    QDRANT_OVERSAMPLING: float = 2.0 # Quantized candidates fetched per requested result
+    QDRANT_ON_DISK: bool = True # Keep original float32 vectors on disk (mmap)
     
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -20,11 +41,71 @@ class Settings(BaseSettings):
     
     # Local LLM Path
     LLM_MODEL_FILE: str = "models/Qwen2.5-1.5B-Instruct-GGUF.gguf"
+    LLM_CONTEXT_WINDOW: int = 4096 # n_ctx of the local model
+    LLM_MAX_TOKENS: int = 512 # Reserved for the answer
+    LLM_WORKERS: int = 1 # Model instances, each served by one worker thread (memory scales with this)
+    LLM_QUEUE_SIZE: int = 16 # Waiting requests beyond this are rejected with 429
+    LLM_TIMEOUT_SECONDS: float = 120.0 # Deadline for an answer (time to first token when streaming)
     
     # OpenAI Settings
     LLM_MODEL_NAME: str = "gpt-4o"
     
     EMBEDDING_MODEL_PATH: str = "models/Finetuned Embedding Model.pkl"
+    EMBEDDING_CACHE_SIZE: int = 4096 # Memoized query embeddings (~1.5 KB each); 0 disables
+    EMBEDDING_BACKEND: str = "torch" # "torch" (fp32), "int8" (dynamic quantization) or "onnx"
+    EMBEDDING_ONNX_PATH: str = "models/embedding_onnx" # Written by src/scripts/embedding_backend.py export-onnx
+    EMBEDDING_THREADS: int = 0 # CPU threads for embedding inference; 0 keeps the library default
+
+    # Sparse Retrieval
+    SPARSE_BACKEND: str = "postgres" # "postgres" (full-text indexes) or "bm25" (in-process index)
+    BM25_INDEX_PATH: str = "models/bm25_index"
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    
+    # Hybrid Retrieval
+    RETRIEVAL_WORKERS: int = 8 # Threads shared by concurrent dense/sparse retrieval
+    DENSE_TIMEOUT_SECONDS: float = 2.0
+    SPARSE_TIMEOUT_SECONDS: float = 2.0
+    
+    # Fusion (each can be overridden per request via QueryRequest.retrieval)
+    FUSION_METHOD: str = "rrf" # "rrf" or "weighted" (min-max normalized scores)
+    RRF_K: int = 60
+    DENSE_WEIGHT: float = 1.0
+    SPARSE_WEIGHT: float = 1.0
+    DENSE_DEPTH: int = 10 # Candidates fetched per retriever
+    SPARSE_DEPTH: int = 10
+    FUSION_TOP_K: int = 5 # Fused results passed on to graph expansion
+
+    # Graph expansion
+    GRAPH_INDEX_PATH: str = "models/legal_graph"
+    GRAPH_EXPANSION_LIMIT: int = 5 # Related chunks added to the context
+    GRAPH_MAX_HOPS: int = 1
+    GRAPH_MAX_SECTION_SIZE: int = 1000 # Sections with more chunks than this are too broad to expand through
+
+    # Retrieval result cache (cleared whenever ingestion changes the corpus)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_MB: int = 64
+    CORPUS_VERSION_CHECK_SECONDS: float = 5 # How often each worker checks for ingestions run elsewhere
+
+    # Semantic answer cache (hits skip retrieval and the LLM)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 1024
+    ANSWER_CACHE_THRESHOLD: float = 0.97 # Min cosine similarity between query embeddings
+    ANSWER_CACHE_TTL_SECONDS: int = 86400
+
+    # Context packing (prompt eval dominates local inference cost)
+    CONTEXT_TOKEN_BUDGET: int = 3000 # Upper bound on retrieved-context tokens per prompt
+    PROMPT_OVERHEAD_TOKENS: int = 300 # Reserved for the DSPy prompt template
+    CONTEXT_MIN_TRIM_TOKENS: int = 64 # Drop, rather than trim, a chunk that would keep fewer tokens than this
+
+    EMBEDDING_BATCH_SIZE: int = 64 # Texts per forward pass during ingestion
+    INGEST_QUEUE_SIZE: int = 8 # Max batches buffered between ingestion stages
+    INGEST_SQL_BATCH_SIZE: int = 1000 # Rows per multi-row INSERT during ingestion
+    INGEST_UPLOAD_DIR: str = "data/uploads" # Uploads are kept here until their job completes
+    INGEST_HEARTBEAT_SECONDS: int = 30 # How often a running job marks itself alive, including during index rebuilds
+    INGEST_STALE_SECONDS: int = 120 # A running job with no heartbeat for this long is considered dead
+    INGEST_AUTO_RESUME: bool = True # Resume interrupted ingestion jobs on startup
+    INGEST_PRUNE_REMOVED: bool = True # Delete stored chunks of ingested files that are missing from the upload
 
     @validator("QDRANT_URL")
     def validate_qdrant_url(cls, v):
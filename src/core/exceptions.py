@@ -11,3 +11,19 @@ class AuthenticationException(BanglaLegalAIException):
     def __init__(self, message: str = "Authentication failed"):
         self.message = message
         super().__init__(self.message)
+
+class InferenceQueueFullException(BanglaLegalAIException):
+    def __init__(self, message: str = "Too many requests in progress. Please retry shortly."):
+        self.message = message
+        super().__init__(self.message)
+
+class ModelsNotReadyException(BanglaLegalAIException):
+    def __init__(self, message: str = "System is initializing models. Please try again in 5 seconds.", retry_after: int = 5):
+        self.message = message
+        self.retry_after = retry_after # None when retrying won't help (a model failed to load)
+        super().__init__(self.message)
+
+class InferenceTimeoutException(BanglaLegalAIException):
+    def __init__(self, message: str = "The answer took too long to generate. Please retry."):
+        self.message = message
+        super().__init__(self.message)
@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.data.models import ChatSession, ChatMessage
 from src.data.schemas import ChatSessionCreate
-from typing import List
+from typing import List, Optional, Tuple
 
 def create_chat_session(db: Session, user_id: int, session_in: ChatSessionCreate):
     db_session = ChatSession(**session_in.model_dump(), user_id=user_id)
@@ -19,3 +20,17 @@ def add_message(db: Session, session_id: int, role: str, content: str, citations
     db.commit()
     db.refresh(db_message)
     return db_message
+
+async def add_chat_turn_async(db: AsyncSession, user_id: int, session_id: Optional[int], messages: List[Tuple[str, str]]) -> int:
+    """
+    Creates the chat session if `session_id` is None and adds `messages` ((role, content) pairs),
+    all in one transaction. Returns the session id.
+    """
+    if not session_id:
+        chat_session = ChatSession(title="New Query", user_id=user_id)
+        db.add(chat_session)
+        await db.flush() # Assigns the id within the same transaction
+        session_id = chat_session.id
+    db.add_all([ChatMessage(session_id=session_id, role=role, content=content) for role, content in messages])
+    await db.commit()
+    return session_id
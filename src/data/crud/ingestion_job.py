@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update, or_, and_
+from sqlalchemy.orm import Session
+from src.data.models import IngestionJob
+from typing import Iterable, List, Optional
+
+def create_ingestion_job(db: Session, filename: str, file_path: str, total_bytes: int, user_id: int = None):
+    job = IngestionJob(
+        filename=filename,
+        file_path=file_path,
+        total_bytes=total_bytes,
+        user_id=user_id,
+        status="pending",
+        byte_offset=0,
+        last_batch=-1,
+        rows_processed=0,
+        rows_failed=0,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def get_ingestion_job(db: Session, job_id: int) -> Optional[IngestionJob]:
+    return db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+
+def _claimable(stale_after_seconds: int, dead_owners: Iterable[str] = ()):
+    # A running job whose heartbeat has stopped, or whose owner is known to be gone, belongs to a dead worker
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_after_seconds)
+    abandoned = [IngestionJob.updated_at < cutoff, IngestionJob.owner.is_(None)]
+    dead_owners = list(dead_owners)
+    if dead_owners:
+        abandoned.append(IngestionJob.owner.in_(dead_owners))
+    return or_(
+        IngestionJob.status.in_(["pending", "failed"]),
+        and_(IngestionJob.status == "running", or_(*abandoned)),
+    )
+
+def claim_ingestion_job(db: Session, job_id: int, owner: str, stale_after_seconds: int, dead_owners: Iterable[str] = ()) -> Optional[IngestionJob]:
+    """Atomically marks a job as running under `owner`. Returns None if it is finished or owned by a live worker."""
+    now = datetime.now(timezone.utc)
+    result = db.execute(
+        update(IngestionJob)
+        .execution_options(synchronize_session=False)
+        .where(IngestionJob.id == job_id, _claimable(stale_after_seconds, dead_owners))
+        .values(
+            status="running",
+            owner=owner,
+            error=None,
+            started_at=now,
+            updated_at=now,
+            run_start_offset=IngestionJob.byte_offset,
+            run_start_rows=IngestionJob.rows_processed,
+        )
+    )
+    db.commit()
+    if result.rowcount != 1:
+        return None
+    return db.get(IngestionJob, job_id, populate_existing=True)
+
+def get_running_job_owners(db: Session) -> List[str]:
+    rows = db.query(IngestionJob.owner).filter(IngestionJob.status == "running", IngestionJob.owner.isnot(None)).distinct()
+    return [row[0] for row in rows]
+
+def get_resumable_job_ids(db: Session, stale_after_seconds: int, dead_owners: Iterable[str] = ()) -> List[int]:
+    """Jobs left behind by a crash or restart."""
+    rows = db.query(IngestionJob.id).filter(
+        IngestionJob.status != "failed", _claimable(stale_after_seconds, dead_owners)
+    ).order_by(IngestionJob.id)
+    return [row[0] for row in rows]
+
+def touch_ingestion_job(db: Session, job_id: int, owner: str) -> bool:
+    """Heartbeat: keeps a running job from looking abandoned. False if another worker has taken it over."""
+    result = db.execute(
+        update(IngestionJob)
+        .execution_options(synchronize_session=False)
+        .where(IngestionJob.id == job_id, IngestionJob.status == "running", IngestionJob.owner == owner)
+        .values(updated_at=datetime.now(timezone.utc))
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def update_ingestion_checkpoint(db: Session, job_id: int, byte_offset: int, last_batch: int, rows_processed: int, rows_failed: int):
+    db.execute(
+        update(IngestionJob)
+        .execution_options(synchronize_session=False)
+        .where(IngestionJob.id == job_id)
+        .values(
+            byte_offset=byte_offset,
+            last_batch=last_batch,
+            rows_processed=rows_processed,
+            rows_failed=rows_failed,
+            updated_at=datetime.now(timezone.utc),
+        )
+    )
+    db.commit()
+
+def finish_ingestion_job(db: Session, job_id: int, status: str, error: str = None):
+    now = datetime.now(timezone.utc)
+    db.execute(
+        update(IngestionJob)
+        .execution_options(synchronize_session=False)
+        .where(IngestionJob.id == job_id)
+        .values(status=status, error=error, updated_at=now, finished_at=now if status == "completed" else None)
+    )
+    db.commit()
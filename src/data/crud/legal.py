@@ -0,0 +1,150 @@
+import json
+from datetime import date
+from sqlalchemy import select, delete, func, String, cast
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.dialects import postgresql, sqlite
+from src.data.models import LegalDocument, LegalChunk, CorpusVersion
+from typing import Dict, Iterable, List, Optional, Set
+
+def _insert(db: Session, model):
+    """Dialect-specific INSERT supporting ON CONFLICT (Postgres in prod, SQLite in tests)."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Bulk insert not supported for dialect '{dialect}'")
+
+def _insert_ignore(db: Session, model):
+    return _insert(db, model).on_conflict_do_nothing()
+
+def get_corpus_version(db: Session) -> int:
+    """The shared corpus version; 0 before the first ingestion that changed anything."""
+    return db.scalar(select(CorpusVersion.version).where(CorpusVersion.id == 1)) or 0
+
+def bump_corpus_version(db: Session) -> int:
+    """Atomically increments the shared corpus version and returns the new value."""
+    stmt = _insert(db, CorpusVersion).values(id=1, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CorpusVersion.id],
+        set_={"version": CorpusVersion.version + 1, "updated_at": func.now()},
+    )
+    version = db.execute(stmt.returning(CorpusVersion.version)).scalar_one()
+    db.commit()
+    return version
+
+def get_document_ids(db: Session) -> Dict[str, int]:
+    """Loads the full filename -> id map in one query."""
+    return {filename: doc_id for doc_id, filename in db.execute(select(LegalDocument.id, LegalDocument.filename))}
+
+def get_chunk_hashes(db: Session) -> Dict[str, Optional[str]]:
+    """Loads every stored chunk_id -> content_hash in one query."""
+    return {chunk_id: digest for chunk_id, digest in db.execute(select(LegalChunk.chunk_id, LegalChunk.content_hash))}
+
+def iter_chunk_texts(db: Session, batch_size: int = 5000):
+    """Streams (chunk_id, content) for the whole corpus without loading it all at once."""
+    stmt = select(LegalChunk.chunk_id, LegalChunk.content).execution_options(yield_per=batch_size)
+    for chunk_id, content in db.execute(stmt):
+        yield chunk_id, content or ""
+
+def iter_chunk_hierarchies(db: Session, batch_size: int = 5000):
+    """Streams (chunk_id, document_id, hierarchy) for building the legal graph."""
+    stmt = select(LegalChunk.chunk_id, LegalChunk.document_id, LegalChunk.hierarchy).execution_options(yield_per=batch_size)
+    for chunk_id, document_id, hierarchy in db.execute(stmt):
+        yield chunk_id, document_id, hierarchy
+
+def get_chunks_by_chunk_ids(db: Session, chunk_ids: Iterable[str]) -> Dict[str, LegalChunk]:
+    """Fetches chunks (with their documents) in a single IN (...) query."""
+    chunk_ids = list(chunk_ids)
+    if not chunk_ids:
+        return {}
+    rows = db.scalars(
+        select(LegalChunk).options(joinedload(LegalChunk.document)).where(LegalChunk.chunk_id.in_(chunk_ids))
+    )
+    return {chunk.chunk_id: chunk for chunk in rows}
+
+def get_document_ids_matching(db: Session, filenames: List[str] = None,
+                              date_from: date = None, date_to: date = None) -> Dict[str, int]:
+    """filename -> id of the documents passing the given filters (documents without a date fail date filters)."""
+    stmt = select(LegalDocument.id, LegalDocument.filename)
+    if filenames is not None:
+        stmt = stmt.where(LegalDocument.filename.in_(filenames))
+    if date_from is not None:
+        stmt = stmt.where(LegalDocument.document_date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(LegalDocument.document_date <= date_to)
+    return {filename: doc_id for doc_id, filename in db.execute(stmt)}
+
+def chunk_filter_conditions(db: Session, document_ids: Iterable[int] = None, hierarchy: List[str] = None) -> list:
+    """
+    WHERE clauses restricting LegalChunk to `document_ids` and to chunks under every section in
+    `hierarchy`. On Postgres the latter is `hierarchy @> ARRAY[...]`, served by the GIN index.
+    """
+    conditions = []
+    if document_ids is not None:
+        conditions.append(LegalChunk.document_id.in_(list(document_ids)))
+    if hierarchy:
+        if db.get_bind().dialect.name == "postgresql":
+            conditions.append(LegalChunk.hierarchy.contains(list(hierarchy)))
+        else:
+            # JSON text on SQLite: match each element's serialized form
+            conditions.extend(cast(LegalChunk.hierarchy, String).contains(json.dumps(section), autoescape=True) for section in hierarchy)
+    return conditions
+
+def get_chunk_ids_matching(db: Session, conditions: list) -> Set[str]:
+    return set(db.scalars(select(LegalChunk.chunk_id).where(*conditions)))
+
+def get_chunk_ids_for_documents(db: Session, document_ids: Iterable[int]) -> Set[str]:
+    document_ids = list(document_ids)
+    if not document_ids:
+        return set()
+    return set(db.scalars(select(LegalChunk.chunk_id).where(LegalChunk.document_id.in_(document_ids))))
+
+def bulk_create_documents(db: Session, filenames: Iterable[str], dates: Dict[str, date] = None) -> Dict[str, int]:
+    """
+    Inserts any missing documents and returns filename -> id for all of `filenames`.
+    A date in `dates` is stored on new and existing documents; a missing one keeps the stored date.
+    """
+    filenames = list(dict.fromkeys(filenames))
+    if not filenames:
+        return {}
+    dates = dates or {}
+    stmt = _insert(db, LegalDocument)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LegalDocument.filename],
+        set_={"document_date": func.coalesce(stmt.excluded.document_date, LegalDocument.document_date)},
+    )
+    db.execute(
+        stmt,
+        [{"filename": f, "title": f.replace(".txt", ""), "document_date": dates.get(f)} for f in filenames]
+    )
+    db.commit()
+    rows = db.execute(select(LegalDocument.id, LegalDocument.filename).where(LegalDocument.filename.in_(filenames)))
+    return {filename: doc_id for doc_id, filename in rows}
+
+def bulk_upsert_chunks(db: Session, rows: List[dict], batch_size: int = 1000) -> int:
+    """Multi-row INSERT ... ON CONFLICT (chunk_id) DO UPDATE of chunk rows, `batch_size` rows per statement."""
+    stmt = _insert(db, LegalChunk)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LegalChunk.chunk_id],
+        set_={
+            "document_id": stmt.excluded.document_id,
+            "content": stmt.excluded.content,
+            "hierarchy": stmt.excluded.hierarchy,
+            "token_count": stmt.excluded.token_count,
+            "content_hash": stmt.excluded.content_hash,
+        }
+    )
+    for i in range(0, len(rows), batch_size):
+        db.execute(stmt, rows[i:i + batch_size])
+    db.commit()
+    return len(rows)
+
+def delete_chunks(db: Session, chunk_ids: List[str]) -> int:
+    if not chunk_ids:
+        return 0
+    result = db.execute(
+        delete(LegalChunk).where(LegalChunk.chunk_id.in_(chunk_ids)).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
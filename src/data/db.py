@@ -1,11 +1,99 @@
-from sqlalchemy import create_engine
+import uuid
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from prometheus_client import Counter, Gauge
 from src.core.config import settings
 
-# Supabase requires SSL connection
-connect_args = {"sslmode": "require"} if "supabase" in settings.DATABASE_URL or "sslmode=require" in settings.DATABASE_URL else {}
+DB_POOL_IN_USE = Gauge("db_pool_connections_in_use", "Pooled connections checked out", ["engine"])
+DB_POOL_IDLE = Gauge("db_pool_connections_idle", "Pooled connections open and idle", ["engine"])
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond DB_POOL_SIZE (negative: pool not yet full)", ["engine"])
+DB_CONNECTIONS_OPENED = Counter("db_connections_opened_total", "New database connections (churn)", ["engine"])
 
-engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
+def _ssl_required(url: str) -> bool:
+    # Supabase requires SSL connection
+    return "supabase" in url or "sslmode=require" in url
+
+def uses_transaction_pooler(url: str) -> bool:
+    """
+    Transaction-mode poolers (Supabase's on port 6543, PgBouncer pool_mode=transaction) hand each
+    transaction to any server connection, so per-connection state such as prepared statements
+    can't be relied on. DB_TRANSACTION_POOLER overrides the port-based guess.
+    """
+    if settings.DB_TRANSACTION_POOLER is not None:
+        return settings.DB_TRANSACTION_POOLER
+    url = make_url(url)
+    return url.get_backend_name() == "postgresql" and url.port == 6543
+
+def _unique_statement_name() -> str:
+    # Names must not collide across the client connections sharing a server connection
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+def _connect_args(url: str) -> dict:
+    """psycopg2 connect args for the sync engine."""
+    args = {"sslmode": "require"} if _ssl_required(url) else {}
+    if make_url(url).get_backend_name() == "postgresql":
+        args["connect_timeout"] = settings.DB_CONNECT_TIMEOUT
+        # Poolers reject or drop startup options; set statement_timeout on the role instead
+        if settings.DB_STATEMENT_TIMEOUT_MS and not uses_transaction_pooler(url):
+            args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    return args
+
+def _async_connect_args(url: str) -> dict:
+    """asyncpg connect args for the async engine."""
+    args = {"ssl": "require"} if _ssl_required(url) else {}
+    if make_url(url).get_backend_name() == "postgresql":
+        args["timeout"] = settings.DB_CONNECT_TIMEOUT
+        if uses_transaction_pooler(url):
+            # asyncpg prepares and caches every statement; behind a transaction pooler that raises
+            # DuplicatePreparedStatementError, so turn both caches off and name statements uniquely
+            args["statement_cache_size"] = 0
+            args["prepared_statement_cache_size"] = 0
+            args["prepared_statement_name_func"] = _unique_statement_name
+        elif settings.DB_STATEMENT_TIMEOUT_MS:
+            args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    return args
+
+def _pool_options(url: str) -> dict:
+    """Pool sizing and liveness from Settings; SQLite (tests) keeps SQLAlchemy's defaults."""
+    if make_url(url).get_backend_name() != "postgresql":
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE, # Below the idle timeout of Supabase's pooler / load balancers
+        "pool_pre_ping": settings.DB_POOL_PRE_PING, # Replaces connections dropped server-side before use
+    }
+
+def _instrument(engine, name: str):
+    pool = engine.pool
+    if hasattr(pool, "checkedout"): # QueuePool; SQLite in-memory pools don't track usage
+        DB_POOL_IN_USE.labels(engine=name).set_function(pool.checkedout)
+        DB_POOL_IDLE.labels(engine=name).set_function(pool.checkedin)
+        DB_POOL_OVERFLOW.labels(engine=name).set_function(pool.overflow)
+    event.listen(engine, "connect", lambda dbapi_connection, record: DB_CONNECTIONS_OPENED.labels(engine=name).inc())
+
+engine = create_engine(settings.DATABASE_URL, connect_args=_connect_args(settings.DATABASE_URL), **_pool_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_instrument(engine, "sync")
+
+def _async_url(url: str):
+    """Same database through an asyncio driver: asyncpg for Postgres, aiosqlite for SQLite (tests)."""
+    url = make_url(url)
+    if url.get_backend_name() == "postgresql":
+        # asyncpg takes `ssl` as a connect arg instead of `sslmode` in the URL
+        return url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+# Async engine for the request path (auth, chat); ingestion and retrieval threads use `engine`
+async_engine = create_async_engine(
+    _async_url(settings.DATABASE_URL), connect_args=_async_connect_args(settings.DATABASE_URL), **_pool_options(settings.DATABASE_URL)
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+_instrument(async_engine.sync_engine, "async")
 
 Base = declarative_base()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, ARRAY, JSON, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, ForeignKey, Text, ARRAY, JSON, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from src.data.db import Base
@@ -49,6 +49,7 @@ class LegalDocument(Base):
     filename = Column(String, unique=True, index=True)
     title = Column(String)
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
+    document_date = Column(Date, nullable=True, index=True) # Enactment/publication date, from chunk metadata
     
     chunks = relationship("LegalChunk", back_populates="document")
 
@@ -58,10 +59,47 @@ class LegalChunk(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     chunk_id = Column(String, unique=True, index=True)
-    document_id = Column(Integer, ForeignKey("legal_documents.id"))
+    document_id = Column(Integer, ForeignKey("legal_documents.id"), index=True)
     
     content = Column(Text) 
-    hierarchy = Column(ARRAY(String)) # PG Array for GraphRAG
+    hierarchy = Column(ARRAY(String).with_variant(JSON, "sqlite")) # PG Array for GraphRAG (JSON on SQLite in tests)
     token_count = Column(Integer)
+    content_hash = Column(String(64), nullable=True) # sha256 of content, for incremental re-ingestion
     
     document = relationship("LegalDocument", back_populates="chunks")
+
+class CorpusVersion(Base):
+    """Single row counting corpus changes, so every worker can tell its caches are stale"""
+    __tablename__ = "corpus_version"
+
+    id = Column(Integer, primary_key=True) # Always 1
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class IngestionJob(Base):
+    """A resumable ingestion run over an uploaded JSONL file"""
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    filename = Column(String)
+    file_path = Column(String) # Stored upload, kept until the job completes
+    status = Column(String, default="pending", index=True) # pending, running, completed, failed
+    owner = Column(String, nullable=True) # Worker instance running the job (host:pid:token)
+
+    # Checkpoint: everything before byte_offset is committed to SQL and Qdrant
+    total_bytes = Column(BigInteger, default=0)
+    byte_offset = Column(BigInteger, default=0)
+    last_batch = Column(Integer, default=-1)
+    rows_processed = Column(Integer, default=0)
+    rows_failed = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+
+    # Where the current run started, for throughput/ETA
+    run_start_offset = Column(BigInteger, default=0)
+    run_start_rows = Column(Integer, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
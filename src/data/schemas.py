@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Literal
+from datetime import date, datetime
 
 # Auth
 class UserBase(BaseModel):
@@ -54,7 +54,56 @@ class ChatSession(ChatSessionBase):
         from_attributes = True
 
 # RAG
+class RetrievalFilters(BaseModel):
+    """Restricts retrieval to part of the corpus; applied inside each retriever, not to its output."""
+    source_files: Optional[List[str]] = Field(None, min_length=1, max_length=100)
+    hierarchy: Optional[List[str]] = Field(None, min_length=1, max_length=10) # Chunk must lie under every listed section
+    date_from: Optional[date] = None # Inclusive, on the document date
+    date_to: Optional[date] = None
+
+    @property
+    def active(self) -> bool:
+        return any(v is not None for v in (self.source_files, self.hierarchy, self.date_from, self.date_to))
+
+    @property
+    def scopes_documents(self) -> bool:
+        return any(v is not None for v in (self.source_files, self.date_from, self.date_to))
+
+class RetrievalParams(BaseModel):
+    """Per-request retrieval/fusion overrides. Unset fields fall back to Settings."""
+    fusion_method: Optional[Literal["rrf", "weighted"]] = None
+    rrf_k: Optional[int] = Field(None, ge=1, le=1000)
+    dense_weight: Optional[float] = Field(None, ge=0)
+    sparse_weight: Optional[float] = Field(None, ge=0)
+    dense_depth: Optional[int] = Field(None, ge=0, le=200)
+    sparse_depth: Optional[int] = Field(None, ge=0, le=200)
+    top_k: Optional[int] = Field(None, ge=1, le=50)
+    filters: Optional[RetrievalFilters] = None
+
 class QueryRequest(BaseModel):
     query: str
     session_id: Optional[int] = None
+    retrieval: Optional[RetrievalParams] = None
+
+# Ingestion
+class IngestionJob(BaseModel):
+    id: int
+    filename: str
+    status: str
+    total_bytes: int
+    byte_offset: int
+    last_batch: int
+    rows_processed: int
+    rows_failed: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     
+    # Derived from the checkpoint
+    progress: float = 0.0
+    rows_per_sec: float = 0.0
+    eta_seconds: Optional[float] = None
+    class Config:
+        from_attributes = True
@@ -2,6 +2,8 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from src.core.config import settings
 from src.ml.loader import ml_models, ModelLoader
+from src.ml.vector_store import async_qdrant
+from src.data.db import async_engine
 # from src.api.v1.router import api_router # We will create this later
 import logging
 import time
@@ -16,17 +18,31 @@ REQUEST_LATENCY = Histogram("app_request_latency_seconds", "Request latency", ["
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # STARTUP
-    logger.info(" Loading AI Models... (This takes time)")
-    # Real loading logic
-    ml_models["embedding"] = ModelLoader.load_embedding_model()
-    ml_models["llm"] = ModelLoader.load_llm_model()
-    logger.info(" AI Models Loaded")
+    ml_models["result_cache"] = ModelLoader.load_result_cache()
+    ml_models["answer_cache"] = ModelLoader.load_answer_cache()
+
+    def on_models_loaded():
+        logger.info(" AI Models Loaded" if ModelLoader.is_ready() else " AI Models failed to load; see /health/ready")
+        if settings.INGEST_AUTO_RESUME:
+            # Pick up ingestion jobs interrupted by a crash or restart (needs the embedder)
+            from src.services.ingestion_service import IngestionService
+            try:
+                IngestionService.resume_interrupted_jobs()
+            except Exception as e:
+                # Runs on the loader thread: log instead of dying with an unhandled traceback
+                logger.error(f" Resuming interrupted ingestion jobs failed: {e}")
+
+    # Models load in the background, in parallel; non-ML routes serve right away
+    logger.info(" Loading AI Models in the background...")
+    ModelLoader.start_background_loading(on_done=on_models_loaded)
     
     yield
     
     # SHUTDOWN
     logger.info(" Unloading Models...")
     ml_models.clear()
+    await async_engine.dispose()
+    await async_qdrant.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -55,6 +71,22 @@ class MetricsMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(MetricsMiddleware)
 
+from fastapi.responses import JSONResponse
+from src.core.exceptions import InferenceQueueFullException, InferenceTimeoutException, ModelsNotReadyException
+
+@app.exception_handler(InferenceQueueFullException)
+async def inference_queue_full_handler(request: Request, exc: InferenceQueueFullException):
+    return JSONResponse(status_code=429, content={"detail": exc.message}, headers={"Retry-After": "5"})
+
+@app.exception_handler(ModelsNotReadyException)
+async def models_not_ready_handler(request: Request, exc: ModelsNotReadyException):
+    headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after else None
+    return JSONResponse(status_code=503, content={"detail": exc.message}, headers=headers)
+
+@app.exception_handler(InferenceTimeoutException)
+async def inference_timeout_handler(request: Request, exc: InferenceTimeoutException):
+    return JSONResponse(status_code=504, content={"detail": exc.message})
+
 from src.app.routers import health
 app.include_router(health.router, tags=["health"])
 
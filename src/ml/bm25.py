@@ -0,0 +1,120 @@
+from array import array
+from collections import Counter
+from typing import Iterable, List, Tuple
+import numpy as np
+
+from src.ml.tokenizer import tokenize
+from src.ml.index_io import save_arrays, load_arrays
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts with CSR-style postings.
+
+    Postings for term `t` are `postings[indptr[t]:indptr[t + 1]]` (document numbers) with
+    their precomputed length-normalized tf weights in `weights`, so a query is a handful
+    of array slices plus one bincount. Arrays are saved as .npy files and memory-mapped on
+    load, so workers share the pages through the OS page cache.
+    """
+    ARRAYS = ("indptr", "postings", "weights", "idf")
+
+    def __init__(self, terms: List[str], chunk_ids: List[str], indptr, postings, weights, idf, k1: float, b: float):
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.chunk_ids = chunk_ids
+        self.indptr = indptr
+        self.postings = postings
+        self.weights = weights
+        self.idf = idf
+        self.k1 = k1
+        self.b = b
+        self._doc_no = None # chunk_id -> document number, built on first filtered search
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[str, str]], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Builds the index from (chunk_id, text) pairs."""
+        vocab = {}
+        chunk_ids = []
+        doc_lens = array("f")
+        # COO triples, compacted into CSR below
+        coo_terms, coo_docs, coo_tfs = array("i"), array("i"), array("f")
+
+        for doc_no, (chunk_id, text) in enumerate(docs):
+            counts = Counter(tokenize(text))
+            chunk_ids.append(chunk_id)
+            doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                coo_terms.append(vocab.setdefault(term, len(vocab)))
+                coo_docs.append(doc_no)
+                coo_tfs.append(tf)
+
+        n_docs, n_terms = len(chunk_ids), len(vocab)
+        terms_arr = np.frombuffer(coo_terms, dtype=np.int32)
+        order = np.argsort(terms_arr, kind="stable") # Stable: postings stay in document order
+        postings = np.frombuffer(coo_docs, dtype=np.int32)[order]
+        tfs = np.frombuffer(coo_tfs, dtype=np.float32)[order]
+
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms_arr, minlength=n_terms), out=indptr[1:])
+
+        lens = np.frombuffer(doc_lens, dtype=np.float32)
+        avgdl = float(lens.mean()) if n_docs else 0.0
+        norm = k1 * (1 - b + b * lens[postings] / avgdl) if n_docs else np.zeros(0, dtype=np.float32)
+        weights = (tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+
+        df = np.diff(indptr).astype(np.float64)
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        terms = [None] * n_terms
+        for term, i in vocab.items():
+            terms[i] = term
+        return cls(terms, chunk_ids, indptr, postings, weights, idf, k1, b)
+
+    def _doc_numbers(self, chunk_ids: Iterable[str]) -> np.ndarray:
+        if self._doc_no is None:
+            self._doc_no = {chunk_id: i for i, chunk_id in enumerate(self.chunk_ids)}
+        return np.fromiter((self._doc_no[c] for c in chunk_ids if c in self._doc_no), dtype=np.int32)
+
+    def search(self, query: str, limit: int = 10, allowed: Iterable[str] = None) -> List[Tuple[str, float]]:
+        """Returns up to `limit` (chunk_id, score) pairs, best first, optionally only among `allowed` chunk ids."""
+        term_ids = [self.vocab[t] for t in set(tokenize(query)) if t in self.vocab]
+        if not term_ids:
+            return []
+
+        docs, scores = [], []
+        for t in term_ids:
+            start, end = self.indptr[t], self.indptr[t + 1]
+            docs.append(self.postings[start:end])
+            scores.append(self.weights[start:end] * self.idf[t])
+        docs = np.concatenate(docs)
+        scores = np.concatenate(scores)
+        if allowed is not None:
+            keep = np.isin(docs, self._doc_numbers(allowed))
+            docs, scores = docs[keep], scores[keep]
+            if not len(docs):
+                return []
+
+        # Sum contributions per document
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+
+        if len(totals) > limit:
+            top = np.argpartition(-totals, limit)[:limit]
+            top = top[np.argsort(-totals[top], kind="stable")]
+        else:
+            top = np.argsort(-totals, kind="stable")
+        return [(self.chunk_ids[unique_docs[i]], float(totals[i])) for i in top]
+
+    def save(self, path: str):
+        save_arrays(
+            path,
+            {name: getattr(self, name) for name in self.ARRAYS},
+            {"k1": self.k1, "b": self.b, "terms": self.terms, "chunk_ids": self.chunk_ids},
+        )
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        arrays, meta = load_arrays(path, cls.ARRAYS, mmap=mmap)
+        return cls(meta["terms"], meta["chunk_ids"], k1=meta["k1"], b=meta["b"], **arrays)
@@ -0,0 +1,107 @@
+from typing import List, Optional, Tuple
+from src.core.config import settings
+
+def estimate_tokens(text: str) -> int:
+    """
+    Conservative token estimate for when the LLM tokenizer is not available (e.g. OpenAI).
+    Byte-level BPE vocabularies spend roughly one token per Bangla character (3 UTF-8 bytes).
+    """
+    return len(text.encode("utf-8")) // 3 + 1
+
+def context_budget(question_tokens: int = 0) -> int:
+    """Tokens left for retrieved context once the answer, prompt template and question are reserved."""
+    available = settings.LLM_CONTEXT_WINDOW - settings.LLM_MAX_TOKENS - settings.PROMPT_OVERHEAD_TOKENS - question_tokens
+    return max(0, min(settings.CONTEXT_TOKEN_BUDGET, available))
+
+class ContextPacker:
+    """
+    Packs retrieved chunks into a token budget, highest fused score first.
+
+    `tokenizer` is anything with llama.cpp's tokenize(bytes, add_bos=...) / detokenize(tokens)
+    interface. Without one, the chunk's stored `token_count` is used (or an estimate), so the
+    packing stays bounded for remote providers too.
+    """
+    SEPARATOR = "\n\n"
+    ELLIPSIS = " …"
+
+    def __init__(self, tokenizer=None, min_trim_tokens: int = None):
+        self.tokenizer = tokenizer
+        self.min_trim_tokens = settings.CONTEXT_MIN_TRIM_TOKENS if min_trim_tokens is None else min_trim_tokens
+
+    @staticmethod
+    def format(item: dict, content: Optional[str] = None) -> str:
+        source = item.get('source') or item['payload'].get('source_file', 'Unknown')
+        return f"Source: {source}\nContent: {item['content'] if content is None else content}"
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.tokenize(text.encode("utf-8"), add_bos=False))
+        return estimate_tokens(text)
+
+    def _item_tokens(self, item: dict) -> int:
+        stored = item['payload'].get('token_count')
+        if self.tokenizer is None and stored:
+            # Stored count covers the chunk text only; add the source header
+            return stored + estimate_tokens(self.format(item, content=""))
+        return self.count(self.format(item))
+
+    def _trim(self, item: dict, max_tokens: int) -> Tuple[Optional[dict], int]:
+        """Cuts the chunk's content so the formatted entry fits in `max_tokens`; returns (entry, its tokens)."""
+        fit = room = max_tokens - self.count(self.format(item, content=self.ELLIPSIS))
+        while room >= self.min_trim_tokens:
+            content = item['content']
+            if self.tokenizer is not None:
+                tokens = self.tokenizer.tokenize(content.encode("utf-8"), add_bos=False)[:room]
+                # A cut can split a multi-byte character; drop the partial bytes
+                content = self.tokenizer.detokenize(tokens).decode("utf-8", errors="ignore")
+            else:
+                content = content[:len(content) * room // max(self._item_tokens(item), 1)]
+            if not content.strip():
+                break
+            # The stored count no longer describes the trimmed text
+            trimmed = {**item, 'content': content.rstrip() + self.ELLIPSIS, 'payload': {**item['payload'], 'token_count': None}, 'trimmed': True}
+            tokens_used = self._item_tokens(trimmed)
+            if tokens_used <= max_tokens:
+                return trimmed, tokens_used
+            # Re-tokenizing the cut text (or the estimate) came out longer; shrink the cut to match
+            room = min(room - 1, room * fit // (tokens_used - max_tokens + fit))
+        return None, 0
+
+    def pack(self, items: List[dict], budget: int) -> Tuple[List[dict], int]:
+        """
+        Returns (packed items, tokens used <= budget). Items are taken in descending
+        `fused_score` (direct hits before graph expansions); duplicates by chunk id or text
+        are dropped, a chunk that overflows is trimmed if enough room is left, and
+        lower-ranked chunks that still fit whole are kept.
+        """
+        ordered = sorted(
+            enumerate(items),
+            key=lambda x: (x[1].get('fused_score') is None, -(x[1].get('fused_score') or 0.0), x[0]),
+        )
+        separator = self.count(self.SEPARATOR)
+
+        packed, used = [], 0
+        seen_ids, seen_texts = set(), set()
+        for _, item in ordered:
+            if not item.get('content'):
+                continue
+            key = item.get('id')
+            if (key is not None and key in seen_ids) or item['content'] in seen_texts:
+                continue
+            seen_ids.add(key)
+            seen_texts.add(item['content'])
+
+            cost = self._item_tokens(item) + (separator if packed else 0)
+            if used + cost <= budget:
+                packed.append(item)
+                used += cost
+                continue
+            allotted = budget - used - (separator if packed else 0)
+            trimmed, tokens_used = self._trim(item, allotted)
+            if trimmed is not None:
+                used += tokens_used + (separator if packed else 0)
+                packed.append(trimmed)
+        return packed, used
+
+    def render(self, items: List[dict]) -> str:
+        return self.SEPARATOR.join(self.format(item) for item in items)
@@ -0,0 +1,119 @@
+"""
+Alternative CPU inference backends for the embedding model, selected by EMBEDDING_BACKEND:
+
+- "torch": the fp32 SentenceTransformer as loaded (reference)
+- "int8":  the same model with nn.Linear layers dynamically quantized to int8 at load time
+- "onnx":  the full SentenceTransformer pipeline (transformer, pooling, normalize) exported
+           to an ONNX graph and run with ONNX Runtime
+
+Export and parity check against fp32: src/scripts/embedding_backend.py
+"""
+import os
+import numpy as np
+
+from src.core.config import settings
+
+EMBEDDING_BACKENDS = ("torch", "int8", "onnx")
+
+PARITY_TEXTS = [
+    "দণ্ডবিধির ৩০২ ধারা অনুযায়ী হত্যার শাস্তি কী?",
+    "চুরির শাস্তি ধারা ৩৭৯ অনুযায়ী কারাদণ্ড",
+    "সংবিধানের ৭ অনুচ্ছেদ প্রজাতন্ত্রের সকল ক্ষমতার মালিক জনগণ",
+    "ফৌজদারি কার্যবিধির ১৫৪ ধারায় এজাহার দায়ের",
+    "Code of Criminal Procedure, section 154",
+]
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every nn.Linear (weights int8, activations quantized on the fly)."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class OnnxEncoder:
+    """
+    Runs an exported embedding graph with ONNX Runtime. Mirrors the slice of the
+    SentenceTransformer.encode interface BanglaEmbedding uses, so it drops in as `model`.
+    """
+    def __init__(self, model_dir: str, threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        with open(os.path.join(model_dir, "max_seq_length.txt")) as f:
+            self.max_seq_length = int(f.read().strip())
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        out = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="np",
+            )
+            feed = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            out.append(self.session.run(None, feed)[0])
+        return np.concatenate(out).astype(np.float32, copy=False)
+
+def export_onnx(model, out_dir: str, opset: int = 17):
+    """Exports the whole SentenceTransformer pipeline with dynamic batch and sequence axes."""
+    import torch
+
+    class Pipeline(torch.nn.Module):
+        def __init__(self, st_model, input_names):
+            super().__init__()
+            self.st_model = st_model
+            self.input_names = input_names
+
+        def forward(self, *inputs):
+            features = dict(zip(self.input_names, inputs))
+            return self.st_model(features)["sentence_embedding"]
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = model.tokenizer
+    sample = tokenizer(PARITY_TEXTS[:2], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic["sentence_embedding"] = {0: "batch"}
+
+    model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            Pipeline(model, input_names),
+            tuple(sample[name] for name in input_names),
+            os.path.join(out_dir, "model.onnx"),
+            input_names=input_names,
+            output_names=["sentence_embedding"],
+            dynamic_axes=dynamic,
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(out_dir)
+    with open(os.path.join(out_dir, "max_seq_length.txt"), "w") as f:
+        f.write(str(model.max_seq_length))
+    print(f"Exported ONNX embedding model to {out_dir}")
+
+def cosine_drift(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    """Row-wise cosine similarity between two (n, dim) embedding matrices."""
+    if reference.shape != candidate.shape:
+        raise ValueError(f"Shape mismatch: {reference.shape} vs {candidate.shape}")
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    cosine = np.sum(reference * candidate, axis=1) / np.maximum(norms, 1e-12)
+    return {"n": len(cosine), "mean_cosine": float(cosine.mean()), "min_cosine": float(cosine.min())}
+
+def parity(backend: str, texts=None) -> dict:
+    """Encodes `texts` with fp32 torch and with `backend`, and reports the cosine drift."""
+    from src.ml.embeddings import BanglaEmbedding
+
+    texts = list(texts or PARITY_TEXTS)
+    reference = BanglaEmbedding(settings.EMBEDDING_MODEL_PATH, cache_size=0, backend="torch")
+    candidate = BanglaEmbedding(settings.EMBEDDING_MODEL_PATH, cache_size=0, backend=backend)
+    if candidate.backend != backend:
+        raise RuntimeError(f"Backend '{backend}' could not be loaded (got '{candidate.backend}')")
+    report = cosine_drift(reference.encode_batch(texts), candidate.encode_batch(texts))
+    report["backend"] = backend
+    return report
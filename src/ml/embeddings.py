@@ -1,7 +1,55 @@
 import pickle
 import torch
+import numpy as np
 import os
 import io
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from prometheus_client import Counter
+from src.core.config import settings
+
+EMBEDDING_DIM = 384
+
+EMBEDDING_CACHE_LOOKUPS = Counter("embedding_cache_lookups_total", "Query embedding cache lookups", ["result"])
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU of query embeddings keyed by a hash of the normalized text (NFC, collapsed
+    whitespace; both leave the model's tokenization unchanged). Vectors are stored as
+    read-only float32 arrays so a cached vector can be handed out without copying.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        text = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: bytes):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+        EMBEDDING_CACHE_LOOKUPS.labels(result="hit" if vector is not None else "miss").inc()
+        return vector
+
+    def put(self, key: bytes, vector: np.ndarray) -> np.ndarray:
+        vector = np.array(vector, dtype=np.float32) # Own copy, detached from the batch matrix
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return vector
 
 class CPU_Unpickler(pickle.Unpickler):
     def find_class(self, module, name):
@@ -9,29 +57,121 @@ class CPU_Unpickler(pickle.Unpickler):
             return lambda b: torch.load(io.BytesIO(b), map_location='cpu')
         return super().find_class(module, name)
 
+def load_pickled_model(model_path: str):
+    """Legacy format: a whole SentenceTransformer pickled with its torch tensors."""
+    try:
+        print("Attempting to load with custom CPU_Unpickler...")
+        with open(model_path, 'rb') as f:
+            return CPU_Unpickler(f).load()
+    except Exception as e:
+        print(f"Custom unpickler failed: {e}")
+        print("Falling back to standard torch.load...")
+        # Fallback (though likely to fail if the above failed)
+        return torch.load(model_path, map_location='cpu', weights_only=False)
+
+def converted_model_dir(model_path: str) -> str:
+    """Where convert_embedding_model writes the directory form of a .pkl model by default."""
+    return os.path.splitext(model_path)[0]
+
+def mmap_weights(model, model_dir: str) -> bool:
+    """
+    Re-points the transformer's parameters at a memory map of the directory's model.safetensors,
+    so workers on one host share a single copy of the weights through the OS page cache. The
+    private copy loaded by SentenceTransformer is freed once replaced. Returns False, leaving
+    the model as loaded, if there is no such file or its tensors don't match the model.
+    """
+    weights = os.path.join(model_dir, "model.safetensors")
+    transformer = getattr(model[0], "auto_model", None) # The Transformer module wraps the HF model
+    if transformer is None or not os.path.exists(weights):
+        return False
+
+    from safetensors.torch import load_file
+    try:
+        # load_file's CPU tensors are backed by the mmap; assign=True keeps them instead of copying
+        transformer.load_state_dict(load_file(weights, device="cpu"), assign=True)
+    except RuntimeError as e:
+        print(f"WARNING: Could not memory-map {weights} ({e}); keeping a private copy of the weights.")
+        return False
+    return True
+
+def load_torch_model(model_path: str):
+    """The fp32 SentenceTransformer, from a directory or a legacy .pkl; None if missing."""
+    # Prefer the converted directory (config + safetensors) next to a configured .pkl
+    if model_path.endswith(".pkl") and os.path.isdir(converted_model_dir(model_path)):
+        model_path = converted_model_dir(model_path)
+        print(f"Using converted model directory {model_path}")
+
+    if os.path.isdir(model_path):
+        # safetensors: no unpickling and no torch code execution
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_path, device="cpu")
+        if mmap_weights(model, model_path):
+            print(f"Embedding weights memory-mapped from {model_path}")
+        return model
+
+    if not os.path.exists(model_path):
+        print(f"WARNING: Model file {model_path} not found. Using placeholder.")
+        return None
+
+    print("Loading pickled model; run `python src/scripts/convert_embedding_model.py` once for faster, safer startup.")
+    return load_pickled_model(model_path)
+
 class BanglaEmbedding:
-    def __init__(self, model_path="models/embedding_model.pkl"):
+    def __init__(self, model_path="models/embedding_model.pkl", cache_size: int = None, backend: str = None):
         print(f"Loading Fine-Tuned Bangla Embeddings from {model_path}...")
-        
-        if not os.path.exists(model_path):
-            print(f"WARNING: Model file {model_path} not found. Using placeholder.")
-            self.model = None
-            return
-
-        try:
-            print("Attempting to load with custom CPU_Unpickler...")
-            with open(model_path, 'rb') as f:
-                self.model = CPU_Unpickler(f).load()
-        except Exception as e:
-            print(f"Custom unpickler failed: {e}")
-            print("Falling back to standard torch.load...")
-            # Fallback (though likely to fail if the above failed)
-            self.model = torch.load(model_path, map_location='cpu', weights_only=False)
-            
-    def encode(self, text: str):
+        cache_size = settings.EMBEDDING_CACHE_SIZE if cache_size is None else cache_size
+        self.cache = EmbeddingCache(cache_size) if cache_size > 0 else None
+
+        # Inference backend: "torch" (fp32), "int8" (dynamic quantization) or "onnx" (ONNX Runtime)
+        backend = backend or settings.EMBEDDING_BACKEND
+        self.backend = "torch"
+        if backend == "onnx":
+            if os.path.exists(os.path.join(settings.EMBEDDING_ONNX_PATH, "model.onnx")):
+                from src.ml.embedding_backends import OnnxEncoder
+                print(f"Using ONNX Runtime embedding backend from {settings.EMBEDDING_ONNX_PATH}")
+                self.model = OnnxEncoder(settings.EMBEDDING_ONNX_PATH, threads=settings.EMBEDDING_THREADS)
+                self.backend = "onnx"
+                return
+            print(f"WARNING: No ONNX model at {settings.EMBEDDING_ONNX_PATH}; run "
+                  "`python src/scripts/embedding_backend.py export-onnx`. Falling back to torch.")
+
+        self.model = load_torch_model(model_path)
+        if backend == "int8" and self.model is not None:
+            from src.ml.embedding_backends import quantize_int8
+            print("Quantizing embedding model to int8 (dynamic)...")
+            self.model = quantize_int8(self.model)
+            self.backend = "int8"
+        if settings.EMBEDDING_THREADS and self.model is not None:
+            torch.set_num_threads(settings.EMBEDDING_THREADS)
+
+    def encode_batch(self, texts, batch_size: int = 32) -> np.ndarray:
+        """Encodes a list of texts into a contiguous (len(texts), 384) float32 matrix."""
+        texts = list(texts)
         if self.model is None:
-            # Return dummy vector for testing
-            return [0.0] * 384 
-            
+            # Return dummy vectors for testing
+            return np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        if not texts:
+            return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
         with torch.no_grad():
-            return self.model.encode(text).tolist()
+            vectors = self.model.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def encode(self, text: str) -> np.ndarray:
+        """
+        Encodes a single text (a query). Returns a read-only float32 vector of length 384,
+        memoized so repeated queries skip the forward pass. Ingestion uses encode_batch,
+        which bypasses the cache.
+        """
+        if self.cache is None:
+            return self.encode_batch([text])[0]
+        key = self.cache.key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.cache.put(key, self.encode_batch([text])[0])
+        return vector
@@ -0,0 +1,65 @@
+from typing import Dict, List, Optional
+from src.core.config import settings
+from src.data.schemas import RetrievalParams
+
+FUSION_METHODS = ("rrf", "weighted")
+
+def resolve_params(overrides: Optional[RetrievalParams] = None) -> RetrievalParams:
+    """Fills any field not set on the request from Settings."""
+    defaults = RetrievalParams(
+        fusion_method=settings.FUSION_METHOD,
+        rrf_k=settings.RRF_K,
+        dense_weight=settings.DENSE_WEIGHT,
+        sparse_weight=settings.SPARSE_WEIGHT,
+        dense_depth=settings.DENSE_DEPTH,
+        sparse_depth=settings.SPARSE_DEPTH,
+        top_k=settings.FUSION_TOP_K,
+    )
+    if overrides is None:
+        return defaults
+    # Attribute access rather than model_dump(), so nested models (filters) stay models
+    update = {name: getattr(overrides, name) for name in overrides.model_fields_set if getattr(overrides, name) is not None}
+    return defaults.model_copy(update=update)
+
+def _rrf_scores(results: List[dict], k: int) -> List[float]:
+    return [1 / (k + rank + 1) for rank in range(len(results))]
+
+def _normalized_scores(results: List[dict]) -> List[float]:
+    """Min-max normalizes a retriever's raw scores into [0, 1]."""
+    scores = [float(r['score'] or 0.0) for r in results]
+    if not scores:
+        return []
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(s - low) / (high - low) for s in scores]
+
+def fuse(ranked: Dict[str, List[dict]], weights: Dict[str, float], method: str = "rrf", k: int = 60, top_k: int = 5) -> List[dict]:
+    """
+    Fuses ranked result lists, keyed by retriever name, into one list of `top_k` results.
+
+    - "rrf": sum of weight / (k + rank)
+    - "weighted": sum of weight * min-max normalized retriever score
+
+    Results are deduplicated by chunk id. The first copy seen is kept, unless it lacks
+    text that a later copy has. Ties keep first-seen order, so output is deterministic.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{method}'. Expected one of {FUSION_METHODS}")
+
+    fused = {} # key -> {'data', 'score', 'order'}
+    for name, results in ranked.items():
+        weight = weights.get(name, 1.0)
+        if weight == 0 or not results:
+            continue
+        scores = _rrf_scores(results, k) if method == "rrf" else _normalized_scores(results)
+        for rank, (res, score) in enumerate(zip(results, scores)):
+            key = str(res['id']) if res.get('id') is not None else (name, rank) # Unkeyed hits never merge
+            if key not in fused:
+                fused[key] = {'data': res, 'score': 0.0, 'order': len(fused)}
+            elif fused[key]['data'].get('content') is None and res.get('content') is not None:
+                fused[key]['data'] = res
+            fused[key]['score'] += weight * score
+
+    ordered = sorted(fused.values(), key=lambda x: (-x['score'], x['order']))
+    return [dict(item['data'], fused_score=item['score']) for item in ordered[:top_k]]
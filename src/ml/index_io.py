@@ -0,0 +1,34 @@
+import json
+import os
+import shutil
+from typing import Dict, Iterable, Tuple
+import numpy as np
+
+def save_arrays(path: str, arrays: Dict[str, np.ndarray], meta: dict):
+    """
+    Saves each array as `<name>.npy` plus `meta.json` into directory `path`.
+    Writes to a sibling directory first, then swaps it in so readers never see a partial index.
+    """
+    tmp_path, old_path = f"{path}.tmp", f"{path}.old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(arr))
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def load_arrays(path: str, names: Iterable[str], mmap: bool = True) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Loads arrays saved by save_arrays, memory-mapped by default so processes share pages."""
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        for name in names
+    }
+    return arrays, meta
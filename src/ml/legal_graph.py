@@ -0,0 +1,152 @@
+import json
+from array import array
+from typing import Iterable, List, Tuple
+import numpy as np
+
+from src.ml.index_io import save_arrays, load_arrays
+
+def parse_hierarchy(value) -> List[str]:
+    """Normalizes a stored hierarchy: list, JSON string, Postgres array literal or plain string."""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value if v]
+    value = str(value).strip()
+    if not value:
+        return []
+    if value.startswith("["):
+        try:
+            return [str(v) for v in json.loads(value) if v]
+        except ValueError:
+            pass
+    if value.startswith("{") and value.endswith("}"):
+        return [v.strip().strip('"') for v in value[1:-1].split(",") if v.strip().strip('"')]
+    return [value]
+
+class LegalGraph:
+    """
+    Bipartite chunk <-> section graph for GraphRAG expansion.
+
+    A section node is a hierarchy path prefix within one document, e.g. (doc 3, "Part I",
+    "Chapter 2"), so identically named chapters of different acts stay separate. Both
+    directions are stored as CSR arrays over compact integer ids:
+
+        chunk c    -> sections  chunk_sections[chunk_indptr[c]:chunk_indptr[c + 1]]
+        section s  -> chunks    section_chunks[section_indptr[s]:section_indptr[s + 1]]
+
+    Each section carries an idf-style weight, log(1 + chunks / members), so sharing a small,
+    specific section counts for more than sharing a whole Part.
+    """
+    ARRAYS = ("chunk_indptr", "chunk_sections", "section_indptr", "section_chunks", "section_weight")
+
+    def __init__(self, chunk_ids: List[str], chunk_indptr, chunk_sections, section_indptr, section_chunks, section_weight):
+        self.chunk_ids = chunk_ids
+        self.chunk_index = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+        self.chunk_indptr = chunk_indptr
+        self.chunk_sections = chunk_sections
+        self.section_indptr = section_indptr
+        self.section_chunks = section_chunks
+        self.section_weight = section_weight
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @property
+    def num_sections(self) -> int:
+        return len(self.section_indptr) - 1
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, int, object]]) -> "LegalGraph":
+        """Builds the graph from (chunk_id, document_id, hierarchy) rows."""
+        section_ids = {}
+        chunk_ids = []
+        chunk_indptr = array("q", [0])
+        chunk_sections = array("i")
+
+        for chunk_id, document_id, hierarchy in rows:
+            path = parse_hierarchy(hierarchy)
+            sections = {
+                section_ids.setdefault((document_id, *path[:depth]), len(section_ids))
+                for depth in range(1, len(path) + 1)
+            }
+            chunk_ids.append(chunk_id)
+            chunk_sections.extend(sorted(sections))
+            chunk_indptr.append(len(chunk_sections))
+
+        n_chunks, n_sections = len(chunk_ids), len(section_ids)
+        chunk_indptr = np.frombuffer(chunk_indptr, dtype=np.int64).copy()
+        chunk_sections = np.frombuffer(chunk_sections, dtype=np.int32).copy()
+
+        # Transpose chunk -> sections into section -> chunks
+        owners = np.repeat(np.arange(n_chunks, dtype=np.int32), np.diff(chunk_indptr))
+        order = np.argsort(chunk_sections, kind="stable")
+        section_chunks = owners[order]
+        sizes = np.bincount(chunk_sections, minlength=n_sections)
+        section_indptr = np.zeros(n_sections + 1, dtype=np.int64)
+        np.cumsum(sizes, out=section_indptr[1:])
+        section_weight = np.log1p(n_chunks / np.maximum(sizes, 1)).astype(np.float32)
+
+        return cls(chunk_ids, chunk_indptr, chunk_sections, section_indptr, section_chunks, section_weight)
+
+    def expand(self, chunk_ids: Iterable[str], limit: int = 5, max_hops: int = 1,
+               decay: float = 0.5, max_section_size: int = 1000) -> List[Tuple[str, float]]:
+        """
+        Ranks chunks related to `chunk_ids` (which are excluded) and returns the top `limit`
+        as (chunk_id, score). A neighbour's score sums the weights of the sections it shares
+        with the frontier; each further hop is scaled by `decay`. Sections larger than
+        `max_section_size` are too broad to be informative and are skipped.
+        """
+        seeds = [self.chunk_index[c] for c in chunk_ids if c in self.chunk_index]
+        if not seeds or limit <= 0:
+            return []
+
+        visited = set(seeds)
+        scores = {}
+        frontier = np.array(seeds, dtype=np.int64)
+        hop_weight = 1.0
+        for _ in range(max_hops):
+            sections = np.concatenate([
+                self.chunk_sections[self.chunk_indptr[c]:self.chunk_indptr[c + 1]] for c in frontier
+            ])
+            if not len(sections):
+                break
+            sections, shared = np.unique(sections, return_counts=True)
+
+            members, weights = [], []
+            for s, count in zip(sections, shared):
+                start, end = self.section_indptr[s], self.section_indptr[s + 1]
+                if end - start > max_section_size:
+                    continue
+                members.append(self.section_chunks[start:end])
+                weights.append(np.full(end - start, hop_weight * count * self.section_weight[s], dtype=np.float64))
+            if not members:
+                break
+
+            neighbours, inverse = np.unique(np.concatenate(members), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate(weights))
+
+            new = []
+            for node, score in zip(neighbours.tolist(), totals.tolist()):
+                if node in visited:
+                    continue
+                scores[node] = scores.get(node, 0.0) + score
+                new.append(node)
+            if not new:
+                break
+
+            # Only the strongest neighbours seed the next hop
+            new.sort(key=lambda n: -scores[n])
+            frontier = np.array(new[:limit * 4], dtype=np.int64)
+            visited.update(new)
+            hop_weight *= decay
+
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:limit]
+        return [(self.chunk_ids[node], score) for node, score in ranked]
+
+    def save(self, path: str):
+        save_arrays(path, {name: getattr(self, name) for name in self.ARRAYS}, {"chunk_ids": self.chunk_ids})
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "LegalGraph":
+        arrays, meta = load_arrays(path, cls.ARRAYS, mmap=mmap)
+        return cls(meta["chunk_ids"], **arrays)
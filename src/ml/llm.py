@@ -1,11 +1,12 @@
 import dspy
 from dspy import Signature, InputField, OutputField, Module, Predict
 from src.core.config import settings
+from typing import Iterator
 import os
 
 # 1. DSPy Adapter for llama-cpp-python
 class LlamaCppLM(dspy.LM):
-    def __init__(self, model_path: str, context_window: int = 4096, **kwargs):
+    def __init__(self, model_path: str, context_window: int = settings.LLM_CONTEXT_WINDOW, **kwargs):
         try:
             from llama_cpp import Llama
         except ImportError:
@@ -17,6 +18,7 @@ class LlamaCppLM(dspy.LM):
         if not os.path.exists(model_path):
              print(f"WARNING: Local model not found at {model_path}. Calls will fail.")
              self.llm = None
+             self.vocab = None
         else:
              print(f"Loading Local GGUF Model: {model_path}")
              self.llm = Llama(
@@ -25,13 +27,16 @@ class LlamaCppLM(dspy.LM):
                 n_gpu_layers=-1, # Try to offload all to GPU if available/supported, or 0 for CPU
                 verbose=False
              )
+             # Vocabulary only (no weights, no context) for token counting outside the scheduler;
+             # the full model above belongs to whichever scheduler worker is generating on it
+             self.vocab = Llama(model_path=model_path, vocab_only=True, verbose=False)
 
     def basic_request(self, prompt, **kwargs):
         if not self.llm:
             return ["Error: Model not loaded."]
             
         # Standard generation parameters
-        max_tokens = kwargs.get("max_tokens", 512)
+        max_tokens = kwargs.get("max_tokens", settings.LLM_MAX_TOKENS)
         temperature = kwargs.get("temperature", 0.7)
         
         output = self.llm(
@@ -46,12 +51,14 @@ class LlamaCppLM(dspy.LM):
 
 
 # 2. Signature
+ANSWER_INSTRUCTIONS = "Detailed answer in Bengali. Must cite sources from context."
+
 class LegalQASignature(Signature):
     """Answer legal questions based on the provided context in Bengali."""
     
     context = InputField(desc="Relevant legal documents and sections")
     question = InputField(desc="The user's legal question")
-    answer = OutputField(desc="Detailed answer in Bengali. Must cite sources from context.")
+    answer = OutputField(desc=ANSWER_INSTRUCTIONS)
 
 # 3. Module
 class BanglaRAG(Module):
@@ -62,6 +69,11 @@ class BanglaRAG(Module):
     def forward(self, context, question):
         return self.generate_answer(context=context, question=question)
 
+# Answers returned when generation could not run; never cached or treated as model output
+NOT_CONFIGURED_ANSWER = "Error: LLM not configured or model missing."
+FAILED_ANSWER = "Thinking..."
+FALLBACK_ANSWERS = {NOT_CONFIGURED_ANSWER, FAILED_ANSWER}
+
 # 4. Main Wrapper Class
 class BanglaLLM:
     def __init__(self):
@@ -90,17 +102,53 @@ class BanglaLLM:
         if self.lm:
             dspy.settings.configure(lm=self.lm)
 
+    @property
+    def local_model(self):
+        """The loaded llama.cpp model, or None for remote providers."""
+        return getattr(self.lm, "llm", None) if isinstance(self.lm, LlamaCppLM) else None
+
+    @property
+    def tokenizer(self):
+        """
+        llama.cpp tokenize/detokenize for exact prompt accounting; None for remote providers.
+        A separate vocab-only instance, safe to use while a scheduler worker generates.
+        """
+        return getattr(self.lm, "vocab", None) if isinstance(self.lm, LlamaCppLM) else None
+
+    def stream_response(self, context: str, query: str) -> Iterator[str]:
+        """
+        Yields the answer piece by piece as llama.cpp generates it. DSPy's Predict only returns
+        complete outputs, so the local model is prompted directly with the same instructions.
+        Remote providers yield the full DSPy answer as a single piece.
+        """
+        llama = self.local_model
+        if llama is None:
+            yield self.generate_response(context, query)
+            return
+
+        messages = [
+            {"role": "system", "content": f"{LegalQASignature.__doc__} {ANSWER_INSTRUCTIONS}"},
+            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"},
+        ]
+        for chunk in llama.create_chat_completion(
+            messages=messages,
+            max_tokens=settings.LLM_MAX_TOKENS,
+            temperature=0.7,
+            stream=True,
+        ):
+            piece = chunk["choices"][0]["delta"].get("content")
+            if piece:
+                yield piece
+
     def generate_response(self, context: str, query: str) -> str:
         if not self.lm:
-            return "Error: LLM not configured or model missing."
+            return NOT_CONFIGURED_ANSWER
             
-        # Ensure context is being used
-        # dspy.settings.configure(lm=self.lm) # Ensure context is set (globally or locally?)
-        # Global is fine for this single-threaded/simple app, but for async/concurrency we might need contexts
-        
         try:
-            response = self.rag_module(context=context, question=query)
+            # Per-call LM, so several instances can run on separate scheduler workers
+            with dspy.context(lm=self.lm):
+                response = self.rag_module(context=context, question=query)
             return response.answer
         except Exception as e:
             print(f"LLM Generation Error: {e}")
-            return "Thinking..." # Fallback or error message
+            return FAILED_ANSWER
@@ -1,16 +1,167 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from src.core.config import settings
 from src.ml.embeddings import BanglaEmbedding
 
+# Per-model load state for /health/ready: {"state": loading|ready|failed, "seconds": float, "error": str}
+model_status = {}
+_loaded_events = {} # name -> Event set once loading finished (either way)
+
+# Chat needs these; the others only improve retrieval and are skipped if they fail
+REQUIRED_MODELS = ("embedding", "llm", "llm_scheduler")
+
 class ModelLoader:
     @staticmethod
     def load_embedding_model():
         print(f"Loading Embedding Model from {settings.EMBEDDING_MODEL_PATH}...")
         return BanglaEmbedding(model_path=settings.EMBEDDING_MODEL_PATH)
 
+    @staticmethod
+    def load_bm25_index():
+        """Memory-maps the persisted BM25 index, building it from the database if missing."""
+        import os
+        from src.ml.bm25 import BM25Index
+        if os.path.exists(settings.BM25_INDEX_PATH):
+            print(f"Loading BM25 Index from {settings.BM25_INDEX_PATH}...")
+            return BM25Index.load(settings.BM25_INDEX_PATH)
+        
+        from src.services.ingestion_service import IngestionService
+        return IngestionService.rebuild_bm25_index()
+
+    @staticmethod
+    def load_legal_graph():
+        """
+        Memory-maps the persisted legal hierarchy graph, building it from the database if missing.
+        Returns None if neither works (e.g. before migrations); answers then skip graph expansion.
+        """
+        import os
+        from src.ml.legal_graph import LegalGraph
+        try:
+            if os.path.exists(settings.GRAPH_INDEX_PATH):
+                print(f"Loading Legal Graph from {settings.GRAPH_INDEX_PATH}...")
+                return LegalGraph.load(settings.GRAPH_INDEX_PATH)
+
+            from src.services.ingestion_service import IngestionService
+            return IngestionService.rebuild_legal_graph()
+        except Exception as e:
+            print(f"WARNING: Legal graph unavailable ({e}). Graph expansion disabled.")
+            return None
+
     @staticmethod
     def load_llm_model():
         from src.ml.llm import BanglaLLM
         return BanglaLLM()
 
+    @staticmethod
+    def load_result_cache():
+        """Retrieval result cache, or None when disabled."""
+        if not settings.RESULT_CACHE_ENABLED:
+            return None
+        from src.ml.result_cache import ResultCache
+        return ResultCache(max_bytes=settings.RESULT_CACHE_MAX_MB * 1024 * 1024)
+
+    @staticmethod
+    def load_answer_cache():
+        """Semantic answer cache, or None when disabled."""
+        if not settings.ANSWER_CACHE_ENABLED:
+            return None
+        from src.ml.embeddings import EMBEDDING_DIM
+        from src.ml.semantic_cache import SemanticCache
+        return SemanticCache(
+            dim=EMBEDDING_DIM,
+            capacity=settings.ANSWER_CACHE_SIZE,
+            threshold=settings.ANSWER_CACHE_THRESHOLD,
+            ttl=settings.ANSWER_CACHE_TTL_SECONDS,
+        )
+
+    @staticmethod
+    def load_llm_scheduler(llm):
+        """Serves `llm` plus LLM_WORKERS - 1 more instances, one worker thread each."""
+        from src.ml.scheduler import InferenceScheduler
+        models = [llm] + [ModelLoader.load_llm_model() for _ in range(settings.LLM_WORKERS - 1)]
+        return InferenceScheduler(models, queue_size=settings.LLM_QUEUE_SIZE)
+
+    @staticmethod
+    def _load(name: str, load, *args):
+        """Loads one model into ml_models, recording its state and duration."""
+        model_status[name] = {"state": "loading", "seconds": None}
+        _loaded_events.setdefault(name, threading.Event())
+        start = time.monotonic()
+        try:
+            ml_models[name] = load(*args)
+            model_status[name] = {"state": "ready", "seconds": round(time.monotonic() - start, 2)}
+        except Exception as e:
+            print(f"ERROR: Loading {name} failed: {e}")
+            model_status[name] = {"state": "failed", "seconds": round(time.monotonic() - start, 2), "error": str(e)}
+        finally:
+            _loaded_events[name].set()
+
+    @staticmethod
+    def _mark_loading():
+        """Marks every model up front, so readiness never reports a partial picture."""
+        names = ["embedding", "llm", "llm_scheduler", "graph"] + (["bm25"] if settings.SPARSE_BACKEND == "bm25" else [])
+        for name in names:
+            model_status.setdefault(name, {"state": "loading", "seconds": None})
+            _loaded_events.setdefault(name, threading.Event())
+
+    @staticmethod
+    def load_all():
+        """
+        Loads every model, independent ones in parallel: torch and llama.cpp spend load time
+        in file I/O and native code, so threads overlap well. Blocks until all are done.
+        """
+        def load_llm():
+            ModelLoader._load("llm", ModelLoader.load_llm_model)
+            if "llm" in ml_models:
+                ModelLoader._load("llm_scheduler", ModelLoader.load_llm_scheduler, ml_models["llm"])
+
+        tasks = [lambda: ModelLoader._load("embedding", ModelLoader.load_embedding_model), load_llm]
+        if settings.SPARSE_BACKEND == "bm25":
+            tasks.append(lambda: ModelLoader._load("bm25", ModelLoader.load_bm25_index))
+        tasks.append(lambda: ModelLoader._load("graph", ModelLoader.load_legal_graph))
+        ModelLoader._mark_loading()
+
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="model-loader") as pool:
+            for future in [pool.submit(task) for task in tasks]:
+                future.result()
+        if "llm" not in ml_models:
+            # The scheduler never started; don't leave it "loading" forever
+            model_status["llm_scheduler"] = {"state": "failed", "seconds": 0.0, "error": "LLM failed to load"}
+            _loaded_events["llm_scheduler"].set()
+
+    @staticmethod
+    def start_background_loading(on_done=None) -> threading.Thread:
+        """Runs load_all() on a daemon thread so the app serves non-ML routes immediately."""
+        ModelLoader._mark_loading()
+
+        def run():
+            ModelLoader.load_all()
+            if on_done:
+                on_done()
+        thread = threading.Thread(target=run, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def wait_for(name: str, timeout: float = None):
+        """Waits for a background load in progress; returns the model, or None if not loaded."""
+        event = _loaded_events.get(name)
+        if event is not None:
+            event.wait(timeout)
+        return ml_models.get(name)
+
+    @staticmethod
+    def is_ready() -> bool:
+        return all(model_status.get(name, {}).get("state") == "ready" for name in REQUIRED_MODELS)
+
+    @staticmethod
+    def failed_models() -> dict:
+        """Required models that failed to load, {name: error}; chat stays unavailable until a restart."""
+        return {
+            name: model_status[name].get("error")
+            for name in REQUIRED_MODELS if model_status.get(name, {}).get("state") == "failed"
+        }
+
 # Global dictionary to hold loaded models
 ml_models = {}
@@ -1,148 +1,396 @@
-from src.data.models import LegalChunk, LegalDocument
-from sqlalchemy import or_
-from qdrant_client import QdrantClient
+from src.data.models import LegalChunk
+from src.ml.tokenizer import tokenize, normalize
+from src.ml.fusion import fuse, resolve_params
+from src.ml.context import ContextPacker, context_budget
+from src.data.crud.legal import (
+    get_chunks_by_chunk_ids, get_document_ids_matching, chunk_filter_conditions, get_chunk_ids_matching
+)
+from src.data.schemas import RetrievalParams, RetrievalFilters
+from src.core.config import settings
+from src.ml.vector_store import COLLECTION_NAME, search_params
+from src.ml.legal_graph import parse_hierarchy
+from sqlalchemy import or_, func, literal_column, text
+from sqlalchemy.orm import Session, joinedload
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from concurrent.futures import ThreadPoolExecutor
+from prometheus_client import Counter
+from typing import NamedTuple, Optional, Tuple
+import asyncio
+
+# Shared pool for the blocking parts of retrieval (SQL, BM25, query embedding)
+_retrieval_pool = ThreadPoolExecutor(max_workers=settings.RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+async def run_blocking(fn, *args):
+    """Runs sync SQL/CPU work on the retrieval pool, keeping the event loop and Starlette's threadpool free."""
+    return await asyncio.get_running_loop().run_in_executor(_retrieval_pool, fn, *args)
+
+RETRIEVER_FAILURES = Counter("retriever_failures_total", "Retriever calls dropped from hybrid search", ["retriever", "reason"])
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class SearchScope(NamedTuple):
+    """RetrievalFilters resolved against SQL once per query. None fields don't restrict."""
+    filenames: Optional[Tuple[str, ...]]
+    document_ids: Optional[Tuple[int, ...]]
+    hierarchy: Optional[Tuple[str, ...]]
+
+    @property
+    def empty(self) -> bool:
+        return self.document_ids is not None and not self.document_ids
+
+def _matches(chunk, filters: RetrievalFilters) -> bool:
+    """In-Python filter check for chunks that don't come from a filtered retriever (graph expansion)."""
+    if filters is None or not filters.active:
+        return True
+    document = chunk.document
+    if filters.source_files is not None and (document is None or document.filename not in filters.source_files):
+        return False
+    if filters.date_from is not None or filters.date_to is not None:
+        document_date = document.document_date if document else None
+        if document_date is None:
+            return False
+        if filters.date_from is not None and document_date < filters.date_from:
+            return False
+        if filters.date_to is not None and document_date > filters.date_to:
+            return False
+    return not filters.hierarchy or set(filters.hierarchy) <= set(parse_hierarchy(chunk.hierarchy))
 
 class LegalRAG:
-    def __init__(self, db_session, qdrant_client: QdrantClient, embedder, llm):
+    """
+    Retrieval runs on the event loop: dense search awaits Qdrant, and SQL/CPU steps run on the
+    retrieval pool via run_blocking(), so no request thread blocks on I/O.
+    """
+    def __init__(self, db_session, qdrant_client: AsyncQdrantClient, embedder, llm, sparse_index=None, graph=None, result_cache=None):
         self.db = db_session
         self.qdrant = qdrant_client
         self.embedder = embedder
         self.llm = llm
+        self.sparse_index = sparse_index # Optional in-process BM25Index
+        self.graph = graph # Optional LegalGraph for hierarchy expansion
+        self.result_cache = result_cache # Optional ResultCache shared across requests
+
+    async def _cached(self, kind: str, key: tuple, compute):
+        """
+        Serves `await compute()` from the result cache. `compute` returns (results, cacheable) so
+        degraded results (a retriever timed out) are returned but not stored.
+        """
+        if self.result_cache is None:
+            return (await compute())[0]
+        key, cached, version = self._cache_get(kind, key)
+        if cached is not None:
+            return cached
+        results, cacheable = await compute()
+        if cacheable:
+            self.result_cache.put(key, [dict(r) for r in results], version)
+        return results
+
+    def _cache_get(self, kind: str, key: tuple):
+        """Returns (normalized key, a copy of the cached results or None, version to store under)."""
+        key = (kind, " ".join(normalize(key[0]).split()), *key[1:])
+        version = self.result_cache.version
+        cached = self.result_cache.get(key, kind)
+        if cached is not None:
+            cached = [dict(r) for r in cached] # Callers may add keys to result dicts
+        return key, cached, version
+
+    def _resolve_scope(self, filters: RetrievalFilters = None) -> Optional[SearchScope]:
+        """Turns document-level filters (source file, date) into document ids with one indexed query."""
+        if filters is None or not filters.active:
+            return None
+        filenames = document_ids = None
+        if filters.scopes_documents:
+            documents = get_document_ids_matching(self.db, filters.source_files, filters.date_from, filters.date_to)
+            filenames, document_ids = tuple(sorted(documents)), tuple(documents[f] for f in sorted(documents))
+        return SearchScope(filenames, document_ids, tuple(filters.hierarchy) if filters.hierarchy else None)
+
+    @staticmethod
+    def _qdrant_filter(scope: SearchScope = None) -> Optional[models.Filter]:
+        """Payload filter on the indexed source_file/hierarchy fields, applied during the HNSW search."""
+        if scope is None:
+            return None
+        must = []
+        if scope.filenames is not None:
+            must.append(models.FieldCondition(key="source_file", match=models.MatchAny(any=list(scope.filenames))))
+        for section in scope.hierarchy or ():
+            must.append(models.FieldCondition(key="hierarchy", match=models.MatchValue(value=section)))
+        return models.Filter(must=must)
 
-    def _vector_search(self, query: str, limit: int = 10):
-        """Returns list of dicts: {'content': str, 'source': str, 'score': float, 'payload': dict}"""
-        query_vector = self.embedder.encode(query)
-        hits = self.qdrant.query_points(
-            collection_name="bangla_legal",
+    async def _vector_search(self, query: str, limit: int = 10, scope: SearchScope = None):
+        """
+        Returns ids and scores only, like BM25; text is hydrated from SQL after fusion.
+        Only embedding the query takes a pool thread.
+        """
+        async def search():
+            query_vector = await run_blocking(self.embedder.encode, query)
+            response = await self.qdrant.query_points(**self._dense_query(query_vector, limit, scope))
+            return self._dense_results(response.points), True
+        return await self._cached("dense", (query, limit, scope), search)
+
+    def _dense_query(self, query_vector, limit: int, scope: SearchScope = None) -> dict:
+        return dict(
+            collection_name=COLLECTION_NAME,
             query=query_vector,
-            limit=limit
-        ).points
-        
+            query_filter=self._qdrant_filter(scope),
+            limit=limit,
+            search_params=search_params(),
+            with_payload=["chunk_id"],
+        )
+
+    @staticmethod
+    def _dense_results(hits):
         results = []
         for hit in hits:
-            payload = hit.payload or {}
-            source = payload.get('source_file', 'Unknown')
-            content = payload.get('text', '')
+            chunk_id = (hit.payload or {}).get('chunk_id')
             results.append({
-                'content': content,
-                'source': source,
+                'content': None,
+                'source': None,
                 'score': hit.score,
-                'payload': payload,
-                'id': payload.get('chunk_id') # critical for dedup
+                'payload': {'chunk_id': chunk_id},
+                'id': chunk_id # critical for dedup
             })
         return results
 
-    def _keyword_search(self, query: str, limit: int = 10):
-        """Sparse search using SQL ILIKE"""
-        # 1. Try phrase match first (High precision)
-        results = self.db.query(LegalChunk).join(LegalDocument).filter(
-            LegalChunk.content.ilike(f"%{query}%")
-        ).limit(limit).all()
+    def _keyword_search(self, query: str, limit: int = 10, db=None, scope: SearchScope = None):
+        """Sparse search: in-process BM25 if loaded, else indexed full-text search on Postgres, else ILIKE scan (SQLite in tests)"""
+        db = db or self.db
+        conditions = chunk_filter_conditions(db, scope.document_ids, scope.hierarchy) if scope else []
+        if self.sparse_index is not None:
+            allowed = get_chunk_ids_matching(db, conditions) if scope else None
+            return self._keyword_search_bm25(query, limit, allowed)
+        if db.get_bind().dialect.name == "postgresql":
+            return self._keyword_search_postgres(query, limit, db, conditions)
+        return self._keyword_search_fallback(query, limit, db, conditions)
+
+    def _keyword_search_bm25(self, query: str, limit: int, allowed=None):
+        """Returns ids and scores only; text is hydrated after fusion for the hits that survive"""
+        return [
+            {
+                'content': None,
+                'source': None,
+                'score': score,
+                'payload': {'chunk_id': chunk_id},
+                'id': chunk_id
+            }
+            for chunk_id, score in self.sparse_index.search(query, limit, allowed)
+        ]
+
+    def _hydrate(self, results):
+        """
+        Fills in text/source for results that carry only a chunk id (all dense and BM25 hits),
+        in one batched query. SQL is the only store of chunk text.
+        """
+        missing = [r['id'] for r in results if r['content'] is None]
+        if not missing:
+            return results
+        chunks = get_chunks_by_chunk_ids(self.db, missing)
+        hydrated = []
+        for r in results:
+            if r['content'] is None:
+                chunk = chunks.get(r['id'])
+                if chunk is None:
+                    continue # Deleted since the index was built
+                r = {**r, **self._format_chunk(chunk, r['score'])}
+            hydrated.append(r)
+        return hydrated
+
+    def _keyword_search_postgres(self, query: str, limit: int, db, conditions=()):
+        """
+        Uses the GIN indexes from migration c5d8f0a3b217:
+        1. Full-text match on any query term, ranked by ts_rank_cd (High recall)
+        2. Phrase substring match via the trigram index, ranked by word_similarity (High precision)
+        """
+        results = {} # chunk.id -> (chunk, score)
         
-        # 2. If not enough, try word match (High recall)
-        if len(results) < limit:
-            words = [w for w in query.split() if len(w) > 4] # Filter stopwords roughly
-            if words:
-                conditions = [LegalChunk.content.ilike(f"%{w}%") for w in words]
-                more_results = self.db.query(LegalChunk).join(LegalDocument).filter(
-                    or_(*conditions)
-                ).limit(limit).all()
-                
-                # Merge uniqueness
-                existing_ids = {r.id for r in results}
-                for r in more_results:
-                    if r.id not in existing_ids:
-                        results.append(r)
+        terms = tokenize(query)
+        if terms:
+            # 'simple' config: Postgres has no Bangla stemmer. The expression must match the index.
+            tsv = func.to_tsvector(literal_column("'simple'::regconfig"), func.coalesce(LegalChunk.content, ''))
+            tsq = func.to_tsquery(literal_column("'simple'::regconfig"), " | ".join(terms))
+            rank = func.ts_rank_cd(tsv, tsq, 32) # 32: rank / (rank + 1), keeps scores in [0, 1)
+            rows = db.query(LegalChunk, rank).options(joinedload(LegalChunk.document)).filter(
+                tsv.op("@@")(tsq), *conditions
+            ).order_by(rank.desc()).limit(limit).all()
+            for chunk, score in rows:
+                results[chunk.id] = (chunk, float(score))
         
-        # Format
-        formatted = []
-        for r in results[:limit]:
-            source = r.document.filename if r.document else "Unknown"
-            formatted.append({
-                'content': r.content,
-                'source': source,
-                'score': 1.0, # Keyword matches don't have granularity in ILIKE without TSVector
-                'payload': {'chunk_id': r.chunk_id, 'hierarchy': r.hierarchy, 'source_file': source, 'text': r.content},
-                'id': r.chunk_id
-            })
-        return formatted
-
-    def hybrid_search(self, query: str, k: int = 60):
-        """Reciprocal Rank Fusion (RRF)"""
-        limit = 10
-        vec_results = self._vector_search(query, limit)
-        kw_results = self._keyword_search(query, limit)
+        phrase = query.strip()
+        if phrase:
+            similarity = func.word_similarity(phrase, LegalChunk.content)
+            rows = db.query(LegalChunk, similarity).options(joinedload(LegalChunk.document)).filter(
+                LegalChunk.content.ilike(f"%{_escape_like(phrase)}%", escape="\\"), *conditions
+            ).order_by(similarity.desc()).limit(limit).all()
+            for chunk, score in rows:
+                # An exact phrase hit outranks any term-only match
+                score = 1.0 + float(score)
+                if chunk.id not in results or results[chunk.id][1] < score:
+                    results[chunk.id] = (chunk, score)
         
-        # Map: chunk_id -> score
-        rrf_score = {}
+        ranked = sorted(results.values(), key=lambda x: x[1], reverse=True)
+        return [self._format_chunk(chunk, score) for chunk, score in ranked[:limit]]
+
+    def _keyword_search_fallback(self, query: str, limit: int, db, conditions=()):
+        """Unindexed ILIKE scan, scored by the fraction of query terms present"""
+        # 1. Try phrase match first (High precision)
+        results = db.query(LegalChunk).options(joinedload(LegalChunk.document)).filter(
+            LegalChunk.content.ilike(f"%{_escape_like(query)}%", escape="\\"), *conditions
+        ).limit(limit).all()
+        phrase_ids = {r.id for r in results}
         
-        # 1. Process Vector Ranks
-        for rank, res in enumerate(vec_results):
-            cid = res['id']
-            if cid not in rrf_score:
-                rrf_score[cid] = {'data': res, 'score': 0}
-            rrf_score[cid]['score'] += 1 / (k + rank + 1)
+        # 2. If not enough, try word match (High recall)
+        terms = tokenize(query)
+        if len(results) < limit and terms:
+            term_conditions = [LegalChunk.content.ilike(f"%{_escape_like(t)}%", escape="\\") for t in terms]
+            more_results = db.query(LegalChunk).options(joinedload(LegalChunk.document)).filter(
+                or_(*term_conditions), *conditions
+            ).limit(limit).all()
             
-        # 2. Process Keyword Ranks
-        for rank, res in enumerate(kw_results):
-            cid = res['id']
-            if cid not in rrf_score:
-                rrf_score[cid] = {'data': res, 'score': 0}
-            rrf_score[cid]['score'] += 1 / (k + rank + 1)
+            # Merge uniqueness
+            existing_ids = {r.id for r in results}
+            for r in more_results:
+                if r.id not in existing_ids:
+                    results.append(r)
         
-        # Sort by RRF score
-        sorted_docs = sorted(rrf_score.values(), key=lambda x: x['score'], reverse=True)
-        
-        return [item['data'] for item in sorted_docs[:5]] # Top 5 fused
+        scored = []
+        for r in results:
+            content_terms = set(tokenize(r.content or ""))
+            overlap = sum(1 for t in terms if t in content_terms) / len(terms) if terms else 0.0
+            # An exact phrase hit outranks any term-only match
+            scored.append((r, overlap + (1.0 if r.id in phrase_ids else 0.0)))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return [self._format_chunk(r, score) for r, score in scored[:limit]]
+
+    @staticmethod
+    def _format_chunk(r, score: float):
+        source = r.document.filename if r.document else "Unknown"
+        return {
+            'content': r.content,
+            'source': source,
+            'score': score,
+            'payload': {'chunk_id': r.chunk_id, 'hierarchy': r.hierarchy, 'source_file': source, 'token_count': r.token_count},
+            'id': r.chunk_id
+        }
+
+    def _isolated_keyword_search(self, query: str, limit: int, scope: SearchScope = None):
+        """Keyword search on its own session, since it runs on a pool thread and may outlive its timeout"""
+        if self.sparse_index is not None and scope is None:
+            return self._keyword_search_bm25(query, limit)
+        with Session(bind=self.db.get_bind()) as db:
+            if db.get_bind().dialect.name == "postgresql":
+                # Don't let an abandoned query keep running server-side
+                db.execute(text(f"SET LOCAL statement_timeout = {int(settings.SPARSE_TIMEOUT_SECONDS * 1000)}"))
+            return self._keyword_search(query, limit, db, scope)
+
+    async def _retrieve(self, query: str, dense_depth: int, sparse_depth: int, filters: RetrievalFilters = None):
+        """
+        Runs dense and sparse retrieval concurrently, so latency is max(dense, sparse) rather
+        than the sum. A retriever that errors or exceeds its timeout contributes no results
+        and is reported in the returned `failed` set. Filters are pushed down into both
+        retrievers (Qdrant payload filter, SQL predicates or a BM25 candidate set).
+        """
+        results = {"dense": [], "sparse": []}
+        failed = set()
+        scope = await run_blocking(self._resolve_scope, filters)
+        if scope is not None and scope.empty:
+            return results, failed # No document passes the filters
+
+        calls = {}
+        if dense_depth > 0:
+            calls["dense"] = (self._vector_search(query, dense_depth, scope), settings.DENSE_TIMEOUT_SECONDS)
+        if sparse_depth > 0:
+            calls["sparse"] = (run_blocking(self._isolated_keyword_search, query, sparse_depth, scope), settings.SPARSE_TIMEOUT_SECONDS)
+
+        outcomes = await asyncio.gather(
+            *(asyncio.wait_for(call, timeout) for call, timeout in calls.values()), return_exceptions=True
+        )
+        for (name, (_, timeout)), outcome in zip(calls.items(), outcomes):
+            if isinstance(outcome, Exception):
+                self._report_failure(name, outcome, timeout)
+                failed.add(name)
+            else:
+                results[name] = outcome
+        return results, failed
+
+    @staticmethod
+    def _report_failure(name: str, error: Exception, timeout: float):
+        if isinstance(error, asyncio.TimeoutError):
+            print(f"WARNING: {name} retrieval timed out after {timeout}s; continuing without it.")
+            RETRIEVER_FAILURES.labels(retriever=name, reason="timeout").inc()
+        else:
+            print(f"WARNING: {name} retrieval failed: {error}; continuing without it.")
+            RETRIEVER_FAILURES.labels(retriever=name, reason="error").inc()
+
+    @staticmethod
+    def _retrieval_args(params: RetrievalParams) -> dict:
+        return dict(
+            dense_depth=params.dense_depth if params.dense_weight > 0 else 0,
+            sparse_depth=params.sparse_depth if params.sparse_weight > 0 else 0,
+            filters=params.filters,
+        )
+
+    @staticmethod
+    def _fuse(ranked, params: RetrievalParams):
+        return fuse(
+            ranked,
+            weights={"dense": params.dense_weight, "sparse": params.sparse_weight},
+            method=params.fusion_method,
+            k=params.rrf_k,
+            top_k=params.top_k,
+        )
 
-    def search_and_answer(self, query: str):
+    async def hybrid_search(self, query: str, params: RetrievalParams = None):
+        """Fuses dense and sparse results (RRF or weighted scores), configured by Settings and per-request params"""
+        params = resolve_params(params)
+
+        async def search():
+            ranked, failed = await self._retrieve(query, **self._retrieval_args(params))
+            return await run_blocking(self._hydrate, self._fuse(ranked, params)), not failed
+
+        return await self._cached("hybrid", (query, params.model_dump_json()), search)
+
+    def _expand(self, hits, filters: RetrievalFilters = None):
+        """Chunks sharing the most specific hierarchy sections with the hits, hydrated in one query."""
+        if self.graph is None or not hits:
+            return []
+        related = self.graph.expand(
+            [str(h['id']) for h in hits if h.get('id')],
+            limit=settings.GRAPH_EXPANSION_LIMIT,
+            max_hops=settings.GRAPH_MAX_HOPS,
+            max_section_size=settings.GRAPH_MAX_SECTION_SIZE,
+        )
+        chunks = get_chunks_by_chunk_ids(self.db, [chunk_id for chunk_id, _ in related])
+        return [
+            chunks[chunk_id] for chunk_id, _ in related
+            if chunk_id in chunks and _matches(chunks[chunk_id], filters)
+        ]
+
+    async def build_context(self, query: str, params: RetrievalParams = None):
+        """Returns (prompt context, ids of the chunks packed into it)."""
         # 1. Hybrid Retrieval
-        hits = self.hybrid_search(query)
-        
-        # 2. Graph Expansion
-        related_sections = set()
-        context_texts = []
-        sources = set()
-        
-        for hit in hits:
-            # Add the direct hit
-            payload = hit['payload']
-            source = payload.get('source_file', 'Unknown')
-            context_texts.append(f"Source: {source}\nContent: {payload['text']}")
-            
-            # Extract hierarchy tags (nodes)
-            if 'hierarchy' in payload and payload['hierarchy']:
-                val = payload['hierarchy']
-                # Sometimes it's a string in SQL/Postgres return, list in Qdrant
-                if isinstance(val, list):
-                     for section in val: related_sections.add(section)
-                elif isinstance(val, str):
-                     # naive parse if needed or just skip
-                     pass
-
-        # 3. SQL Graph Query
-        if related_sections:
-            graph_hits = self.db.query(LegalChunk).filter(
-                LegalChunk.hierarchy.op("&&")(list(related_sections))
-            ).limit(5).all()
-            
-            for chunk in graph_hits:
-                source = chunk.document.filename if chunk.document else "Unknown"
-                context_texts.append(f"Source: {source}\nContent: {chunk.content}")
+        params = resolve_params(params)
+        hits = await self.hybrid_search(query, params)
+        return await run_blocking(self._assemble, query, hits, params)
+
+    def _assemble(self, query: str, hits, params: RetrievalParams):
+        # 2. Graph Expansion (precomputed hierarchy graph, no per-query SQL scan)
+        related = [self._format_chunk(chunk, 0.0) for chunk in self._expand(hits, params.filters)]
+
+        # 3. Pack into the token budget, best fused score first
+        packer = ContextPacker(tokenizer=getattr(self.llm, "tokenizer", None))
+        budget = context_budget(packer.count(query))
+        packed, used = packer.pack(hits + related, budget)
         
-        # 4. Generate Answer
         print("\n" + "="*50)
         print(f"🔍 HYBRID RETRIEVAL DEBUG INFO for query: '{query}'")
+        print(f"Context: {len(packed)}/{len(hits) + len(related)} chunks, {used}/{budget} tokens")
         print("="*50)
         
-        unique_contexts = list(set(context_texts))
-        for i, ctx in enumerate(unique_contexts):
-            lines = ctx.split('\n')
-            source_line = lines[0] if lines else "Unknown Source"
-            content_snippet = lines[1][:100] + "..." if len(lines) > 1 else "No content"
-            print(f"[{i+1}] {source_line} | Snippet: {content_snippet}")
+        for i, item in enumerate(packed):
+            snippet = (item['content'] or "")[:100] + "..."
+            trimmed = " (trimmed)" if item.get('trimmed') else ""
+            print(f"[{i+1}] Source: {item['source']}{trimmed} | Snippet: {snippet}")
             
         print("="*50 + "\n")
 
-        final_context = "\n\n".join(unique_contexts)
-        return self.llm.generate_response(final_context, query)
+        return packer.render(packed), [item['id'] for item in packed if item.get('id')]
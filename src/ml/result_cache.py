@@ -0,0 +1,76 @@
+import sys
+import threading
+from collections import OrderedDict
+from prometheus_client import Counter, Gauge
+
+RESULT_CACHE_LOOKUPS = Counter("retrieval_cache_lookups_total", "Retrieval result cache lookups", ["kind", "result"])
+RESULT_CACHE_BYTES = Gauge("retrieval_cache_bytes", "Approximate memory held by the retrieval result cache")
+
+def estimate_size(obj) -> int:
+    """Approximate deep size of retrieval results (lists/dicts of strings and numbers)."""
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(estimate_size(v) for v in obj)
+    return sys.getsizeof(obj)
+
+class ResultCache:
+    """
+    LRU cache for retrieval results, bounded by approximate memory rather than entry count,
+    since a result list's size depends on chunk lengths and retrieval depth.
+
+    `version` follows the shared corpus version (see get_corpus_version); set_version()
+    drops every entry when it moves, whichever process ran the ingestion. Results computed
+    against the old corpus but stored afterwards are refused, because put() checks the
+    version the caller read before retrieving.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.version = 0
+        self._entries = OrderedDict() # key -> (value, size), least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key, kind: str = "default"):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                self._entries.move_to_end(key)
+        RESULT_CACHE_LOOKUPS.labels(kind=kind, result="hit" if item else "miss").inc()
+        return item[0] if item else None
+
+    def put(self, key, value, version: int = None):
+        """Stores `value`; pass the `version` read before computing it so stale results never land."""
+        version = self.version if version is None else version
+        size = estimate_size(key) + estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+            RESULT_CACHE_BYTES.set(self._bytes)
+
+    def set_version(self, version: int):
+        """Adopts corpus version `version`, dropping every entry if it moved."""
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self._entries.clear()
+            self._bytes = 0
+            RESULT_CACHE_BYTES.set(0)
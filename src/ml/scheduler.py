@@ -0,0 +1,204 @@
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from typing import AsyncIterator, Callable, Iterator, List, Optional
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.core.exceptions import InferenceQueueFullException, InferenceTimeoutException
+
+# Lower value is served first; FIFO within a lane
+LANES = {"interactive": 0, "default": 1, "batch": 2}
+
+QUEUE_DEPTH = Gauge("llm_queue_depth", "LLM requests waiting for a worker", ["lane"])
+WORKERS_BUSY = Gauge("llm_workers_busy", "LLM workers currently running a request")
+QUEUE_WAIT = Histogram("llm_queue_wait_seconds", "Time LLM requests spend queued", ["lane"])
+REJECTED = Counter("llm_requests_rejected_total", "LLM requests rejected or abandoned", ["lane", "reason"])
+
+_STREAM_END = object()
+
+class _Task:
+    __slots__ = ("fn", "lane", "deadline", "enqueued", "future", "cancelled")
+
+    def __init__(self, fn, lane: str, deadline: Optional[float], cancelled: threading.Event = None):
+        self.fn = fn
+        self.lane = lane
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.future = Future()
+        self.cancelled = cancelled or threading.Event() # Set by a stream consumer that went away
+
+class InferenceScheduler:
+    """
+    Owns the LLM instances: one worker thread per instance, so a llama.cpp model is never
+    called from two threads at once. Requests wait in a bounded priority queue; when it is
+    full, submit() raises InferenceQueueFullException (HTTP 429) instead of piling up.
+    A request whose deadline passes while queued is dropped without touching the model.
+    """
+    def __init__(self, models: List, queue_size: int = 16, name: str = "llm"):
+        self._queue = queue.PriorityQueue(maxsize=queue_size)
+        self._seq = itertools.count()
+        self._depth = {lane: 0 for lane in LANES}
+        self._depth_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._worker, args=(model,), name=f"{name}-worker-{i}", daemon=True)
+            for i, model in enumerate(models)
+        ]
+        for t in self._threads:
+            t.start()
+
+    @property
+    def workers(self) -> int:
+        return len(self._threads)
+
+    def depth(self, lane: str = None) -> int:
+        with self._depth_lock:
+            return self._depth[lane] if lane else sum(self._depth.values())
+
+    def _track(self, lane: str, delta: int):
+        with self._depth_lock:
+            self._depth[lane] += delta
+            QUEUE_DEPTH.labels(lane=lane).set(self._depth[lane])
+
+    def _enqueue(self, fn: Callable, lane: str, timeout: Optional[float], cancelled: threading.Event = None) -> _Task:
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        task = _Task(fn, lane, time.monotonic() + timeout if timeout else None, cancelled)
+        self._track(lane, 1)
+        try:
+            self._queue.put_nowait((LANES[lane], next(self._seq), task))
+        except queue.Full:
+            self._track(lane, -1)
+            REJECTED.labels(lane=lane, reason="queue_full").inc()
+            raise InferenceQueueFullException()
+        return task
+
+    def submit(self, fn: Callable, lane: str = "default", timeout: float = None) -> Future:
+        """Queues fn(model) and returns its Future. `timeout` bounds queueing plus execution."""
+        return self._enqueue(fn, lane, timeout).future
+
+    def run(self, fn: Callable, lane: str = "default", timeout: float = None):
+        """Blocking submit. A request still queued at its deadline never runs."""
+        future = self.submit(fn, lane, timeout)
+        try:
+            return future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            # Only succeeds while still queued; a running llama.cpp call can't be interrupted
+            future.cancel()
+            REJECTED.labels(lane=lane, reason="timeout").inc()
+            raise InferenceTimeoutException()
+
+    async def arun(self, fn: Callable, lane: str = "default", timeout: float = None):
+        """run() for the event loop: awaits the worker's Future instead of blocking a thread on it."""
+        future = self.submit(fn, lane, timeout)
+        try:
+            # On timeout the wrapper is cancelled, which cancels the Future if still queued
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            REJECTED.labels(lane=lane, reason="timeout").inc()
+            raise InferenceTimeoutException()
+
+    @staticmethod
+    def _producer(fn: Callable, put: Callable, stop: threading.Event):
+        """Worker-side half of a stream: runs fn(model) and hands each item to `put`."""
+        def produce(model):
+            try:
+                for piece in fn(model):
+                    if stop.is_set():
+                        break
+                    put(piece)
+            except Exception as e:
+                put(e)
+            finally:
+                put(_STREAM_END)
+        return produce
+
+    def stream(self, fn: Callable, lane: str = "default", timeout: float = None) -> Iterator:
+        """
+        Queues fn(model), which returns an iterator, and returns an iterator over its items
+        as the worker produces them. Admission happens here, before the first item is read,
+        so a full queue is reported before a response starts. `timeout` bounds time to first
+        item. Closing the returned iterator stops generation at the next item.
+        """
+        pieces = queue.Queue()
+        stop = threading.Event()
+        task = self._enqueue(self._producer(fn, pieces.put, stop), lane, timeout, cancelled=stop)
+        return self._consume(pieces, task, lane, timeout)
+
+    def astream(self, fn: Callable, lane: str = "default", timeout: float = None) -> AsyncIterator:
+        """stream() for the event loop: items are handed over with call_soon_threadsafe, so no thread waits on them."""
+        loop = asyncio.get_running_loop()
+        pieces = asyncio.Queue()
+        stop = threading.Event()
+
+        def put(piece):
+            try:
+                loop.call_soon_threadsafe(pieces.put_nowait, piece)
+            except RuntimeError: # Loop closed; nobody is listening
+                stop.set()
+
+        task = self._enqueue(self._producer(fn, put, stop), lane, timeout, cancelled=stop)
+        return self._aconsume(pieces, task, lane, timeout)
+
+    @staticmethod
+    def _consume(pieces: queue.Queue, task: _Task, lane: str, timeout: float):
+        try:
+            first = True
+            while True:
+                try:
+                    piece = pieces.get(timeout=timeout if first else None)
+                except queue.Empty:
+                    task.future.cancel()
+                    REJECTED.labels(lane=lane, reason="timeout").inc()
+                    raise InferenceTimeoutException()
+                first = False
+                if piece is _STREAM_END:
+                    return
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+        finally:
+            task.cancelled.set()
+
+    @staticmethod
+    async def _aconsume(pieces: asyncio.Queue, task: _Task, lane: str, timeout: float):
+        try:
+            first = True
+            while True:
+                try:
+                    piece = await asyncio.wait_for(pieces.get(), timeout if first else None)
+                except asyncio.TimeoutError:
+                    task.future.cancel()
+                    REJECTED.labels(lane=lane, reason="timeout").inc()
+                    raise InferenceTimeoutException()
+                first = False
+                if piece is _STREAM_END:
+                    return
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+        finally:
+            task.cancelled.set()
+
+    def _worker(self, model):
+        while True:
+            _, _, task = self._queue.get()
+            self._track(task.lane, -1)
+            QUEUE_WAIT.labels(lane=task.lane).observe(time.monotonic() - task.enqueued)
+
+            if not task.future.set_running_or_notify_cancel():
+                continue
+            if task.cancelled.is_set() or (task.deadline and time.monotonic() > task.deadline):
+                REJECTED.labels(lane=task.lane, reason="expired").inc()
+                task.future.set_exception(InferenceTimeoutException())
+                continue
+
+            WORKERS_BUSY.inc()
+            try:
+                task.future.set_result(task.fn(model))
+            except Exception as e:
+                task.future.set_exception(e)
+            finally:
+                WORKERS_BUSY.dec()
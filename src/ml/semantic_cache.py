@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+import numpy as np
+from prometheus_client import Counter
+
+CACHE_LOOKUPS = Counter("semantic_cache_lookups_total", "Semantic answer cache lookups", ["result"])
+CACHE_INVALIDATIONS = Counter("semantic_cache_invalidations_total", "Cached answers dropped because a cited chunk changed")
+
+class _Entry:
+    __slots__ = ("slot", "query", "answer", "chunk_ids", "scope", "expires")
+
+    def __init__(self, slot, query, answer, chunk_ids, scope, expires):
+        self.slot = slot
+        self.query = query
+        self.answer = answer
+        self.chunk_ids = chunk_ids
+        self.scope = scope
+        self.expires = expires
+
+class SemanticCache:
+    """
+    Answer cache matched by query meaning rather than exact text.
+
+    Query embeddings are L2-normalized into a preallocated (capacity, dim) matrix, so a lookup
+    is one matrix-vector product. Entries are evicted LRU when full and expire after `ttl`
+    seconds. `scope` separates answers produced with different retrieval parameters. Each
+    entry remembers the chunks its answer was grounded on; invalidate_chunks() drops every
+    answer citing a re-ingested or removed chunk.
+
+    `version` follows the shared corpus version. The ingesting process knows which chunks
+    changed and passes the new version to invalidate_chunks(), keeping unaffected answers;
+    any other process only sees the version move, and set_version() drops everything.
+    """
+    def __init__(self, dim: int, capacity: int = 1024, threshold: float = 0.95, ttl: float = 86400):
+        self.threshold = threshold
+        self.ttl = ttl
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._entries = OrderedDict() # slot -> _Entry, least recently used first
+        self._free = list(range(capacity - 1, -1, -1))
+        self._by_chunk = {} # chunk_id -> {slot}
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(vector) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None # Placeholder (all-zero) embeddings never match
+
+    def get(self, vector, scope: str = "") -> Optional[str]:
+        vector = self._normalize(vector)
+        if vector is None:
+            return None
+        with self._lock:
+            if not self._entries:
+                CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
+            scores = self._vectors @ vector
+            scores[~self._live] = -1.0
+            now = time.monotonic()
+            # Best live match in scope; usually the first candidate
+            for slot in np.argsort(-scores)[:8]:
+                if scores[slot] < self.threshold:
+                    break
+                entry = self._entries[int(slot)]
+                if entry.expires < now:
+                    self._remove(entry)
+                    continue
+                if entry.scope != scope:
+                    continue
+                self._entries.move_to_end(entry.slot)
+                CACHE_LOOKUPS.labels(result="hit").inc()
+                return entry.answer
+        CACHE_LOOKUPS.labels(result="miss").inc()
+        return None
+
+    def put(self, vector, query: str, answer: str, chunk_ids: Iterable[str], scope: str = "", version: int = None):
+        """Stores `answer`; pass the `version` read before retrieving so answers from an old corpus never land."""
+        vector = self._normalize(vector)
+        if vector is None:
+            return
+        chunk_ids = frozenset(chunk_ids)
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            if not self._free:
+                self._remove(next(iter(self._entries.values())))
+            slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._live[slot] = True
+            self._entries[slot] = _Entry(slot, query, answer, chunk_ids, scope, time.monotonic() + self.ttl)
+            for chunk_id in chunk_ids:
+                self._by_chunk.setdefault(chunk_id, set()).add(slot)
+
+    def invalidate_chunks(self, chunk_ids: Iterable[str], version: int = None) -> int:
+        """
+        Drops every cached answer that cites one of `chunk_ids`, then adopts corpus `version`
+        if given. Returns how many were dropped.
+        """
+        with self._lock:
+            slots = set()
+            for chunk_id in chunk_ids:
+                slots |= self._by_chunk.get(chunk_id, set())
+            for slot in slots:
+                self._remove(self._entries[slot])
+            if version is not None:
+                self.version = version
+        CACHE_INVALIDATIONS.inc(len(slots))
+        return len(slots)
+
+    def set_version(self, version: int):
+        """Adopts corpus version `version`, dropping every answer if it moved."""
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            dropped = len(self._entries)
+            self._clear()
+        CACHE_INVALIDATIONS.inc(dropped)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        for entry in list(self._entries.values()):
+            self._remove(entry)
+
+    def _remove(self, entry: _Entry):
+        del self._entries[entry.slot]
+        self._live[entry.slot] = False
+        self._free.append(entry.slot)
+        for chunk_id in entry.chunk_ids:
+            slots = self._by_chunk.get(chunk_id)
+            if slots is not None:
+                slots.discard(entry.slot)
+                if not slots:
+                    del self._by_chunk[chunk_id]
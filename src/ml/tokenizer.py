@@ -0,0 +1,31 @@
+import re
+import unicodedata
+from typing import List
+
+# Bengali block plus ZWNJ/ZWJ. `\w` is not usable here: it splits words at vowel signs
+# (e.g. 'া', 'ি'), which are combining marks rather than letters.
+_TOKEN_RE = re.compile(r"[\u0980-\u09FF\u200C\u200D]+|[a-z0-9]+")
+
+# High-frequency Bangla function words (and a few English ones) that carry no legal meaning
+_STOPWORDS = """
+অথবা অনুযায়ী অর্থাৎ আছে আবার আমরা আমার আমি আর আরও ইহা ইহার উক্ত উপর উহা এ এই এক একটি এখন এটা এটি
+এবং এমন এর এরূপ এস ও কখন কত কর করা করিতে করিবে করিয়া করে করেন করতে কাছে কি কিংবা কিছু কিন্তু
+কিভাবে কী কীভাবে কে কেন কোন কোনো কোনও ক্ষেত্রে গিয়ে গেছে চায় জন্য তবে তা তাই তার তাহা তাহার
+তাহলে তিনি তুমি তাদের থাকবে থাকে থেকে দিতে দিয়ে দেওয়া ধরে না নয় নাই নিয়ে নেই পর পরে পারে
+পারেন বা বলে বলা মধ্যে যখন যদি যা যাহা যাহার যার যে যেমন যেন সঙ্গে সব সাথে সে সেই হইতে হইবে
+হইয়া হইলে হওয়া হতে হবে হয় হয়ে হলে হয়েছে হয়েছিল ছিল
+a an and are for in is of on or the to what which who
+"""
+
+def normalize(text: str) -> str:
+    """NFC-normalizes and lowercases so equivalent spellings tokenize identically."""
+    return unicodedata.normalize("NFC", text or "").lower()
+
+BANGLA_STOPWORDS = frozenset(normalize(w) for w in _STOPWORDS.split())
+
+def tokenize(text: str, drop_stopwords: bool = True) -> List[str]:
+    """Splits Bangla/English text into word tokens."""
+    tokens = _TOKEN_RE.findall(normalize(text))
+    if drop_stopwords:
+        tokens = [t for t in tokens if t not in BANGLA_STOPWORDS]
+    return tokens
@@ -0,0 +1,136 @@
+"""
+Qdrant collection provisioning, driven by Settings:
+
+- HNSW graph built with QDRANT_HNSW_M / QDRANT_HNSW_EF_CONSTRUCT, searched with QDRANT_HNSW_EF
+- int8 scalar quantization kept in RAM, with the float32 originals on disk and used to
+  rescore an oversampled candidate set
+- keyword payload indexes for the fields queries and deletes filter on
+- payloads limited to those fields; chunk text is hydrated from SQL
+
+ensure_collection() creates the collection, or migrates an existing one in place with
+update_collection (Qdrant rebuilds the index and quantized vectors in the background).
+"""
+from typing import Dict, List
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+
+from src.core.config import settings
+
+# Keyword indexes; hierarchy is a list, matched per element
+PAYLOAD_INDEXES = ("chunk_id", "source_file", "hierarchy")
+
+# Fields older ingestions stored in every payload; dropped by ensure_collection()
+LEGACY_PAYLOAD_FIELDS = ("text", "token_count")
+
+# Single clients for the app: sync for ingestion and threaded retrieval, async for the request path
+qdrant = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+async_qdrant = AsyncQdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+COLLECTION_NAME = settings.QDRANT_COLLECTION
+
+def hnsw_config() -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT)
+
+def quantization_config():
+    if not settings.QDRANT_QUANTIZATION:
+        return None
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=settings.QDRANT_QUANTIZATION_QUANTILE,
+            always_ram=True,
+        )
+    )
+
+def search_params() -> models.SearchParams:
+    """Per-query HNSW ef, plus rescoring of oversampled int8 candidates against the originals."""
+    quantization = None
+    if settings.QDRANT_QUANTIZATION:
+        quantization = models.QuantizationSearchParams(
+            rescore=settings.QDRANT_RESCORE,
+            oversampling=settings.QDRANT_OVERSAMPLING,
+        )
+    return models.SearchParams(hnsw_ef=settings.QDRANT_HNSW_EF, quantization=quantization)
+
+def _plan_migration(info) -> Dict:
+    """Compares a collection's stored config with Settings; returns the update_collection kwargs needed."""
+    params = info.config.params
+    vectors = params.vectors
+    if isinstance(vectors, dict):
+        vectors = vectors.get("")
+    if vectors is None:
+        raise ValueError("Collection uses named vectors; expected a single unnamed vector")
+    if vectors.size != settings.QDRANT_VECTOR_SIZE or vectors.distance != models.Distance.COSINE:
+        raise ValueError(
+            f"Collection has {vectors.size}-d {vectors.distance} vectors, expected "
+            f"{settings.QDRANT_VECTOR_SIZE}-d Cosine; re-create it and re-ingest"
+        )
+
+    changes = {}
+    hnsw = info.config.hnsw_config
+    if (hnsw.m, hnsw.ef_construct) != (settings.QDRANT_HNSW_M, settings.QDRANT_HNSW_EF_CONSTRUCT):
+        changes["hnsw_config"] = hnsw_config()
+    if bool(vectors.on_disk) != settings.QDRANT_ON_DISK:
+        changes["vectors_config"] = {"": models.VectorParamsDiff(on_disk=settings.QDRANT_ON_DISK)}
+
+    current = info.config.quantization_config
+    wanted = quantization_config()
+    if wanted is None:
+        if current is not None:
+            changes["quantization_config"] = models.Disabled.DISABLED
+    elif not isinstance(current, models.ScalarQuantization) or current.scalar != wanted.scalar:
+        changes["quantization_config"] = wanted
+    return changes
+
+def _missing_indexes(info) -> List[str]:
+    schema = info.payload_schema or {}
+    return [field for field in PAYLOAD_INDEXES if field not in schema]
+
+def _legacy_payload_filter() -> models.Filter:
+    return models.Filter(must_not=[models.IsEmptyCondition(is_empty=models.PayloadField(key="text"))])
+
+def ensure_collection(client: QdrantClient = None, name: str = None, dry_run: bool = False) -> Dict:
+    """
+    Creates the collection if absent, otherwise brings its config and payload indexes in line
+    with Settings and strips chunk text from old payloads. Returns what was (or, with dry_run,
+    would be) changed.
+    """
+    client = client or qdrant
+    name = name or COLLECTION_NAME
+
+    if not client.collection_exists(name):
+        report = {"created": True, "changes": [], "indexes": list(PAYLOAD_INDEXES), "legacy_points": 0}
+        if dry_run:
+            return report
+        client.create_collection(
+            collection_name=name,
+            vectors_config=models.VectorParams(
+                size=settings.QDRANT_VECTOR_SIZE,
+                distance=models.Distance.COSINE,
+                on_disk=settings.QDRANT_ON_DISK,
+            ),
+            hnsw_config=hnsw_config(),
+            quantization_config=quantization_config(),
+        )
+    else:
+        info = client.get_collection(name)
+        changes = _plan_migration(info)
+        legacy = client.count(collection_name=name, count_filter=_legacy_payload_filter(), exact=False).count
+        report = {"created": False, "changes": sorted(changes), "indexes": _missing_indexes(info), "legacy_points": legacy}
+        if dry_run:
+            return report
+        if changes:
+            print(f"Migrating Qdrant collection '{name}': {', '.join(sorted(changes))}")
+            client.update_collection(collection_name=name, **changes)
+        if legacy:
+            print(f"Dropping chunk text from ~{legacy} Qdrant payloads in '{name}'")
+            client.delete_payload(
+                collection_name=name,
+                keys=list(LEGACY_PAYLOAD_FIELDS),
+                points=models.FilterSelector(filter=_legacy_payload_filter()),
+            )
+
+    for field in report["indexes"]:
+        client.create_payload_index(
+            collection_name=name, field_name=field, field_schema=models.PayloadSchemaType.KEYWORD
+        )
+    return report
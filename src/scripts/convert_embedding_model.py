@@ -0,0 +1,60 @@
+"""
+One-time conversion of the pickled embedding model into a standard sentence-transformers
+directory (modules.json, configs, tokenizer and model.safetensors):
+
+    python src/scripts/convert_embedding_model.py ["models/Finetuned Embedding Model.pkl"] [out_dir]
+
+By default the directory is written next to the .pkl under the same name without the
+extension, where BanglaEmbedding picks it up automatically in place of the pickle.
+"""
+import argparse
+import os
+import shutil
+import sys
+import numpy as np
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.core.config import settings
+from src.ml.embeddings import load_pickled_model, converted_model_dir
+
+SAMPLE_TEXTS = [
+    "দণ্ডবিধির ৩০২ ধারা অনুযায়ী হত্যার শাস্তি কী?",
+    "সংবিধানের ৭ অনুচ্ছেদ",
+    "Code of Criminal Procedure, section 154",
+]
+
+def convert(pkl_path: str, out_dir: str, tolerance: float = 1e-4) -> float:
+    """Converts, reloads the result and returns the max abs embedding difference on SAMPLE_TEXTS."""
+    from sentence_transformers import SentenceTransformer
+
+    print(f"Loading pickled model from {pkl_path}...")
+    model = load_pickled_model(pkl_path)
+    expected = model.encode(SAMPLE_TEXTS, convert_to_numpy=True)
+
+    # Write beside the target, then swap in, so a failed run never leaves a half-written model
+    tmp_dir = f"{out_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    model.save(tmp_dir, safe_serialization=True)
+
+    reloaded = SentenceTransformer(tmp_dir, device="cpu")
+    diff = float(np.abs(reloaded.encode(SAMPLE_TEXTS, convert_to_numpy=True) - expected).max())
+    if diff > tolerance:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise ValueError(f"Converted model differs from the pickle (max abs diff {diff:.2e})")
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.rename(tmp_dir, out_dir)
+    print(f"Saved {out_dir} (max abs diff vs pickle: {diff:.2e})")
+    return diff
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the pickled embedding model to safetensors")
+    parser.add_argument("pkl_path", nargs="?", default=settings.EMBEDDING_MODEL_PATH)
+    parser.add_argument("out_dir", nargs="?", default=None)
+    args = parser.parse_args()
+    convert(args.pkl_path, args.out_dir or converted_model_dir(args.pkl_path))
+
+if __name__ == "__main__":
+    main()
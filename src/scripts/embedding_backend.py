@@ -0,0 +1,43 @@
+"""
+One-time ONNX export and parity check of the embedding backends against fp32:
+
+    python src/scripts/embedding_backend.py export-onnx [out_dir]
+    python src/scripts/embedding_backend.py parity --backend int8 [--texts file.txt]
+"""
+import argparse
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.core.config import settings
+from src.ml.embeddings import BanglaEmbedding
+from src.ml.embedding_backends import EMBEDDING_BACKENDS, export_onnx, parity
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding inference backends")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export-onnx", help="Export the fp32 model to ONNX")
+    export.add_argument("out_dir", nargs="?", default=settings.EMBEDDING_ONNX_PATH)
+    check = commands.add_parser("parity", help="Cosine drift of a backend against fp32")
+    check.add_argument("--backend", choices=[b for b in EMBEDDING_BACKENDS if b != "torch"], default="int8")
+    check.add_argument("--texts", help="File with one text per line (defaults to built-in samples)")
+    args = parser.parse_args()
+
+    if args.command == "export-onnx":
+        embedder = BanglaEmbedding(settings.EMBEDDING_MODEL_PATH, cache_size=0, backend="torch")
+        if embedder.model is None:
+            raise SystemExit("Embedding model not found; nothing to export.")
+        export_onnx(embedder.model, args.out_dir)
+    else:
+        texts = None
+        if args.texts:
+            with open(args.texts, encoding="utf-8") as f:
+                texts = [line.strip() for line in f if line.strip()]
+        report = parity(args.backend, texts)
+        print(f"{report['backend']} vs fp32 over {report['n']} texts: "
+              f"mean cosine {report['mean_cosine']:.6f}, min cosine {report['min_cosine']:.6f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Brings the Qdrant collection in line with the QDRANT_* settings (HNSW parameters, int8
+quantization, on-disk originals, payload indexes, text-free payloads) without re-ingesting:
+
+    python src/scripts/migrate_qdrant.py [--dry-run]
+
+Qdrant rebuilds the index in the background; search keeps working meanwhile.
+"""
+import argparse
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.ml.vector_store import qdrant, COLLECTION_NAME, ensure_collection
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply Qdrant collection settings")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+
+    report = ensure_collection(qdrant, COLLECTION_NAME, dry_run=args.dry_run)
+    prefix = "Would apply" if args.dry_run else "Applied"
+    if report["created"]:
+        print(f"{prefix}: create collection '{COLLECTION_NAME}'")
+    if report["changes"]:
+        print(f"{prefix} config changes: {', '.join(report['changes'])}")
+    if report["indexes"]:
+        print(f"{prefix} payload indexes: {', '.join(report['indexes'])}")
+    if report["legacy_points"]:
+        print(f"{prefix}: drop chunk text from ~{report['legacy_points']} point payloads")
+    if not (report["created"] or report["changes"] or report["indexes"] or report["legacy_points"]):
+        print(f"Collection '{COLLECTION_NAME}' already matches the settings.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+import hashlib
+import json
+import queue
+import threading
+import time
+import uuid
+from datetime import date
+from sqlalchemy.orm import sessionmaker
+from qdrant_client.http import models
+from prometheus_client import Counter
+
+from src.data.crud.legal import (
+    get_document_ids, get_chunk_hashes, get_chunk_ids_for_documents,
+    bulk_create_documents, bulk_upsert_chunks, delete_chunks
+)
+from src.core.config import settings
+
+# Marks the end of a stage's input
+_SENTINEL = object()
+
+# Keys every JSONL record must carry
+_REQUIRED_KEYS = ("chunk_id", "text", "metadata")
+
+# Writers that must both acknowledge a batch before it is checkpointed
+_WRITERS = frozenset(("qdrant_writer", "sql_writer"))
+
+# Fixed namespace so a chunk_id always maps to the same Qdrant point, in every process
+POINT_ID_NAMESPACE = uuid.UUID("6f1c8b9e-2d4a-5e7f-9a3b-1c2d3e4f5a6b")
+
+def point_id(chunk_id: str) -> str:
+    """Stable Qdrant point id for a chunk (UUIDv5 of its chunk_id)."""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, chunk_id))
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def iter_lines(byte_chunks):
+    """Splits a stream of byte chunks into newline-terminated lines without buffering the whole stream."""
+    buffer = b""
+    for chunk in byte_chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line + b"\n"
+    if buffer:
+        yield buffer
+
+class Batch(list):
+    """A list of parsed records plus its position in the input stream."""
+    def __init__(self, seq: int, records=()):
+        super().__init__(records)
+        self.seq = seq
+        self.end_offset = 0 # Byte offset just past the batch's last line
+        self.failed = 0 # Malformed lines skipped while building the batch
+
+STAGE_ITEMS = Counter("ingest_stage_records_total", "Records processed per ingestion stage", ["stage"])
+STAGE_SECONDS = Counter("ingest_stage_busy_seconds_total", "Time spent working per ingestion stage", ["stage"])
+
+class StageStats:
+    """Throughput counters for a single pipeline stage."""
+    def __init__(self, name: str):
+        self.name = name
+        self.records = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, n: int, elapsed: float):
+        self.records += n
+        self.batches += 1
+        self.busy_seconds += elapsed
+        STAGE_ITEMS.labels(stage=self.name).inc(n)
+        STAGE_SECONDS.labels(stage=self.name).inc(elapsed)
+
+    @property
+    def wall_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def records_per_sec(self) -> float:
+        wall = self.wall_seconds
+        return self.records / wall if wall > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            "records": self.records,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "records_per_sec": round(self.records_per_sec, 1),
+        }
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: parse -> resolve (dedup/SQL) -> embed -> writers.
+
+    Each stage runs in its own thread and hands batches to the next one through
+    bounded queues, so embedding compute overlaps with Postgres and Qdrant I/O while
+    memory stays capped at roughly `queue_size` batches per queue.
+
+        parse --> resolve --+--> embed --> qdrant_writer
+                            |
+                            +--> sql_writer
+
+    Chunks are diffed against the stored content hashes: unchanged chunks are not
+    re-embedded or rewritten, and after a complete run with no malformed lines any stored
+    chunk of an ingested file that no longer appears in the input is deleted from SQL and Qdrant.
+
+    A chunk's content hash is only written to SQL after Qdrant has acknowledged its
+    vector, so a run that dies between the two writes re-embeds the chunk next time
+    instead of treating it as unchanged.
+
+    A batch is checkpointed once both writers have committed it and every earlier
+    batch; `on_checkpoint(byte_offset, last_batch, rows, failed)` is then called with
+    run-relative totals so callers can persist progress and resume later.
+    """
+    def __init__(self, session_factory: sessionmaker, embedder, qdrant_client, collection_name: str,
+                 batch_size: int = None, queue_size: int = None, on_checkpoint=None, prune_removed: bool = None):
+        self.session_factory = session_factory
+        self.embedder = embedder
+        self.qdrant = qdrant_client
+        self.collection_name = collection_name
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+        
+        self.stats = {name: StageStats(name) for name in ("parse", "resolve", "embed", "qdrant_writer", "sql_writer")}
+        self._stop = threading.Event()
+        self._error = None
+        self._error_lock = threading.Lock()
+
+        # Resolve-stage caches, preloaded once in run() (only touched from the resolve thread)
+        self._doc_ids = {}
+        self._chunk_hashes = {} # chunk_id -> content_hash (None for rows ingested before hashing)
+        self._seen_chunk_ids = set()
+        self._seen_doc_ids = set()
+        self._dated = set() # Documents whose metadata.document_date was written this run
+
+        # Diff results
+        self.prune_removed = settings.INGEST_PRUNE_REMOVED if prune_removed is None else prune_removed
+        self.changes = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        self.changed_chunk_ids = set() # Chunks whose text changed or were removed
+
+        # SQL-writer buffer, flushed as one multi-row insert
+        self.sql_batch_size = settings.INGEST_SQL_BATCH_SIZE
+        self._pending_chunks = []
+        self._pending_seqs = []
+
+        # Checkpoint tracking
+        self.on_checkpoint = on_checkpoint
+        self.failed_rows = 0
+        self._acks = {} # seq -> writers that committed it
+        self._batch_meta = {} # seq -> (end_offset, records, failed)
+        self._next_seq = 0
+        self._committed = (0, -1, 0, 0) # (byte_offset, last_batch, rows, failed)
+        self._ckpt_lock = threading.Lock()
+        self._ckpt_cond = threading.Condition(self._ckpt_lock) # Signalled on every writer ack
+
+    # --- Stage functions ---
+
+    def _resolve(self, batch):
+        """Attaches document ids and diffs each chunk against the stored content hashes."""
+        # New documents, plus each dated document once per run so its date is kept current
+        filenames, dates = [], {}
+        for data in batch:
+            filename, document_date = data['metadata']['source_file'], data['metadata'].get('document_date')
+            if filename not in self._doc_ids or (document_date and filename not in self._dated):
+                filenames.append(filename)
+                if document_date:
+                    dates[filename] = document_date
+                    self._dated.add(filename)
+        if filenames:
+            with self.session_factory() as db:
+                self._doc_ids.update(bulk_create_documents(db, filenames, dates))
+
+        for data in batch:
+            cid = data['chunk_id']
+            data['document_id'] = self._doc_ids[data['metadata']['source_file']]
+            data['content_hash'] = content_hash(data['text'])
+            
+            if cid not in self._chunk_hashes:
+                data['status'] = "new"
+            elif self._chunk_hashes[cid] is None:
+                data['status'] = "legacy" # Stored before hashing; may have a duplicate random-id point
+            elif self._chunk_hashes[cid] != data['content_hash']:
+                data['status'] = "changed"
+            else:
+                data['status'] = "unchanged"
+            
+            self.changes["changed" if data['status'] == "legacy" else data['status']] += 1
+            if data['status'] in ("changed", "legacy"):
+                self.changed_chunk_ids.add(cid)
+            self._chunk_hashes[cid] = data['content_hash']
+            self._seen_chunk_ids.add(cid)
+            self._seen_doc_ids.add(data['document_id'])
+        return batch
+
+    def _embed(self, batch):
+        records = [data for data in batch if data['status'] != "unchanged"]
+        vectors = self.embedder.encode_batch([data['text'] for data in records], batch_size=self.batch_size)
+        return batch, records, vectors
+
+    def _write_qdrant(self, item):
+        batch, records, vectors = item
+        
+        # Points from before deterministic ids live under random ids; drop them before re-adding
+        legacy_ids = [data['chunk_id'] for data in records if data['status'] == "legacy"]
+        if legacy_ids:
+            self._delete_points(legacy_ids)
+        
+        points = [
+            models.PointStruct(
+                id=point_id(data['chunk_id']), 
+                vector=vector,
+                payload={ # Ids and filter fields only; text lives in SQL
+                    "chunk_id": data['chunk_id'],
+                    "hierarchy": data['metadata']['hierarchy'], 
+                    "source_file": data['metadata']['source_file'],
+                }
+            )
+            for data, vector in zip(records, vectors.tolist())
+        ]
+        if points:
+            self.qdrant.upsert(collection_name=self.collection_name, points=points)
+        self._ack("qdrant_writer", [batch.seq])
+
+    def _write_sql(self, batch):
+        self._pending_chunks.extend(
+            {
+                "chunk_id": data['chunk_id'],
+                "document_id": data['document_id'],
+                "content": data['text'],
+                "hierarchy": data['metadata']['hierarchy'],
+                "token_count": data['token_count'],
+                "content_hash": data['content_hash'],
+            }
+            for data in batch if data['status'] != "unchanged"
+        )
+        self._pending_seqs.append(batch.seq)
+        if not self._pending_chunks or len(self._pending_chunks) >= self.sql_batch_size:
+            self._flush_sql()
+
+    def _flush_sql(self):
+        if self._pending_chunks and not self._wait_for_vectors(self._pending_seqs):
+            return # Qdrant failed: store no hashes for vectors that were never written
+        if self._pending_chunks:
+            # A chunk_id repeated in the input keeps its last row; Postgres rejects an
+            # ON CONFLICT DO UPDATE that touches the same row twice
+            chunks = list({data['chunk_id']: data for data in self._pending_chunks}.values())
+            with self.session_factory() as db:
+                bulk_upsert_chunks(db, chunks, batch_size=self.sql_batch_size)
+        self._pending_chunks = []
+        seqs, self._pending_seqs = self._pending_seqs, []
+        self._ack("sql_writer", seqs)
+
+    def _delete_points(self, chunk_ids):
+        self.qdrant.delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(must=[
+                    models.FieldCondition(key="chunk_id", match=models.MatchAny(any=list(chunk_ids)))
+                ])
+            ),
+        )
+
+    def _prune(self):
+        """Deletes stored chunks of the ingested documents that are absent from this run's input."""
+        with self.session_factory() as db:
+            stored = get_chunk_ids_for_documents(db, self._seen_doc_ids)
+            removed = sorted(stored - self._seen_chunk_ids)
+            for i in range(0, len(removed), self.sql_batch_size):
+                ids = removed[i:i + self.sql_batch_size]
+                self._delete_points(ids)
+                delete_chunks(db, ids)
+        self.changes["removed"] = len(removed)
+        self.changed_chunk_ids.update(removed)
+
+    # --- Plumbing ---
+
+    def _preload(self):
+        """Loads lookups once instead of querying per chunk."""
+        with self.session_factory() as db:
+            self._doc_ids = get_document_ids(db)
+            self._chunk_hashes = get_chunk_hashes(db)
+        print(f"Preloaded {len(self._doc_ids)} documents and {len(self._chunk_hashes)} chunk hashes.")
+
+    def _register(self, batch: Batch):
+        with self._ckpt_lock:
+            self._batch_meta[batch.seq] = (batch.end_offset, len(batch), batch.failed)
+
+    def _wait_for_vectors(self, seqs) -> bool:
+        """Blocks until the Qdrant writer has acknowledged `seqs`; False if the run stopped first."""
+        with self._ckpt_cond:
+            while not all("qdrant_writer" in self._acks.get(seq, ()) for seq in seqs):
+                if self._stop.is_set():
+                    return False
+                self._ckpt_cond.wait(timeout=0.1)
+        return True
+
+    def _ack(self, writer: str, seqs):
+        """Records that `writer` committed `seqs` and advances the contiguous checkpoint."""
+        with self._ckpt_cond:
+            self._ckpt_cond.notify_all()
+            for seq in seqs:
+                self._acks.setdefault(seq, set()).add(writer)
+            advanced = False
+            while self._acks.get(self._next_seq) == _WRITERS:
+                end_offset, records, failed = self._batch_meta.pop(self._next_seq)
+                del self._acks[self._next_seq]
+                _, _, rows, failed_total = self._committed
+                self._committed = (end_offset, self._next_seq, rows + records, failed_total + failed)
+                self._next_seq += 1
+                advanced = True
+            if advanced and self.on_checkpoint is not None:
+                self.on_checkpoint(*self._committed)
+
+    def _fail(self, exc: Exception):
+        with self._error_lock:
+            if self._error is None:
+                self._error = exc
+        self._stop.set()
+
+    def _run_stage(self, name, fn, in_q, out_qs, size_of=len, on_end=None):
+        stats = self.stats[name]
+        stats.started_at = time.perf_counter()
+        try:
+            while True:
+                item = in_q.get()
+                if item is _SENTINEL:
+                    break
+                if self._stop.is_set():
+                    continue # Drain so upstream never blocks on a full queue
+                try:
+                    start = time.perf_counter()
+                    result = fn(item)
+                    stats.record(size_of(item), time.perf_counter() - start)
+                except Exception as e:
+                    print(f"Ingestion stage '{name}' failed: {e}")
+                    self._fail(e)
+                    continue
+                for q in out_qs:
+                    q.put(result)
+            if on_end is not None and not self._stop.is_set():
+                start = time.perf_counter()
+                on_end()
+                stats.busy_seconds += time.perf_counter() - start
+        except Exception as e:
+            print(f"Ingestion stage '{name}' failed: {e}")
+            self._fail(e)
+        finally:
+            stats.finished_at = time.perf_counter()
+            for q in out_qs:
+                q.put(_SENTINEL)
+
+    def _parse_line(self, line):
+        data = json.loads(line)
+        if not isinstance(data, dict) or not all(key in data for key in _REQUIRED_KEYS):
+            raise ValueError("missing required keys")
+        # Wrong types become skipped rows here instead of failing a later stage and the whole run
+        if not isinstance(data['chunk_id'], str) or not isinstance(data['text'], str):
+            raise ValueError("chunk_id and text must be strings")
+        metadata = data['metadata']
+        if not isinstance(metadata, dict):
+            raise ValueError("metadata must be an object")
+        if not isinstance(metadata.get('source_file'), str):
+            raise ValueError("missing metadata.source_file")
+        hierarchy = metadata.setdefault('hierarchy', [])
+        if not isinstance(hierarchy, list) or not all(isinstance(h, str) for h in hierarchy):
+            raise ValueError("metadata.hierarchy must be a list of strings")
+        if metadata.get('document_date'):
+            if not isinstance(metadata['document_date'], str):
+                raise ValueError("metadata.document_date must be an ISO date string")
+            metadata['document_date'] = date.fromisoformat(metadata['document_date'])
+        token_count = data.setdefault('token_count', None)
+        if token_count is not None and (not isinstance(token_count, int) or isinstance(token_count, bool)):
+            raise ValueError("token_count must be an integer")
+        return data
+
+    def _parse(self, lines, out_q, start_offset: int):
+        stats = self.stats["parse"]
+        stats.started_at = time.perf_counter()
+        offset = start_offset
+        seq = 0
+        batch = Batch(seq)
+        start = time.perf_counter()
+
+        def emit(batch):
+            batch.end_offset = offset
+            stats.record(len(batch), time.perf_counter() - start)
+            self._register(batch)
+            out_q.put(batch)
+
+        try:
+            for line in lines:
+                if self._stop.is_set():
+                    break
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(self._parse_line(line))
+                except ValueError as e: # Includes JSONDecodeError
+                    batch.failed += 1
+                    self.failed_rows += 1
+                    print(f"Skipping malformed line ending at byte {offset}: {e}")
+                if len(batch) >= self.batch_size:
+                    emit(batch)
+                    seq += 1
+                    batch = Batch(seq)
+                    start = time.perf_counter()
+            if (batch or batch.failed) and not self._stop.is_set():
+                emit(batch)
+        except Exception as e:
+            print(f"Ingestion stage 'parse' failed: {e}")
+            self._fail(e)
+        finally:
+            stats.finished_at = time.perf_counter()
+            out_q.put(_SENTINEL)
+
+    def run(self, lines, start_offset: int = 0) -> int:
+        """
+        Ingests an iterable of JSONL lines (bytes, so offsets are exact) that begins at
+        `start_offset` in the underlying file. Returns the number of records parsed.
+        """
+        self._preload()
+        self._committed = (start_offset, -1, 0, 0)
+
+        resolve_q = queue.Queue(maxsize=self.queue_size)
+        embed_q = queue.Queue(maxsize=self.queue_size)
+        sql_q = queue.Queue(maxsize=self.queue_size)
+        qdrant_q = queue.Queue(maxsize=self.queue_size)
+
+        workers = [
+            threading.Thread(target=self._run_stage, args=("resolve", self._resolve, resolve_q, [embed_q, sql_q]), daemon=True),
+            threading.Thread(target=self._run_stage, args=("embed", self._embed, embed_q, [qdrant_q]), daemon=True),
+            threading.Thread(target=self._run_stage, args=("qdrant_writer", self._write_qdrant, qdrant_q, [], lambda item: len(item[1])), daemon=True),
+            threading.Thread(target=self._run_stage, args=("sql_writer", self._write_sql, sql_q, [], len, self._flush_sql), daemon=True),
+        ]
+        for w in workers:
+            w.start()
+
+        # Parse runs on the calling thread and feeds the rest of the pipeline
+        self._parse(lines, resolve_q, start_offset)
+
+        for w in workers:
+            w.join()
+
+        for name, stats in self.stats.items():
+            print(f"[ingest] {name:<13} {stats.as_dict()}")
+
+        if self._error is not None:
+            raise self._error
+
+        if self.prune_removed:
+            if start_offset != 0:
+                # The chunks seen before the checkpoint are unknown, so pruning could delete live data
+                print("Resumed run: skipping removal of deleted chunks.")
+            elif self.failed_rows:
+                # A malformed line may hold a chunk that still exists; don't delete it
+                print(f"{self.failed_rows} malformed rows: skipping removal of deleted chunks.")
+            else:
+                self._prune()
+        print(f"[ingest] changes {self.changes}")
+        return self.stats["parse"].records
+
@@ -1,93 +1,298 @@
-import json
 import os
-from sqlalchemy.orm import Session
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
+import socket
+import threading
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session, sessionmaker
 
-from src.data.models import LegalDocument, LegalChunk
-from src.ml.loader import ml_models
+from src.ml.loader import ml_models, ModelLoader
+from src.ml.vector_store import qdrant, COLLECTION_NAME, ensure_collection
 from src.core.config import settings
+from src.data.db import SessionLocal
+from src.data.models import IngestionJob
+from src.data.crud.ingestion_job import (
+    create_ingestion_job, claim_ingestion_job, get_resumable_job_ids, get_running_job_owners,
+    touch_ingestion_job, update_ingestion_checkpoint, finish_ingestion_job
+)
+from src.data.crud.legal import bump_corpus_version
+from src.services.ingestion_pipeline import IngestionPipeline, iter_lines
 
-# Global Qdrant Client
-qdrant = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
-COLLECTION_NAME = "bangla_legal"
+# Identifies this process as a job owner; the token tells a restarted process apart from
+# its predecessor when both get the same pid (e.g. pid 1 in a container)
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def owner_is_alive(owner: str) -> bool:
+    """Whether the worker that claimed a job may still be running it. Owners on other hosts are
+    assumed alive; their jobs become claimable once the heartbeat goes stale."""
+    if owner == INSTANCE_ID:
+        return True
+    try:
+        host, pid, _ = owner.rsplit(":", 2)
+        pid = int(pid)
+    except ValueError:
+        return False
+    if host != socket.gethostname():
+        return True
+    if pid == os.getpid():
+        return False # A previous process with our pid, i.e. before a restart
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class _Heartbeat:
+    """Touches a running job every INGEST_HEARTBEAT_SECONDS, so long phases without checkpoints
+    (BM25 and graph rebuilds) don't let another worker claim it."""
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(settings.INGEST_HEARTBEAT_SECONDS):
+            try:
+                with SessionLocal() as db:
+                    if not touch_ingestion_job(db, self.job_id, INSTANCE_ID):
+                        print(f"Ingestion job {self.job_id} was taken over by another worker.")
+                        return
+            except Exception as e:
+                print(f"Ingestion job {self.job_id} heartbeat failed: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
 
 class IngestionService:
     @staticmethod
     def setup_qdrant():
-        collections = qdrant.get_collections()
-        if COLLECTION_NAME not in [c.name for c in collections.collections]:
-            qdrant.create_collection(
-                collection_name=COLLECTION_NAME,
-                vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE),
-            )
+        """Creates the collection, or migrates an existing one to the configured HNSW/quantization settings."""
+        ensure_collection(qdrant, COLLECTION_NAME)
 
     @staticmethod
-    def process_and_ingest(db: Session, file_path: str):
+    def _build_pipeline(db: Session, on_checkpoint=None) -> IngestionPipeline:
         IngestionService.setup_qdrant()
-        embedder = ml_models.get("embedding") # Getting model from singleton
+        embedder = ModelLoader.wait_for("embedding") # Singleton; waits if still loading in the background
         
         if not embedder:
             # Fallback for when running script directly without main.py lifespan
             from src.ml.embeddings import BanglaEmbedding
             embedder = BanglaEmbedding(model_path=settings.EMBEDDING_MODEL_PATH)
 
-        points = []
-        
+        # Each SQL stage gets its own session; Sessions must not be shared across threads
+        session_factory = sessionmaker(bind=db.get_bind(), autocommit=False, autoflush=False)
+        return IngestionPipeline(
+            session_factory=session_factory,
+            embedder=embedder,
+            qdrant_client=qdrant,
+            collection_name=COLLECTION_NAME,
+            on_checkpoint=on_checkpoint,
+        )
+
+    @staticmethod
+    def _with_progress(lines, total_bytes: int):
+        """Byte-based progress bar, so no separate line-counting pass is needed."""
         from tqdm import tqdm
+        with tqdm(total=total_bytes, unit="B", unit_scale=True, desc="Ingesting Chunks") as pbar:
+            for line in lines:
+                pbar.update(len(line))
+                yield line
+
+    @staticmethod
+    def _after_ingest(pipeline: IngestionPipeline):
+        """Refreshes derived indexes once the corpus has changed."""
+        changes = pipeline.changes
+        if not (changes["new"] or changes["changed"] or changes["removed"]):
+            return
+        if settings.SPARSE_BACKEND == "bm25":
+            IngestionService.rebuild_bm25_index()
+        IngestionService.rebuild_legal_graph()
+
+        # Caches last, so nothing computed against the old indexes survives. The shared version
+        # also tells other workers (or the API, after a CLI run) to drop theirs
+        with SessionLocal() as db:
+            version = bump_corpus_version(db)
+        result_cache = ml_models.get("result_cache")
+        if result_cache is not None:
+            result_cache.set_version(version)
+        answer_cache = ml_models.get("answer_cache")
+        if answer_cache is not None:
+            # This process knows which chunks changed; others drop all answers on the new version
+            dropped = answer_cache.invalidate_chunks(pipeline.changed_chunk_ids, version=version)
+            print(f"Invalidated {dropped} cached answers citing re-ingested chunks.")
+
+    @staticmethod
+    def rebuild_bm25_index():
+        """Rebuilds the BM25 index from SQL, persists it and swaps it into the running app."""
+        from src.ml.bm25 import BM25Index
+        from src.data.crud.legal import iter_chunk_texts
         
-        # Count lines for progress bar (rough estimate or precise depending on needs, simple loop first)
-        num_lines = sum(1 for _ in open(file_path, 'r', encoding='utf-8'))
-        print(f"Detected {num_lines} chunks to ingest.")
-
-        with open(file_path, "r", encoding="utf-8") as f:
-            for line in tqdm(f, total=num_lines, desc="Ingesting Chunks"):
-                data = json.loads(line)
-                
-                # A. Check/Create Document in SQL
-                filename = data['metadata']['source_file']
-                doc = db.query(LegalDocument).filter_by(filename=filename).first()
-                if not doc:
-                    doc = LegalDocument(filename=filename, title=filename.replace(".txt", ""))
-                    db.add(doc)
-                    db.commit()
-                    db.refresh(doc)
-                
-                # B. Store Chunk in SQL
-                # Check if chunk exists first
-                existing_chunk = db.query(LegalChunk).filter_by(chunk_id=data['chunk_id']).first()
-                if not existing_chunk:
-                    chunk = LegalChunk(
-                        chunk_id=data['chunk_id'],
-                        document_id=doc.id,
-                        content=data['text'],
-                        hierarchy=data['metadata']['hierarchy'],
-                        token_count=data['token_count']
-                    )
-                    db.add(chunk)
-                
-                # C. Generate Vector
-                vector = embedder.encode(data['text'])
-                
-                points.append(models.PointStruct(
-                    id=abs(hash(data['chunk_id'])) % ((2**64) - 1), 
-                    vector=vector,
-                    payload={
-                        "chunk_id": data['chunk_id'],
-                        "hierarchy": data['metadata']['hierarchy'], 
-                        "source_file": filename,
-                        "text": data['text'] 
-                    }
-                ))
-                
-                # Batch Insert Logic
-                if len(points) >= 100:
-                    qdrant.upsert(collection_name=COLLECTION_NAME, points=points)
-                    points = [] # Reset batch
-
-        # Insert remaining points
-        if points:
-            qdrant.upsert(collection_name=COLLECTION_NAME, points=points)
+        print("Building BM25 index...")
+        with SessionLocal() as db:
+            index = BM25Index.build(iter_chunk_texts(db), k1=settings.BM25_K1, b=settings.BM25_B)
+        index.save(settings.BM25_INDEX_PATH)
+        print(f"BM25 index built over {len(index)} chunks.")
         
+        index = BM25Index.load(settings.BM25_INDEX_PATH)
+        ml_models["bm25"] = index
+        return index
+
+    @staticmethod
+    def rebuild_legal_graph():
+        """Rebuilds the hierarchy graph used for GraphRAG expansion and swaps it into the running app."""
+        from src.ml.legal_graph import LegalGraph
+        from src.data.crud.legal import iter_chunk_hierarchies
+
+        print("Building legal graph...")
+        with SessionLocal() as db:
+            graph = LegalGraph.build(iter_chunk_hierarchies(db))
+        graph.save(settings.GRAPH_INDEX_PATH)
+        print(f"Legal graph built: {len(graph)} chunks, {graph.num_sections} sections.")
+
+        graph = LegalGraph.load(settings.GRAPH_INDEX_PATH)
+        ml_models["graph"] = graph
+        return graph
+
+    @staticmethod
+    def process_and_ingest(db: Session, file_path: str, start_offset: int = 0, on_checkpoint=None):
+        pipeline = IngestionService._build_pipeline(db, on_checkpoint=on_checkpoint)
+        remaining = os.path.getsize(file_path) - start_offset
+
+        # Binary mode so the pipeline can track exact byte offsets for checkpoints
+        with open(file_path, "rb") as f:
+            f.seek(start_offset)
+            rows = pipeline.run(IngestionService._with_progress(f, remaining), start_offset=start_offset)
+        IngestionService._after_ingest(pipeline)
+        return rows
+
+    @staticmethod
+    def ingest_stream(db: Session, byte_chunks, on_checkpoint=None):
+        """Ingests JSONL arriving as an iterable of byte chunks (e.g. a request body) in a single pass."""
+        pipeline = IngestionService._build_pipeline(db, on_checkpoint=on_checkpoint)
+        rows = pipeline.run(iter_lines(byte_chunks))
+        IngestionService._after_ingest(pipeline)
+        return rows
+
+    # --- Jobs ---
+
+    @staticmethod
+    def create_job(db: Session, upload, filename: str, user_id: int = None):
+        """Persists the upload next to the job so the job can be resumed after a restart."""
+        os.makedirs(settings.INGEST_UPLOAD_DIR, exist_ok=True)
+        job = create_ingestion_job(db, filename=filename, file_path="", total_bytes=0, user_id=user_id)
+
+        file_path = os.path.join(settings.INGEST_UPLOAD_DIR, f"{job.id}_{os.path.basename(filename)}")
+        with open(file_path, "wb") as buffer:
+            while chunk := upload.read(1024 * 1024):
+                buffer.write(chunk)
+
+        job.file_path = file_path
+        job.total_bytes = os.path.getsize(file_path)
         db.commit()
-        return num_lines
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def _dead_owners(db: Session):
+        return [owner for owner in get_running_job_owners(db) if not owner_is_alive(owner)]
+
+    @staticmethod
+    def claim_job(db: Session, job_id: int):
+        """Takes ownership of a job for this process. None if it is finished or a live worker owns it."""
+        return claim_ingestion_job(
+            db, job_id, owner=INSTANCE_ID,
+            stale_after_seconds=settings.INGEST_STALE_SECONDS,
+            dead_owners=IngestionService._dead_owners(db),
+        )
+
+    @staticmethod
+    def run_job(job_id: int, byte_chunks=None, claimed: bool = False):
+        """
+        Runs (or resumes) a job from its last checkpoint. Uses its own sessions, never a request's.
+        Streamed jobs pass their body as `byte_chunks`; they have no stored file and cannot be resumed.
+        Pass `claimed=True` when the caller already took the job with claim_job().
+        """
+        db = SessionLocal()
+        try:
+            if claimed:
+                job = db.get(IngestionJob, job_id)
+            else:
+                job = IngestionService.claim_job(db, job_id)
+            if job is None:
+                print(f"Ingestion job {job_id} is not resumable (finished or already running).")
+                return
+            if byte_chunks is None and not job.file_path:
+                finish_ingestion_job(db, job_id, status="failed", error="Streamed upload was interrupted; upload the file again.")
+                return
+
+            base_rows, base_failed, base_batch = job.rows_processed or 0, job.rows_failed or 0, job.last_batch
+            print(f"Starting ingestion job {job_id} at byte {job.byte_offset} of {job.total_bytes}.")
+
+            def checkpoint(byte_offset, last_batch, rows, failed):
+                with SessionLocal() as ckpt_db:
+                    update_ingestion_checkpoint(
+                        ckpt_db, job_id,
+                        byte_offset=byte_offset,
+                        last_batch=base_batch + 1 + last_batch,
+                        rows_processed=base_rows + rows,
+                        rows_failed=base_failed + failed,
+                    )
+
+            try:
+                with _Heartbeat(job_id):
+                    if byte_chunks is not None:
+                        IngestionService.ingest_stream(db, byte_chunks, on_checkpoint=checkpoint)
+                    else:
+                        IngestionService.process_and_ingest(db, job.file_path, start_offset=job.byte_offset or 0, on_checkpoint=checkpoint)
+            except Exception as e:
+                print(f"Ingestion job {job_id} failed: {e}")
+                finish_ingestion_job(db, job_id, status="failed", error=str(e))
+                return
+
+            finish_ingestion_job(db, job_id, status="completed")
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            print(f"Ingestion job {job_id} completed.")
+        finally:
+            db.close()
+
+    @staticmethod
+    def resume_interrupted_jobs():
+        """Picks up jobs whose worker died mid-run (e.g. on restart)."""
+        with SessionLocal() as db:
+            job_ids = get_resumable_job_ids(
+                db, stale_after_seconds=settings.INGEST_STALE_SECONDS, dead_owners=IngestionService._dead_owners(db)
+            )
+        for job_id in job_ids:
+            IngestionService.run_job(job_id)
+
+    @staticmethod
+    def job_progress(job) -> dict:
+        """Throughput and ETA for the job's current run."""
+        rows_per_sec, bytes_per_sec, eta_seconds = 0.0, 0.0, None
+        if job.started_at and job.updated_at:
+            end = job.finished_at or (job.updated_at if job.status != "running" else datetime.now(timezone.utc))
+            started_at = job.started_at if job.started_at.tzinfo else job.started_at.replace(tzinfo=timezone.utc)
+            end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+            elapsed = (end - started_at).total_seconds()
+            if elapsed > 0:
+                rows_per_sec = ((job.rows_processed or 0) - (job.run_start_rows or 0)) / elapsed
+                bytes_per_sec = ((job.byte_offset or 0) - (job.run_start_offset or 0)) / elapsed
+        
+        remaining = max((job.total_bytes or 0) - (job.byte_offset or 0), 0)
+        if job.status == "completed":
+            eta_seconds = 0.0
+        elif job.status == "running" and bytes_per_sec > 0:
+            eta_seconds = remaining / bytes_per_sec
+
+        return {
+            "progress": (job.byte_offset or 0) / job.total_bytes if job.total_bytes else 0.0,
+            "rows_per_sec": round(rows_per_sec, 1),
+            "eta_seconds": round(eta_seconds, 1) if eta_seconds is not None else None,
+        }
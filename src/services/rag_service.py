@@ -1,19 +1,139 @@
 from sqlalchemy.orm import Session
-from src.ml.rag_engine import LegalRAG
-from src.ml.loader import ml_models
+import re
+import time
+from src.ml.rag_engine import LegalRAG, run_blocking
+from src.ml.loader import ml_models, ModelLoader
+from src.ml.fusion import resolve_params
 from src.core.config import settings
-from qdrant_client import QdrantClient
+from src.data.schemas import RetrievalParams
+from src.ml.vector_store import async_qdrant
+from src.data.db import SessionLocal
+from src.data.crud.legal import get_corpus_version
+from src.core.exceptions import ModelsNotReadyException
 
-# Global Qdrant Client (reused)
-qdrant = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+_NUMBER = re.compile(r"[0-9\u09E6-\u09EF]+")
+_BANGLA_DIGITS = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
+_version_checked_at = 0.0 # Last check of the shared corpus version in this worker (monotonic)
 
-def ask_question(db: Session, query: str):
+def _cache_scope(query: str, retrieval: RetrievalParams = None) -> str:
+    """
+    Cached answers only match within the same retrieval settings and the same cited numbers:
+    "ধারা ৩০২" and "ধারা ৩০৪" embed almost identically but ask about different sections.
+    """
+    numbers = sorted({n.translate(_BANGLA_DIGITS).lstrip("0") for n in _NUMBER.findall(query)})
+    return f"{resolve_params(retrieval).model_dump_json()}|{','.join(numbers)}"
+
+def _cache_lookup(rag: LegalRAG, query: str, retrieval: RetrievalParams = None):
+    """
+    Returns (cached answer or None, cache key); the key is (query vector, scope, corpus version)
+    to store the answer under, or None when caching is off.
+    """
+    cache = ml_models.get("answer_cache")
+    if cache is None:
+        return None, None
+    key = (rag.embedder.encode(query), _cache_scope(query, retrieval), cache.version)
+    return cache.get(key[0], key[1]), key
+
+def _cache_store(key, query: str, answer: str, chunk_ids):
+    from src.ml.llm import FALLBACK_ANSWERS # Loaded with the LLM; keeps dspy out of app import
+    cache = ml_models.get("answer_cache")
+    if cache is not None and key is not None and answer and answer not in FALLBACK_ANSWERS:
+        vector, scope, version = key
+        cache.put(vector, query, answer, chunk_ids, scope, version)
+
+def _sync_corpus_version(db: Session):
+    """
+    Moves this worker's caches to the shared corpus version, which drops them when an
+    ingestion ran in another worker or from the CLI since the last check.
+    """
+    try:
+        version = get_corpus_version(db)
+    except Exception as e:
+        db.rollback()
+        print(f"WARNING: Corpus version unavailable ({e}); cached results may be stale.")
+        return
+    for name in ("result_cache", "answer_cache"):
+        cache = ml_models.get(name)
+        if cache is not None:
+            cache.set_version(version)
+
+def _build_rag(db: Session):
     # Ensure models are loaded
     embedder = ml_models.get("embedding")
     llm = ml_models.get("llm")
     
-    if not embedder or not llm:
-        return "System is initializing models. Please try again in 5 seconds."
+    if not embedder or not llm or "llm_scheduler" not in ml_models:
+        return None
         
-    rag = LegalRAG(db_session=db, qdrant_client=qdrant, embedder=embedder, llm=llm)
-    return rag.search_and_answer(query)
+    return LegalRAG(db_session=db, qdrant_client=async_qdrant, embedder=embedder, llm=llm, sparse_index=ml_models.get("bm25"), graph=ml_models.get("graph"), result_cache=ml_models.get("result_cache"))
+
+async def _once(text: str):
+    yield text
+
+def _not_ready() -> ModelsNotReadyException:
+    failed = ModelLoader.failed_models()
+    if failed:
+        return ModelsNotReadyException(f"Models failed to load: {', '.join(sorted(failed))}", retry_after=None)
+    return ModelsNotReadyException()
+
+async def _prepare(query: str, retrieval: RetrievalParams = None):
+    """
+    Returns (cached answer, None, ...) on a cache hit, else (None, context, chunk_ids, cache key).
+    Raises ModelsNotReadyException (503) while the models are loading. Retrieval SQL runs on the retrieval pool with its own session and dense search awaits
+    AsyncQdrantClient, so no request thread is held. At most every CORPUS_VERSION_CHECK_SECONDS
+    the caches are synced with the shared corpus version first.
+    """
+    db = SessionLocal()
+    try:
+        rag = _build_rag(db)
+        if rag is None:
+            raise _not_ready()
+        global _version_checked_at
+        if time.monotonic() - _version_checked_at >= settings.CORPUS_VERSION_CHECK_SECONDS:
+            _version_checked_at = time.monotonic()
+            await run_blocking(_sync_corpus_version, db)
+        cached, key = await run_blocking(_cache_lookup, rag, query, retrieval)
+        if cached is not None:
+            return cached, None, None, None
+        context, chunk_ids = await rag.build_context(query, retrieval)
+        return None, context, chunk_ids, key
+    finally:
+        await run_blocking(db.close)
+
+async def ask_question(query: str, retrieval: RetrievalParams = None, lane: str = "default"):
+    """
+    Retrieves, then awaits generation on the LLM scheduler's own worker threads.
+    Raises InferenceQueueFullException / InferenceTimeoutException (429 / 504).
+    """
+    cached, context, chunk_ids, key = await _prepare(query, retrieval)
+    if cached is not None:
+        return cached
+
+    answer = await ml_models["llm_scheduler"].arun(
+        lambda llm: llm.generate_response(context, query), lane=lane, timeout=settings.LLM_TIMEOUT_SECONDS
+    )
+    _cache_store(key, query, answer, chunk_ids)
+    return answer
+
+async def stream_question(query: str, retrieval: RetrievalParams = None, lane: str = "interactive"):
+    """Like ask_question, but returns an async iterator of answer pieces. Admission happens before this returns."""
+    cached, context, chunk_ids, key = await _prepare(query, retrieval)
+    if cached is not None:
+        return _once(cached)
+
+    pieces = ml_models["llm_scheduler"].astream(
+        lambda llm: llm.stream_response(context, query), lane=lane, timeout=settings.LLM_TIMEOUT_SECONDS
+    )
+
+    async def caching():
+        answer = []
+        try:
+            async for piece in pieces:
+                answer.append(piece)
+                yield piece
+        finally:
+            await pieces.aclose() # Stops generation promptly if the client went away
+        # Only reached when the stream completes; abandoned streams are not cached
+        _cache_store(key, query, "".join(answer), chunk_ids)
+
+    return caching()
@@ -0,0 +1,66 @@
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_current_user
+from src.api.v1.endpoints import chat
+from src.data.models import User, ChatSession, ChatMessage
+from src.ml.loader import model_status
+from src.services import rag_service
+
+@pytest.fixture(scope="module")
+def user(db_engine):
+    from tests.conftest import TestingSessionLocal
+    with TestingSessionLocal() as db:
+        user = User(email="query@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield user
+    del app.dependency_overrides[get_current_user]
+
+def test_query_saves_session_and_both_messages(user, client: TestClient, monkeypatch):
+    from tests.conftest import TestingSessionLocal
+    async def fake_ask_question(query, retrieval):
+        return "ধারা ৩০২"
+
+    monkeypatch.setattr(chat, "ask_question", fake_ask_question)
+    first = client.post("/api/v1/chat/query", json={"query": "হত্যার শাস্তি?"}).json()
+    second = client.post("/api/v1/chat/query", json={"query": "আর চুরির?", "session_id": first["session_id"]}).json()
+
+    assert first["response"] == "ধারা ৩০২"
+    assert second["session_id"] == first["session_id"]
+    with TestingSessionLocal() as db:
+        assert db.query(ChatSession).filter_by(user_id=user.id).count() == 1
+        roles = [m.role for m in db.query(ChatMessage).filter_by(session_id=first["session_id"]).order_by(ChatMessage.id)]
+        assert roles == ["user", "assistant", "user", "assistant"]
+
+def test_query_failure_saves_nothing(user, client: TestClient, monkeypatch):
+    from tests.conftest import TestingSessionLocal
+    async def failing_ask_question(query, retrieval):
+        raise RuntimeError("LLM down")
+
+    monkeypatch.setattr(chat, "ask_question", failing_ask_question)
+    with TestingSessionLocal() as db:
+        before = db.query(ChatMessage).count()
+    with pytest.raises(RuntimeError):
+        client.post("/api/v1/chat/query", json={"query": "হত্যার শাস্তি?"})
+
+    with TestingSessionLocal() as db:
+        assert db.query(ChatMessage).count() == before
+
+def test_query_while_models_load_is_503_and_saves_nothing(user, client: TestClient, monkeypatch):
+    from tests.conftest import TestingSessionLocal
+    monkeypatch.setattr(rag_service, "_build_rag", lambda db: None)
+    monkeypatch.setitem(model_status, "llm", {"state": "loading", "seconds": None})
+    with TestingSessionLocal() as db:
+        before = db.query(ChatMessage).count()
+
+    response = client.post("/api/v1/chat/query", json={"query": "হত্যার শাস্তি?"})
+    assert response.status_code == 503 and response.headers["retry-after"] == "5"
+
+    monkeypatch.setitem(model_status, "llm", {"state": "failed", "seconds": 1.0, "error": "model file corrupt"})
+    response = client.post("/api/v1/chat/query", json={"query": "হত্যার শাস্তি?"})
+    assert response.status_code == 503 and "retry-after" not in response.headers
+    with TestingSessionLocal() as db:
+        assert db.query(ChatMessage).count() == before
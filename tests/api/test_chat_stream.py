@@ -0,0 +1,70 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_current_user
+from src.api.v1.endpoints import chat
+from src.data.models import User, ChatMessage
+from src.core.exceptions import InferenceTimeoutException
+
+def _events(body: str):
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        yield event[len("event: "):], json.loads(data[len("data: "):])
+
+def test_query_stream_emits_tokens_and_saves_answer(db_engine, client: TestClient, monkeypatch):
+    from tests.conftest import TestingSessionLocal
+    with TestingSessionLocal() as db:
+        user = User(email="stream@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+    async def fake_stream_question(query, retrieval):
+        async def pieces():
+            for piece in ["ধারা ", "৩০২"]:
+                yield piece
+        return pieces()
+
+    monkeypatch.setattr(chat, "stream_question", fake_stream_question)
+    try:
+        response = client.post("/api/v1/chat/query/stream", json={"query": "হত্যার শাস্তি?"})
+    finally:
+        del app.dependency_overrides[get_current_user]
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = list(_events(response.text))
+    assert [e for e, _ in events] == ["token", "token", "done"]
+    assert "".join(d["token"] for e, d in events if e == "token") == "ধারা ৩০২"
+    
+    with TestingSessionLocal() as db:
+        saved = db.query(ChatMessage).filter_by(session_id=events[-1][1]["session_id"]).order_by(ChatMessage.id).all()
+        assert [(m.role, m.content) for m in saved] == [("user", "হত্যার শাস্তি?"), ("assistant", "ধারা ৩০২")]
+
+@pytest.mark.parametrize("tokens_before_failure", [0, 1])
+def test_query_stream_failing_before_the_answer_completes_saves_nothing(tokens_before_failure, db_engine, client: TestClient, monkeypatch):
+    from tests.conftest import TestingSessionLocal
+    with TestingSessionLocal() as db:
+        user = User(email=f"stream-fail-{tokens_before_failure}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        before = db.query(ChatMessage).count()
+    app.dependency_overrides[get_current_user] = lambda: user
+    async def fake_stream_question(query, retrieval):
+        async def pieces():
+            for piece in ["ধারা "][:tokens_before_failure]:
+                yield piece
+            raise InferenceTimeoutException()
+        return pieces()
+
+    monkeypatch.setattr(chat, "stream_question", fake_stream_question)
+    try:
+        response = client.post("/api/v1/chat/query/stream", json={"query": "হত্যার শাস্তি?"})
+    finally:
+        del app.dependency_overrides[get_current_user]
+
+    assert [e for e, _ in _events(response.text)] == ["token"] * tokens_before_failure + ["error"]
+    with TestingSessionLocal() as db:
+        assert db.query(ChatMessage).count() == before # No user message left without its answer
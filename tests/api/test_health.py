@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+from src.ml.loader import model_status
+
+def test_liveness_does_not_wait_for_models(client: TestClient):
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+def test_readiness_reports_model_state(client: TestClient):
+    response = client.get("/health/ready")
+    assert response.status_code in (200, 503)
+    body = response.json()
+    assert set(body["models"]) >= {"embedding", "llm"}
+    assert (response.status_code == 200) == (body["status"] == "ready")
+
+def test_readiness_surfaces_failed_models(client: TestClient, monkeypatch):
+    for name in ("embedding", "llm_scheduler"):
+        monkeypatch.setitem(model_status, name, {"state": "ready", "seconds": 1.0})
+    monkeypatch.setitem(model_status, "llm", {"state": "failed", "seconds": 1.0, "error": "model file corrupt"})
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
+    assert response.json()["errors"] == {"llm": "model file corrupt"}
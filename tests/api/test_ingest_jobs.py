@@ -0,0 +1,69 @@
+import threading
+import pytest
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_current_user
+from src.data.models import User, IngestionJob
+from src.services.ingestion_service import IngestionService, INSTANCE_ID
+
+@pytest.fixture(scope="module")
+def user(db_engine):
+    from tests.conftest import TestingSessionLocal
+    with TestingSessionLocal() as db:
+        user = User(email="admin@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield user
+    del app.dependency_overrides[get_current_user]
+
+def _job(**values) -> int:
+    from tests.conftest import TestingSessionLocal
+    with TestingSessionLocal() as db:
+        job = IngestionJob(filename="corpus.jsonl", file_path="data/uploads/corpus.jsonl", total_bytes=200, byte_offset=50, **values)
+        db.add(job)
+        db.commit()
+        return job.id
+
+def test_status_reports_progress(user, client: TestClient):
+    job_id = _job(status="failed")
+
+    body = client.get(f"/api/v1/admin/ingest/{job_id}").json()
+    assert (body["status"], body["progress"]) == ("failed", 0.25)
+    assert client.get("/api/v1/admin/ingest/999999").status_code == 404
+
+def test_resume_claims_the_job_before_responding(user, client: TestClient, monkeypatch):
+    runs = []
+    monkeypatch.setattr(IngestionService, "run_job", staticmethod(lambda job_id, claimed=False: runs.append((job_id, claimed))))
+    job_id = _job(status="failed")
+
+    response = client.post(f"/api/v1/admin/ingest/{job_id}/resume")
+    assert response.status_code == 200 and response.json()["status"] == "running"
+    assert runs == [(job_id, True)]
+
+def test_resume_of_a_live_job_is_a_conflict(user, client: TestClient, monkeypatch):
+    runs = []
+    monkeypatch.setattr(IngestionService, "run_job", staticmethod(lambda job_id, claimed=False: runs.append(job_id)))
+    job_id = _job(status="running", owner=INSTANCE_ID, updated_at=datetime.now(timezone.utc))
+
+    assert client.post(f"/api/v1/admin/ingest/{job_id}/resume").status_code == 409
+    assert client.post(f"/api/v1/admin/ingest/{_job(status='completed')}/resume").status_code == 409
+    assert runs == []
+
+def test_stream_responds_before_ingestion_finishes(user, client: TestClient, monkeypatch):
+    received, release, done = [], threading.Event(), threading.Event()
+    def fake_run_job(job_id, byte_chunks=None, claimed=False):
+        received.append(b"".join(byte_chunks))
+        release.wait(5)
+        done.set()
+
+    monkeypatch.setattr(IngestionService, "run_job", staticmethod(fake_run_job))
+    body = b'{"chunk_id": "c0"}\n' * 100
+    response = client.post("/api/v1/admin/ingest/stream?filename=corpus.jsonl", content=body)
+
+    assert response.status_code == 200
+    assert response.json()["filename"] == "corpus.jsonl" and not done.is_set()
+    release.set()
+    assert done.wait(5) and received == [body]
@@ -1,16 +1,34 @@
+import os
+
+# Before Settings is created: don't resume ingestion jobs from the loader thread against the test database
+os.environ["INGEST_AUTO_RESUME"] = "false"
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from src.main import app
-from src.data.db import Base, get_db
-from src.config import settings
+from src.data.db import Base
+from src.api.dependencies import get_db, get_async_db, get_async_sessionmaker
+from src.core.config import settings
 
 # Use SQLite for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+@pytest.fixture(scope="session", autouse=True)
+def index_paths(tmp_path_factory):
+    # Startup builds and saves missing indexes; keep them out of the working tree
+    models_dir = tmp_path_factory.mktemp("models")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(settings, "BM25_INDEX_PATH", str(models_dir / "bm25_index"))
+        mp.setattr(settings, "GRAPH_INDEX_PATH", str(models_dir / "legal_graph"))
+        yield models_dir
 
 @pytest.fixture(scope="module")
 def db_engine():
@@ -40,6 +58,12 @@ def client():
         finally:
             db.close()
             
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_sessionmaker] = lambda: TestingAsyncSessionLocal
     with TestClient(app) as c:
         yield c
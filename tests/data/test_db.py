@@ -0,0 +1,58 @@
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from prometheus_client import REGISTRY
+from src.data import db
+
+POOLER_URL = "postgresql://postgres.ref:pw@aws-0-region.pooler.supabase.com:6543/postgres?sslmode=require"
+DIRECT_URL = "postgresql://postgres:pw@db.example.com:5432/postgres"
+
+def test_transaction_pooler_disables_prepared_statement_caches():
+    args = db._async_connect_args(POOLER_URL)
+
+    assert args["statement_cache_size"] == 0 and args["prepared_statement_cache_size"] == 0
+    names = {args["prepared_statement_name_func"]() for _ in range(3)}
+    assert len(names) == 3 # Unique per statement
+    assert args["ssl"] == "require" and "server_settings" not in args
+    assert "options" not in db._connect_args(POOLER_URL) # Poolers reject startup options
+
+def test_direct_connection_keeps_caches_and_sets_statement_timeout(monkeypatch):
+    monkeypatch.setattr(db.settings, "DB_STATEMENT_TIMEOUT_MS", 30000)
+    args = db._async_connect_args(DIRECT_URL)
+
+    assert "statement_cache_size" not in args and "prepared_statement_name_func" not in args
+    assert args["server_settings"] == {"statement_timeout": "30000"}
+    assert db._connect_args(DIRECT_URL)["options"] == "-c statement_timeout=30000"
+
+def test_pooler_setting_overrides_the_port_guess(monkeypatch):
+    monkeypatch.setattr(db.settings, "DB_TRANSACTION_POOLER", True)
+    assert db._async_connect_args(DIRECT_URL)["statement_cache_size"] == 0
+    monkeypatch.setattr(db.settings, "DB_TRANSACTION_POOLER", False)
+    assert "statement_cache_size" not in db._async_connect_args(POOLER_URL)
+
+def test_sqlite_gets_no_postgres_args():
+    assert db._connect_args("sqlite:///./test.db") == {}
+    assert db._async_connect_args("sqlite:///./test.db") == {}
+
+def test_pool_options_come_from_settings(monkeypatch):
+    for name, value in {"DB_POOL_SIZE": 3, "DB_MAX_OVERFLOW": 4, "DB_POOL_TIMEOUT": 2.5, "DB_POOL_RECYCLE": 900, "DB_POOL_PRE_PING": False}.items():
+        monkeypatch.setattr(db.settings, name, value)
+
+    assert db._pool_options(DIRECT_URL) == {
+        "pool_size": 3, "max_overflow": 4, "pool_timeout": 2.5, "pool_recycle": 900, "pool_pre_ping": False,
+    }
+    assert db._pool_options("sqlite:///./test.db") == {}
+
+    engine = create_async_engine(db._async_url(DIRECT_URL), **db._pool_options(DIRECT_URL)) # Doesn't connect
+    pool = engine.sync_engine.pool
+    assert (pool.size(), pool._max_overflow, pool._timeout, pool._recycle, pool._pre_ping) == (3, 4, 2.5, 900, False)
+
+def test_pool_gauges_track_checkouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    db._instrument(engine, "test")
+    sample = lambda name: REGISTRY.get_sample_value(name, {"engine": "test"})
+    opened = sample("db_connections_opened_total") or 0.0
+
+    with engine.connect():
+        assert sample("db_pool_connections_in_use") == 1
+        assert sample("db_connections_opened_total") == opened + 1
+    assert sample("db_pool_connections_in_use") == 0 and sample("db_pool_connections_idle") == 1
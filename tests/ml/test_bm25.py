@@ -0,0 +1,33 @@
+import numpy as np
+from src.ml.bm25 import BM25Index
+from src.ml.tokenizer import tokenize
+
+DOCS = [
+    ("pc_302", "দণ্ডবিধির ৩০২ ধারা অনুযায়ী হত্যার শাস্তি মৃত্যুদণ্ড"),
+    ("pc_379", "চুরির শাস্তি ধারা ৩৭৯ অনুযায়ী কারাদণ্ড"),
+    ("const_7", "সংবিধানের ৭ অনুচ্ছেদ প্রজাতন্ত্রের সকল ক্ষমতার মালিক জনগণ"),
+]
+
+def test_tokenizer_keeps_bangla_words_whole():
+    assert tokenize("হত্যার শাস্তি কী?") == ["হত্যার", "শাস্তি"]
+
+def test_bm25_ranks_matching_chunks():
+    index = BM25Index.build(DOCS)
+    
+    results = index.search("হত্যার শাস্তি", limit=10)
+    assert [chunk_id for chunk_id, _ in results] == ["pc_302", "pc_379"]
+    assert index.search("অজানা") == []
+
+def test_bm25_roundtrip_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "bm25")
+    BM25Index.build(DOCS).save(path)
+    
+    index = BM25Index.load(path)
+    assert isinstance(index.postings, np.memmap)
+    assert index.search("জনগণ", limit=1)[0][0] == "const_7"
+
+def test_bm25_search_restricted_to_allowed_chunks():
+    index = BM25Index.build(DOCS)
+
+    assert [chunk_id for chunk_id, _ in index.search("শাস্তি", allowed={"pc_379", "unknown"})] == ["pc_379"]
+    assert index.search("হত্যার", allowed={"const_7"}) == []
@@ -0,0 +1,66 @@
+from src.ml.context import ContextPacker, context_budget
+from src.core.config import settings
+
+class CharTokenizer:
+    """One token per character, mirroring llama.cpp's tokenize/detokenize signatures."""
+    def tokenize(self, data: bytes, add_bos: bool = False):
+        return list(data.decode("utf-8"))
+
+    def detokenize(self, tokens):
+        return "".join(tokens).encode("utf-8")
+
+def _item(chunk_id, content, fused_score=None, token_count=None):
+    item = {'id': chunk_id, 'content': content, 'source': "law.jsonl",
+            'payload': {'chunk_id': chunk_id, 'text': content, 'token_count': token_count}}
+    if fused_score is not None:
+        item['fused_score'] = fused_score
+    return item
+
+HEADER = len("Source: law.jsonl\nContent: ")
+
+def test_pack_orders_by_score_and_dedups():
+    packer = ContextPacker(tokenizer=CharTokenizer())
+    items = [_item("b", "বি" * 10, 0.2), _item("graph", "জি" * 10), _item("a", "এ" * 10, 0.9), _item("a2", "এ" * 10, 0.1)]
+    
+    packed, used = packer.pack(items, budget=1000)
+    assert [i['id'] for i in packed] == ["a", "b", "graph"]
+    assert used == len(packer.render(packed))
+
+def test_pack_trims_overflow_and_keeps_smaller_chunks():
+    packer = ContextPacker(tokenizer=CharTokenizer(), min_trim_tokens=10)
+    budget = HEADER + 100 + 2 + HEADER + 50
+    items = [_item("a", "ক" * 100, 0.9), _item("b", "খ" * 500, 0.5), _item("c", "গ" * 5, 0.1)]
+    
+    packed, used = packer.pack(items, budget)
+    assert used == len(packer.render(packed)) <= budget
+    assert [i['id'] for i in packed] == ["a", "b"]
+    assert packed[1]['trimmed'] and packed[1]['content'].startswith("খ" * 40)
+    
+    # Too little room left to be worth trimming: drop it, keep what still fits whole
+    packed, _ = packer.pack(items, HEADER + 100 + 2 + HEADER + 5)
+    assert [i['id'] for i in packed] == ["a", "c"]
+
+def test_pack_uses_stored_token_count_without_tokenizer():
+    packer = ContextPacker()
+    items = [_item("a", "ক" * 3000, 0.9, token_count=3000), _item("b", "খ" * 10, 0.5, token_count=10)]
+    
+    packed, used = packer.pack(items, budget=40)
+    assert [i['id'] for i in packed] == ["b"]
+    packed, used = packer.pack(items, budget=100)
+    assert [i['id'] for i in packed] == ["a"] and packed[0]['trimmed']
+    assert used == packer.count(packer.render(packed)) <= 100
+
+def test_trimmed_chunk_that_retokenizes_longer_is_cut_again_and_counted():
+    class SpacingTokenizer(CharTokenizer):
+        """Detokenizes with a space between tokens, so a cut text re-tokenizes to more tokens."""
+        def detokenize(self, tokens):
+            return " ".join(tokens).encode("utf-8")
+
+    packer = ContextPacker(tokenizer=SpacingTokenizer(), min_trim_tokens=10)
+    packed, used = packer.pack([_item("a", "ক" * 500, 0.9)], budget=HEADER + 100)
+
+    assert packed[0]['trimmed']
+    assert used == len(packer.render(packed)) <= HEADER + 100
+
+def test_context_budget_reserves_answer_and_prompt():
+    assert context_budget(50) <= settings.LLM_CONTEXT_WINDOW - settings.LLM_MAX_TOKENS - settings.PROMPT_OVERHEAD_TOKENS - 50
@@ -0,0 +1,49 @@
+import os
+import sys
+import types
+from src.ml.embeddings import BanglaEmbedding, converted_model_dir, mmap_weights
+
+def test_converted_directory_is_preferred_over_pickle(tmp_path, monkeypatch):
+    pkl = tmp_path / "Finetuned Embedding Model.pkl"
+    pkl.write_bytes(b"not a pickle")
+    os.makedirs(converted_model_dir(str(pkl)))
+    
+    loaded = []
+    fake = types.SimpleNamespace(SentenceTransformer=lambda path, device: loaded.append(path) or "model")
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake)
+    
+    embedder = BanglaEmbedding(model_path=str(pkl))
+    assert embedder.model == "model"
+    assert loaded == [str(tmp_path / "Finetuned Embedding Model")]
+
+def test_directory_weights_are_memory_mapped(tmp_path, monkeypatch):
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "model.safetensors").write_bytes(b"weights")
+
+    class FakeTransformer:
+        def __init__(self, fail=False):
+            self.fail = fail
+            self.loaded = None
+
+        def load_state_dict(self, state_dict, assign=False):
+            if self.fail:
+                raise RuntimeError("Missing key(s) in state_dict")
+            self.loaded = (state_dict, assign)
+
+    mapped = {"embeddings.word_embeddings.weight": "mmap-backed tensor"}
+    safetensors = types.ModuleType("safetensors")
+    safetensors.torch = types.SimpleNamespace(load_file=lambda path, device: mapped if path == str(model_dir / "model.safetensors") else None)
+    monkeypatch.setitem(sys.modules, "safetensors", safetensors)
+    monkeypatch.setitem(sys.modules, "safetensors.torch", safetensors.torch)
+
+    transformer = FakeTransformer()
+    st_model = [types.SimpleNamespace(auto_model=transformer)]
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=lambda path, device: st_model))
+
+    assert BanglaEmbedding(model_path=str(model_dir), backend="torch").model is st_model
+    assert transformer.loaded == (mapped, True) # assign=True keeps the mapped tensors instead of copying
+
+    mismatched = [types.SimpleNamespace(auto_model=FakeTransformer(fail=True))]
+    assert not mmap_weights(mismatched, str(model_dir))
+    assert not mmap_weights(st_model, str(tmp_path)) # No model.safetensors
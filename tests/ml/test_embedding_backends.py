@@ -0,0 +1,130 @@
+import sys
+import types
+import numpy as np
+import pytest
+from src.ml import embedding_backends
+from src.ml.embedding_backends import cosine_drift, parity, PARITY_TEXTS
+from src.ml.embeddings import BanglaEmbedding, EMBEDDING_DIM
+
+def test_cosine_drift_reports_mean_and_worst_row():
+    reference = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    candidate = np.array([[2.0, 0.0], [1.0, 1.0]], dtype=np.float32)
+    
+    report = cosine_drift(reference, candidate)
+    assert report["n"] == 2
+    assert report["min_cosine"] == pytest.approx(np.sqrt(0.5))
+    assert report["mean_cosine"] == pytest.approx((1 + np.sqrt(0.5)) / 2)
+    with pytest.raises(ValueError):
+        cosine_drift(reference, candidate[:1])
+
+def test_missing_onnx_export_falls_back_to_torch(tmp_path, monkeypatch):
+    from src.ml import embeddings
+    monkeypatch.setattr(embeddings.settings, "EMBEDDING_ONNX_PATH", str(tmp_path / "missing"))
+    
+    embedder = BanglaEmbedding(model_path="missing.pkl", backend="onnx")
+    assert embedder.backend == "torch"
+    assert embedder.encode("ধারা").shape == (384,)
+
+# A fixed projection of bag-of-characters features stands in for the transformer
+PROJECTION = np.random.default_rng(0).standard_normal((98, EMBEDDING_DIM))
+
+def _reference(input_ids, attention_mask):
+    counts = np.zeros((len(input_ids), len(PROJECTION)))
+    for row, (ids, mask) in enumerate(zip(input_ids, attention_mask)):
+        np.add.at(counts[row], ids[mask > 0], 1.0)
+    vectors = counts @ PROJECTION
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+class FakeTokenizer:
+    def __call__(self, texts, padding=True, truncation=True, max_length=512, return_tensors="np"):
+        ids = [[ord(c) % 97 + 1 for c in text][:max_length] for text in texts]
+        width = max(len(row) for row in ids)
+        input_ids = np.array([row + [0] * (width - len(row)) for row in ids], dtype=np.int32)
+        return {"input_ids": input_ids, "attention_mask": (input_ids > 0).astype(np.int32), "token_type_ids": np.zeros_like(input_ids)}
+
+class FakeSentenceTransformer:
+    """The fp32 reference: same features, computed in float64."""
+    tokenizer = FakeTokenizer()
+
+    def __getitem__(self, index):
+        return types.SimpleNamespace()
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        tokens = self.tokenizer(texts)
+        return _reference(tokens["input_ids"], tokens["attention_mask"])
+
+class FakeInferenceSession:
+    """An exported graph taking input_ids and attention_mask (no token_type_ids), L2-normalized output."""
+    runs = []
+
+    def __init__(self, path, options, providers):
+        assert path.endswith("model.onnx") and providers == ["CPUExecutionProvider"]
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name="input_ids"), types.SimpleNamespace(name="attention_mask")]
+
+    def run(self, output_names, feed):
+        assert set(feed) == {"input_ids", "attention_mask"} and all(v.dtype == np.int64 for v in feed.values())
+        self.runs.append(len(feed["input_ids"]))
+        return [_reference(feed["input_ids"], feed["attention_mask"]).astype(np.float32)]
+
+@pytest.fixture
+def fake_backends(tmp_path, monkeypatch):
+    onnx_dir = tmp_path / "embedding_onnx"
+    onnx_dir.mkdir()
+    (onnx_dir / "model.onnx").write_bytes(b"graph")
+    (onnx_dir / "max_seq_length.txt").write_text("64")
+    (tmp_path / "model").mkdir()
+    monkeypatch.setattr(embedding_backends.settings, "EMBEDDING_ONNX_PATH", str(onnx_dir))
+    monkeypatch.setattr(embedding_backends.settings, "EMBEDDING_MODEL_PATH", str(tmp_path / "model"))
+
+    ort = types.SimpleNamespace(
+        SessionOptions=types.SimpleNamespace,
+        GraphOptimizationLevel=types.SimpleNamespace(ORT_ENABLE_ALL=99),
+        InferenceSession=FakeInferenceSession,
+    )
+    monkeypatch.setitem(sys.modules, "onnxruntime", ort)
+    monkeypatch.setitem(sys.modules, "transformers", types.SimpleNamespace(AutoTokenizer=types.SimpleNamespace(from_pretrained=lambda path: FakeTokenizer())))
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=lambda path, device: FakeSentenceTransformer()))
+    FakeInferenceSession.runs = []
+    return tmp_path
+
+def test_onnx_backend_encodes_normalized_batches_matching_torch(fake_backends):
+    embedder = BanglaEmbedding(model_path=str(fake_backends / "model"), cache_size=0, backend="onnx")
+    assert embedder.backend == "onnx"
+
+    texts = PARITY_TEXTS * 3
+    vectors = embedder.encode_batch(texts, batch_size=4)
+    assert vectors.shape == (len(texts), EMBEDDING_DIM) and vectors.dtype == np.float32
+    assert FakeInferenceSession.runs == [4, 4, 4, 3]
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+
+    report = parity("onnx")
+    assert report["backend"] == "onnx" and report["n"] == len(PARITY_TEXTS)
+    assert report["min_cosine"] > 0.9999
+
+def test_int8_backend_stays_close_to_fp32(fake_backends, monkeypatch):
+    pytest.importorskip("torch.nn") # Needs real torch for quantize_dynamic
+    import torch
+    torch.manual_seed(0)
+
+    class TinyEncoder(torch.nn.Sequential):
+        """Linear layers over the bag-of-characters features, so dynamic quantization has work to do."""
+        tokenizer = FakeTokenizer()
+
+        def encode(self, texts, batch_size=32, **kwargs):
+            tokens = self.tokenizer(texts)
+            counts = np.zeros((len(texts), len(PROJECTION)), dtype=np.float32)
+            for row, (ids, mask) in enumerate(zip(tokens["input_ids"], tokens["attention_mask"])):
+                np.add.at(counts[row], ids[mask > 0], 1.0)
+            vectors = self(torch.from_numpy(counts))
+            return torch.nn.functional.normalize(vectors, dim=1).numpy()
+
+    fp32 = TinyEncoder(torch.nn.Linear(len(PROJECTION), 256), torch.nn.ReLU(), torch.nn.Linear(256, EMBEDDING_DIM))
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=lambda path, device: fp32))
+
+    embedder = BanglaEmbedding(model_path=str(fake_backends / "model"), cache_size=0, backend="int8")
+    assert embedder.backend == "int8"
+    assert isinstance(embedder.model[0], torch.ao.nn.quantized.dynamic.Linear)
+    assert embedder.encode_batch(PARITY_TEXTS).shape == (len(PARITY_TEXTS), EMBEDDING_DIM)
+    assert parity("int8")["min_cosine"] > 0.99
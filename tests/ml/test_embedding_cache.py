@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from src.ml.embeddings import BanglaEmbedding
+
+class CountingModel:
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts, **kwargs):
+        self.texts.extend(texts)
+        return np.array([[len(t), 1.0] + [0.0] * 382 for t in texts])
+
+@pytest.fixture
+def embedder():
+    embedder = BanglaEmbedding(model_path="missing.pkl", cache_size=2)
+    embedder.model = CountingModel()
+    return embedder
+
+def test_repeated_queries_skip_the_model(embedder):
+    first = embedder.encode("হত্যার শাস্তি")
+    again = embedder.encode("  হত্যার   শাস্তি ")
+    
+    assert embedder.model.texts == ["হত্যার শাস্তি"]
+    assert again is first and again.dtype == np.float32
+    with pytest.raises(ValueError):
+        again[0] = 0.0 # Shared vectors are read-only
+
+def test_cache_is_bounded_and_batches_bypass_it(embedder):
+    for text in ["a", "b", "c", "a"]:
+        embedder.encode(text)
+    assert embedder.model.texts == ["a", "b", "c", "a"] # "a" was evicted by "c"
+    assert len(embedder.cache) == 2
+    
+    embedder.encode_batch(["d"])
+    assert len(embedder.cache) == 2 and embedder.cache.get(embedder.cache.key("d")) is None
@@ -0,0 +1,30 @@
+import numpy as np
+from src.ml.embeddings import BanglaEmbedding, EMBEDDING_DIM
+
+class RecordingModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.calls.append((list(texts), batch_size))
+        # float64 rows tagged with each text's length, to check dtype and order
+        return np.array([[float(len(t))] + [0.0] * (EMBEDDING_DIM - 1) for t in texts])
+
+def test_encode_batch_is_one_model_call_in_input_order():
+    embedder = BanglaEmbedding(model_path="missing.pkl", cache_size=0)
+    embedder.model = RecordingModel()
+    texts = ["ক", "খখখ", "গগ"]
+
+    vectors = embedder.encode_batch(texts, batch_size=8)
+
+    assert embedder.model.calls == [(texts, 8)]
+    assert vectors.shape == (3, EMBEDDING_DIM) and vectors.dtype == np.float32
+    assert vectors.flags["C_CONTIGUOUS"]
+    assert vectors[:, 0].tolist() == [1.0, 3.0, 2.0]
+
+def test_encode_batch_of_nothing_skips_the_model():
+    embedder = BanglaEmbedding(model_path="missing.pkl", cache_size=0)
+    embedder.model = RecordingModel()
+
+    assert embedder.encode_batch([]).shape == (0, EMBEDDING_DIM)
+    assert embedder.model.calls == []
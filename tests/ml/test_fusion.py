@@ -0,0 +1,32 @@
+import pytest
+from src.ml.fusion import fuse
+
+def hit(chunk_id, score, content="text"):
+    return {'id': chunk_id, 'score': score, 'content': content, 'source': "act.txt", 'payload': {'chunk_id': chunk_id}}
+
+DENSE = [hit("a", 0.9), hit("b", 0.8), hit("c", 0.1)]
+SPARSE = [hit("c", 12.0, content=None), hit("d", 3.0, content=None)]
+
+def test_rrf_deduplicates_by_chunk_id():
+    results = fuse({"dense": DENSE, "sparse": SPARSE}, weights={"dense": 1.0, "sparse": 1.0}, k=60, top_k=10)
+    
+    ids = [r['id'] for r in results]
+    assert ids[0] == "c" # Found by both retrievers
+    assert sorted(ids) == ["a", "b", "c", "d"]
+    assert results[0]['content'] == "text" # Keeps the copy that has text
+
+def test_weights_and_top_k():
+    results = fuse({"dense": DENSE, "sparse": SPARSE}, weights={"dense": 1.0, "sparse": 0.0}, top_k=2)
+    assert [r['id'] for r in results] == ["a", "b"]
+
+def test_weighted_normalizes_scores_per_retriever():
+    results = fuse({"dense": DENSE, "sparse": SPARSE}, weights={"dense": 1.0, "sparse": 1.0}, method="weighted", top_k=10)
+    
+    scores = {r['id']: r['fused_score'] for r in results}
+    assert scores["c"] == pytest.approx(1.0) # 0.0 dense + 1.0 sparse
+    assert scores["a"] == pytest.approx(1.0)
+    assert [r['id'] for r in results][:2] == ["a", "c"] # Ties keep first-seen order
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        fuse({"dense": DENSE}, weights={}, method="borda")
@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+from src.data.models import LegalDocument, LegalChunk
+from src.ml.rag_engine import LegalRAG
+from src.data.schemas import RetrievalParams
+
+def seed(db):
+    doc = LegalDocument(filename="penal_code.txt", title="penal_code")
+    db.add(doc)
+    db.flush()
+    db.add_all([
+        LegalChunk(chunk_id="pc_302", document_id=doc.id, content="দণ্ডবিধির ৩০২ ধারা অনুযায়ী হত্যার শাস্তি মৃত্যুদণ্ড", hierarchy=["দণ্ডবিধি"], token_count=12),
+        LegalChunk(chunk_id="pc_379", document_id=doc.id, content="চুরির শাস্তি ধারা ৩৭৯ অনুযায়ী কারাদণ্ড", hierarchy=["দণ্ডবিধি"], token_count=9),
+    ])
+    db.flush()
+
+def test_keyword_search_fallback_ranks_by_term_overlap(db):
+    seed(db)
+    rag = LegalRAG(db_session=db, qdrant_client=None, embedder=None, llm=None)
+
+    results = rag._keyword_search("হত্যার শাস্তি কী")
+    
+    assert [r['id'] for r in results] == ["pc_302", "pc_379"]
+    assert results[0]['score'] > results[1]['score']
+    assert results[0]['source'] == "penal_code.txt"
+
+class FakeQdrant:
+    def __init__(self, chunk_ids):
+        self.chunk_ids = chunk_ids
+        self.kwargs = None
+
+    async def query_points(self, **kwargs):
+        self.kwargs = kwargs
+        points = [SimpleNamespace(payload={"chunk_id": c}, score=1.0 - i / 10) for i, c in enumerate(self.chunk_ids)]
+        return SimpleNamespace(points=points)
+
+class FakeEmbedder:
+    def encode(self, text):
+        return [0.0] * 4
+
+def test_dense_hits_are_hydrated_from_sql(db):
+    seed(db)
+    qdrant = FakeQdrant(["pc_379", "deleted_chunk", "pc_302"])
+    rag = LegalRAG(db_session=db, qdrant_client=qdrant, embedder=FakeEmbedder(), llm=None)
+
+    results = asyncio.run(rag.hybrid_search("শাস্তি", RetrievalParams(sparse_weight=0)))
+
+    assert qdrant.kwargs["with_payload"] == ["chunk_id"]
+    assert [r['id'] for r in results] == ["pc_379", "pc_302"] # Ids missing from SQL are dropped
+    assert results[0]['content'].startswith("চুরির") and results[0]['source'] == "penal_code.txt"
+
+def test_context_awaits_qdrant_and_hydrates(db):
+    seed(db)
+    rag = LegalRAG(db_session=db, qdrant_client=FakeQdrant(["pc_302"]), embedder=FakeEmbedder(), llm=None)
+
+    context, chunk_ids = asyncio.run(rag.build_context("হত্যার শাস্তি", RetrievalParams(sparse_weight=0)))
+
+    assert chunk_ids == ["pc_302"] and "মৃত্যুদণ্ড" in context
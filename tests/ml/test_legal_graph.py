@@ -0,0 +1,39 @@
+import numpy as np
+from src.ml.legal_graph import LegalGraph, parse_hierarchy
+
+ROWS = [
+    ("pc_302", 1, ["অধ্যায় ১৬", "হত্যা"]),
+    ("pc_304", 1, ["অধ্যায় ১৬", "হত্যা"]),
+    ("pc_323", 1, '["অধ্যায় ১৬", "আঘাত"]'),
+    ("pc_379", 1, "{অধ্যায় ১৭,চুরি}"),
+    ("crpc_154", 2, ["অধ্যায় ১৬", "হত্যা"]),
+]
+
+def test_parse_hierarchy_accepts_stored_formats():
+    assert parse_hierarchy(["a", "b"]) == ["a", "b"]
+    assert parse_hierarchy('["a", "b"]') == ["a", "b"]
+    assert parse_hierarchy('{a,"b c"}') == ["a", "b c"]
+    assert parse_hierarchy(None) == []
+
+def test_expand_prefers_specific_sections_within_document():
+    graph = LegalGraph.build(ROWS)
+    
+    related = [chunk_id for chunk_id, _ in graph.expand(["pc_302"], limit=10)]
+    # Same section first, same chapter next; other documents and chapters never
+    assert related == ["pc_304", "pc_323"]
+
+def test_expand_multi_hop_and_limits():
+    graph = LegalGraph.build(ROWS)
+    
+    assert graph.expand(["pc_302"], limit=1) == graph.expand(["pc_302"], limit=10)[:1]
+    assert graph.expand(["unknown"]) == []
+    # A chapter holding every chunk of the document is too broad to expand through
+    assert [c for c, _ in graph.expand(["pc_302"], max_section_size=2)] == ["pc_304"]
+
+def test_graph_roundtrip_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "graph")
+    LegalGraph.build(ROWS).save(path)
+    
+    graph = LegalGraph.load(path)
+    assert isinstance(graph.section_chunks, np.memmap)
+    assert graph.expand(["pc_379"]) == []
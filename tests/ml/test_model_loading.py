@@ -0,0 +1,40 @@
+import threading
+import pytest
+from src.ml import loader
+from src.ml.loader import ModelLoader, ml_models, model_status
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    monkeypatch.setattr(loader.settings, "SPARSE_BACKEND", "postgres")
+    monkeypatch.setattr(ModelLoader, "load_legal_graph", staticmethod(lambda: "graph"))
+    monkeypatch.setattr(ModelLoader, "load_llm_scheduler", staticmethod(lambda llm: f"scheduler({llm})"))
+    yield
+    ml_models.clear()
+    model_status.clear()
+    loader._loaded_events.clear()
+
+def test_models_load_in_parallel(monkeypatch):
+    # Each loader waits for the other, so this only passes if both run at once
+    both_started = threading.Barrier(2, timeout=2)
+    def load(name):
+        both_started.wait()
+        return name
+    monkeypatch.setattr(ModelLoader, "load_embedding_model", staticmethod(lambda: load("embedder")))
+    monkeypatch.setattr(ModelLoader, "load_llm_model", staticmethod(lambda: load("llm")))
+    
+    ModelLoader.start_background_loading().join(5)
+    assert ModelLoader.is_ready()
+    assert ml_models["llm_scheduler"] == "scheduler(llm)"
+    assert all(status["state"] == "ready" and status["seconds"] is not None for status in model_status.values())
+
+def test_failed_model_is_reported_not_ready(monkeypatch):
+    def broken():
+        raise RuntimeError("model file corrupt")
+    monkeypatch.setattr(ModelLoader, "load_embedding_model", staticmethod(lambda: "embedder"))
+    monkeypatch.setattr(ModelLoader, "load_llm_model", staticmethod(broken))
+    
+    ModelLoader.load_all()
+    assert not ModelLoader.is_ready()
+    assert model_status["llm"]["error"] == "model file corrupt"
+    assert model_status["llm_scheduler"]["state"] == "failed"
+    assert ModelLoader.wait_for("embedding", timeout=0) == "embedder"
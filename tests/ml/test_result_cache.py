@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+from src.ml.rag_engine import LegalRAG
+from src.ml.result_cache import ResultCache, estimate_size
+
+def _results(n, text="দণ্ডবিধি " * 50):
+    return [{'id': f"c{i}", 'content': text, 'score': 1.0, 'payload': {}} for i in range(n)]
+
+def test_cache_is_bounded_by_bytes():
+    one = estimate_size(("k", 0)) + estimate_size(_results(1))
+    cache = ResultCache(max_bytes=one * 3)
+    for i in range(5):
+        cache.put(("k", i), _results(1))
+    
+    assert len(cache) == 3 and cache.size_bytes <= one * 3
+    assert cache.get(("k", 0)) is None and cache.get(("k", 4)) is not None
+    cache.put(("big",), _results(10)) # Larger than the whole cache: not stored
+    assert cache.get(("big",)) is None
+
+def test_version_change_drops_entries_and_stale_puts():
+    cache = ResultCache(max_bytes=1 << 20)
+    cache.put("q", _results(1))
+    cache.set_version(cache.version) # Unchanged: entries stay
+    assert cache.get("q") is not None
+    version = cache.version
+    cache.set_version(version + 1)
+    
+    assert cache.get("q") is None
+    cache.put("q", _results(1), version) # Computed against the old corpus
+    assert cache.get("q") is None
+
+class CountingQdrant:
+    def __init__(self):
+        self.calls = 0
+
+    async def query_points(self, limit, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(points=[SimpleNamespace(payload={"chunk_id": f"c{i}"}, score=1.0) for i in range(limit)])
+
+class FakeEmbedder:
+    def encode(self, text):
+        return [0.0] * 4
+
+def test_vector_search_is_cached_by_normalized_query():
+    qdrant = CountingQdrant()
+    rag = LegalRAG(None, qdrant, FakeEmbedder(), None, result_cache=ResultCache(max_bytes=1 << 20))
+    first = asyncio.run(rag._vector_search("হত্যার  শাস্তি", 3))
+    first[0]['fused_score'] = 1.0 # Callers mutating results must not corrupt the cache
+    
+    again = asyncio.run(rag._vector_search(" হত্যার শাস্তি ", 3))
+    assert qdrant.calls == 1 and 'fused_score' not in again[0]
+    asyncio.run(rag._vector_search("হত্যার শাস্তি", 5))
+    assert qdrant.calls == 2
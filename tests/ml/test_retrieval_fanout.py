@@ -0,0 +1,62 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from src.core.config import settings
+from src.ml.rag_engine import LegalRAG
+from src.ml.result_cache import ResultCache
+from src.data.schemas import RetrievalParams
+from tests.ml.test_keyword_search import seed, FakeEmbedder
+
+class SlowAsyncQdrant:
+    def __init__(self, chunk_ids, delay):
+        self.chunk_ids, self.delay = chunk_ids, delay
+
+    async def query_points(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(points=[SimpleNamespace(payload={"chunk_id": c}, score=1.0) for c in self.chunk_ids])
+
+class SlowSparseRAG(LegalRAG):
+    sparse_delay = 0.0
+
+    def _isolated_keyword_search(self, query, limit, scope=None):
+        time.sleep(self.sparse_delay)
+        return super()._isolated_keyword_search(query, limit, scope)
+
+def _rag(db, dense_delay, sparse_delay):
+    rag = SlowSparseRAG(db_session=db, qdrant_client=SlowAsyncQdrant(["pc_379"], dense_delay), embedder=FakeEmbedder(),
+                        llm=None, result_cache=ResultCache(max_bytes=1 << 20))
+    rag.sparse_delay = sparse_delay
+    return rag
+
+def test_retrievers_run_concurrently(db):
+    seed(db)
+    rag = _rag(db, dense_delay=0.3, sparse_delay=0.3)
+
+    start = time.monotonic()
+    results = asyncio.run(rag.hybrid_search("হত্যার শাস্তি", RetrievalParams()))
+
+    assert time.monotonic() - start < 0.55 # max(dense, sparse), not the sum
+    assert {r['id'] for r in results} == {"pc_302", "pc_379"}
+    assert len(rag.result_cache) == 2 # Dense results and the fused list
+
+def test_slow_dense_retriever_is_dropped_and_not_cached(db, monkeypatch):
+    seed(db)
+    monkeypatch.setattr(settings, "DENSE_TIMEOUT_SECONDS", 0.1)
+    rag = _rag(db, dense_delay=1.0, sparse_delay=0.0)
+
+    start = time.monotonic()
+    results = asyncio.run(rag.hybrid_search("হত্যার", RetrievalParams()))
+
+    assert time.monotonic() - start < 0.5
+    assert [r['id'] for r in results] == ["pc_302"] # Sparse only
+    assert len(rag.result_cache) == 0
+
+def test_slow_sparse_retriever_is_dropped_and_not_cached(db, monkeypatch):
+    seed(db)
+    monkeypatch.setattr(settings, "SPARSE_TIMEOUT_SECONDS", 0.1)
+    rag = _rag(db, dense_delay=0.0, sparse_delay=1.0)
+
+    results = asyncio.run(rag.hybrid_search("হত্যার", RetrievalParams()))
+
+    assert [r['id'] for r in results] == ["pc_379"] # Dense only
+    assert len(rag.result_cache) == 1 # The dense results alone, not the degraded fused list
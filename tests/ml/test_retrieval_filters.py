@@ -0,0 +1,68 @@
+from datetime import date
+from src.data.models import LegalDocument, LegalChunk
+from src.data.schemas import RetrievalFilters, RetrievalParams
+from src.ml.bm25 import BM25Index
+from src.ml.fusion import resolve_params
+from src.ml.rag_engine import LegalRAG, _matches
+
+def seed(db):
+    penal = LegalDocument(filename="penal_code.txt", title="penal_code", document_date=date(1860, 10, 6))
+    evidence = LegalDocument(filename="evidence_act.txt", title="evidence_act", document_date=date(1872, 3, 15))
+    db.add_all([penal, evidence])
+    db.flush()
+    db.add_all([
+        LegalChunk(chunk_id="pc_302", document_id=penal.id, content="হত্যার শাস্তি মৃত্যুদণ্ড", hierarchy=["দণ্ডবিধি", "অধ্যায় ১৬"], token_count=3),
+        LegalChunk(chunk_id="pc_379", document_id=penal.id, content="চুরির শাস্তি কারাদণ্ড", hierarchy=["দণ্ডবিধি", "অধ্যায় ১৭"], token_count=3),
+        LegalChunk(chunk_id="ev_3", document_id=evidence.id, content="সাক্ষ্য আইনে শাস্তি নয়, প্রমাণ", hierarchy=["সাক্ষ্য আইন"], token_count=5),
+    ])
+    db.flush()
+
+def _ids(results):
+    return sorted(r['id'] for r in results)
+
+def test_filters_are_pushed_into_sql_keyword_search(db):
+    seed(db)
+    rag = LegalRAG(db_session=db, qdrant_client=None, embedder=None, llm=None)
+
+    by_file = rag._resolve_scope(RetrievalFilters(source_files=["penal_code.txt"]))
+    assert _ids(rag._keyword_search("শাস্তি", scope=by_file)) == ["pc_302", "pc_379"]
+
+    by_section = rag._resolve_scope(RetrievalFilters(hierarchy=["দণ্ডবিধি", "অধ্যায় ১৭"]))
+    assert by_section.document_ids is None
+    assert _ids(rag._keyword_search("শাস্তি", scope=by_section)) == ["pc_379"]
+
+    by_date = rag._resolve_scope(RetrievalFilters(date_from=date(1870, 1, 1)))
+    assert by_date.filenames == ("evidence_act.txt",)
+    assert _ids(rag._keyword_search("শাস্তি", scope=by_date)) == ["ev_3"]
+
+    assert rag._resolve_scope(RetrievalFilters(date_to=date(1800, 1, 1))).empty
+    assert rag._resolve_scope(RetrievalFilters()) is None
+
+def test_bm25_search_uses_filtered_candidates(db):
+    seed(db)
+    index = BM25Index.build([("pc_302", "হত্যার শাস্তি"), ("pc_379", "চুরির শাস্তি"), ("ev_3", "শাস্তি নয়")])
+    rag = LegalRAG(db_session=db, qdrant_client=None, embedder=None, llm=None, sparse_index=index)
+
+    scope = rag._resolve_scope(RetrievalFilters(source_files=["evidence_act.txt"]))
+    assert _ids(rag._keyword_search("শাস্তি", scope=scope)) == ["ev_3"]
+
+def test_qdrant_filter_matches_indexed_payload_fields(db):
+    seed(db)
+    rag = LegalRAG(db_session=db, qdrant_client=None, embedder=None, llm=None)
+    scope = rag._resolve_scope(RetrievalFilters(source_files=["penal_code.txt"], hierarchy=["অধ্যায় ১৬"]))
+
+    conditions = {c.key: c.match for c in LegalRAG._qdrant_filter(scope).must}
+    assert conditions["source_file"].any == ["penal_code.txt"]
+    assert conditions["hierarchy"].value == "অধ্যায় ১৬"
+
+def test_expanded_chunks_respect_filters(db):
+    seed(db)
+    chunk = db.query(LegalChunk).filter_by(chunk_id="ev_3").one()
+    assert _matches(chunk, None)
+    assert not _matches(chunk, RetrievalFilters(source_files=["penal_code.txt"]))
+    assert not _matches(chunk, RetrievalFilters(date_to=date(1860, 12, 31)))
+    assert _matches(chunk, RetrievalFilters(hierarchy=["সাক্ষ্য আইন"]))
+
+def test_filters_survive_param_resolution():
+    params = resolve_params(RetrievalParams(top_k=3, filters=RetrievalFilters(source_files=["a.txt"])))
+    assert params.top_k == 3 and params.filters.source_files == ["a.txt"]
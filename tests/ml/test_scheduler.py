@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.ml.scheduler import InferenceScheduler
+from src.core.exceptions import InferenceQueueFullException, InferenceTimeoutException
+
+def _blocked_scheduler(queue_size=4):
+    """Scheduler whose single worker is held busy until the returned event is set."""
+    release, started = threading.Event(), threading.Event()
+    scheduler = InferenceScheduler(["model"], queue_size=queue_size)
+    scheduler.submit(lambda model: (started.set(), release.wait()))
+    started.wait(1)
+    return scheduler, release
+
+def test_lanes_are_served_by_priority():
+    scheduler, release = _blocked_scheduler()
+    order = []
+    futures = [
+        scheduler.submit(lambda m: order.append("batch"), lane="batch"),
+        scheduler.submit(lambda m: order.append("default"), lane="default"),
+        scheduler.submit(lambda m: order.append("interactive"), lane="interactive"),
+    ]
+    assert scheduler.depth() == 3
+    release.set()
+    for f in futures:
+        f.result(1)
+    assert order == ["interactive", "default", "batch"]
+
+def test_full_queue_is_rejected():
+    scheduler, release = _blocked_scheduler(queue_size=1)
+    scheduler.submit(lambda m: None)
+    with pytest.raises(InferenceQueueFullException):
+        scheduler.submit(lambda m: None)
+    release.set()
+
+def test_expired_request_never_reaches_the_model():
+    scheduler, release = _blocked_scheduler()
+    ran = []
+    with pytest.raises(InferenceTimeoutException):
+        scheduler.run(lambda m: ran.append(m), timeout=0.05)
+    release.set()
+    assert scheduler.run(lambda m: m, timeout=1) == "model"
+    assert ran == []
+
+def test_stream_yields_pieces_and_stops_when_closed():
+    scheduler = InferenceScheduler(["model"])
+    assert list(scheduler.stream(lambda m: iter(["ধারা", " ৩০২"]), timeout=1)) == ["ধারা", " ৩০২"]
+    
+    produced = []
+    def generate(model):
+        for i in range(1000):
+            produced.append(i)
+            time.sleep(0.001) # Token generation is slow
+            yield i
+    pieces = scheduler.stream(generate, timeout=1)
+    assert next(pieces) == 0
+    pieces.close()
+    assert scheduler.run(lambda m: len(produced), timeout=1) < 1000
+
+def test_async_run_and_stream_hold_no_thread():
+    scheduler = InferenceScheduler(["model"])
+
+    async def main():
+        answer = await scheduler.arun(lambda m: f"{m} answer", timeout=1)
+        pieces = [p async for p in scheduler.astream(lambda m: iter(["ধারা", " ৩০২"]), timeout=1)]
+        return answer, pieces
+
+    assert asyncio.run(main()) == ("model answer", ["ধারা", " ৩০২"])
+
+def test_async_run_times_out_while_queued():
+    scheduler, release = _blocked_scheduler()
+    ran = []
+    with pytest.raises(InferenceTimeoutException):
+        asyncio.run(scheduler.arun(lambda m: ran.append(m), timeout=0.05))
+    release.set()
+    scheduler.run(lambda m: None, timeout=1)
+    assert ran == []
@@ -0,0 +1,57 @@
+import time
+import numpy as np
+from src.ml.semantic_cache import SemanticCache
+
+def _vec(*values):
+    v = np.zeros(4, dtype=np.float32)
+    v[:len(values)] = values
+    return v
+
+def test_similar_query_hits_within_scope():
+    cache = SemanticCache(dim=4, threshold=0.95)
+    cache.put(_vec(1, 0.1), "হত্যার শাস্তি কী?", "মৃত্যুদণ্ড", ["pc_302"], scope="a")
+    
+    assert cache.get(_vec(1, 0.12), scope="a") == "মৃত্যুদণ্ড"
+    assert cache.get(_vec(1, 0.12), scope="b") is None
+    assert cache.get(_vec(0.1, 1), scope="a") is None
+    assert cache.get(_vec(), scope="a") is None # Placeholder embeddings never match
+
+def test_lru_eviction_and_ttl():
+    cache = SemanticCache(dim=4, capacity=2, threshold=0.99)
+    cache.put(_vec(1), "q1", "a1", [])
+    cache.put(_vec(0, 1), "q2", "a2", [])
+    cache.get(_vec(1)) # q1 is now most recently used
+    cache.put(_vec(0, 0, 1), "q3", "a3", [])
+    assert cache.get(_vec(0, 1)) is None
+    assert cache.get(_vec(1)) == "a1"
+    
+    expiring = SemanticCache(dim=4, ttl=0.01)
+    expiring.put(_vec(1), "q", "a", [])
+    time.sleep(0.02)
+    assert expiring.get(_vec(1)) is None and len(expiring) == 0
+
+def test_invalidation_by_cited_chunk():
+    cache = SemanticCache(dim=4, threshold=0.99)
+    cache.put(_vec(1), "q1", "a1", ["pc_302", "pc_304"])
+    cache.put(_vec(0, 1), "q2", "a2", ["pc_379"])
+    
+    assert cache.invalidate_chunks(["pc_304", "unrelated"]) == 1
+    assert cache.get(_vec(1)) is None
+    assert cache.get(_vec(0, 1)) == "a2"
+
+def test_corpus_version_from_another_process_drops_every_answer():
+    ingesting, other = SemanticCache(dim=4, threshold=0.99), SemanticCache(dim=4, threshold=0.99)
+    for cache in (ingesting, other):
+        cache.put(_vec(1), "q1", "a1", ["pc_302"])
+        cache.put(_vec(0, 1), "q2", "a2", ["pc_379"])
+
+    # The ingesting process knows pc_302 changed and keeps the rest under the new version
+    assert ingesting.invalidate_chunks(["pc_302"], version=1) == 1
+    ingesting.set_version(1)
+    assert ingesting.get(_vec(0, 1)) == "a2"
+
+    # Any other process only sees the version move
+    other.set_version(1)
+    assert len(other) == 0
+    other.put(_vec(1), "q1", "stale", ["pc_302"], version=0) # Retrieved before the change
+    assert other.get(_vec(1)) is None
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+import pytest
+from qdrant_client.http import models
+
+from src.core.config import settings
+from src.ml.vector_store import PAYLOAD_INDEXES, ensure_collection, quantization_config, search_params
+
+class FakeClient:
+    def __init__(self, info=None, legacy_points=0):
+        self.info = info
+        self.legacy_points = legacy_points
+        self.calls = []
+
+    def count(self, **kwargs):
+        return SimpleNamespace(count=self.legacy_points)
+
+    def delete_payload(self, **kwargs):
+        self.calls.append(("delete_payload", kwargs["keys"]))
+
+    def collection_exists(self, name):
+        return self.info is not None
+
+    def get_collection(self, name):
+        return self.info
+
+    def create_collection(self, **kwargs):
+        self.calls.append(("create", kwargs))
+
+    def update_collection(self, **kwargs):
+        self.calls.append(("update", kwargs))
+
+    def create_payload_index(self, **kwargs):
+        self.calls.append(("index", kwargs["field_name"]))
+
+def _info(m=16, ef_construct=100, on_disk=None, quantization=None, indexed=(), size=384):
+    vectors = models.VectorParams(size=size, distance=models.Distance.COSINE, on_disk=on_disk)
+    return SimpleNamespace(
+        config=SimpleNamespace(
+            params=SimpleNamespace(vectors=vectors),
+            hnsw_config=SimpleNamespace(m=m, ef_construct=ef_construct),
+            quantization_config=quantization,
+        ),
+        payload_schema={field: None for field in indexed},
+    )
+
+def test_creates_tuned_collection_with_indexes():
+    client = FakeClient()
+    report = ensure_collection(client, "c")
+
+    assert report["created"]
+    (_, kwargs), *indexes = client.calls
+    assert kwargs["hnsw_config"].m == settings.QDRANT_HNSW_M
+    assert kwargs["vectors_config"].on_disk == settings.QDRANT_ON_DISK
+    assert kwargs["quantization_config"] == quantization_config()
+    assert [field for _, field in indexes] == list(PAYLOAD_INDEXES)
+
+def test_migrates_default_collection_in_place():
+    client = FakeClient(_info(indexed=["chunk_id"]))
+    assert ensure_collection(client, "c", dry_run=True)["changes"] and client.calls == []
+
+    report = ensure_collection(client, "c")
+    (kind, kwargs), *indexes = client.calls
+    assert kind == "update" and not report["created"]
+    assert set(kwargs) == {"collection_name", "hnsw_config", "vectors_config", "quantization_config"}
+    assert [field for _, field in indexes] == ["source_file", "hierarchy"]
+
+def test_matching_collection_is_left_alone():
+    info = _info(m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+                 on_disk=settings.QDRANT_ON_DISK, quantization=quantization_config(), indexed=PAYLOAD_INDEXES)
+    client = FakeClient(info)
+    report = ensure_collection(client, "c")
+    assert report["changes"] == [] and report["indexes"] == [] and client.calls == []
+
+def test_legacy_payload_text_is_dropped():
+    info = _info(m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+                 on_disk=settings.QDRANT_ON_DISK, quantization=quantization_config(), indexed=PAYLOAD_INDEXES)
+    client = FakeClient(info, legacy_points=120)
+    assert ensure_collection(client, "c", dry_run=True)["legacy_points"] == 120 and client.calls == []
+
+    ensure_collection(client, "c")
+    assert client.calls == [("delete_payload", ["text", "token_count"])]
+
+def test_dimension_mismatch_is_not_migrated():
+    with pytest.raises(ValueError):
+        ensure_collection(FakeClient(_info(size=768)), "c")
+
+def test_search_params_rescore_quantized_candidates():
+    params = search_params()
+    assert params.hnsw_ef == settings.QDRANT_HNSW_EF
+    assert params.quantization.rescore and params.quantization.oversampling == settings.QDRANT_OVERSAMPLING
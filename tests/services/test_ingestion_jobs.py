@@ -0,0 +1,88 @@
+import os
+import socket
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from src.data.models import IngestionJob
+from src.data.crud.ingestion_job import create_ingestion_job, claim_ingestion_job, get_resumable_job_ids
+from src.services import ingestion_service
+from src.services.ingestion_service import IngestionService, INSTANCE_ID, owner_is_alive
+
+def _age(db, job_id, seconds):
+    db.execute(update(IngestionJob).where(IngestionJob.id == job_id).values(
+        updated_at=datetime.now(timezone.utc) - timedelta(seconds=seconds)
+    ))
+    db.commit()
+
+def test_claim_is_exclusive_until_the_heartbeat_stops(db):
+    job = create_ingestion_job(db, filename="a.jsonl", file_path="a.jsonl", total_bytes=100)
+
+    claimed = claim_ingestion_job(db, job.id, owner="host:1:aaaa", stale_after_seconds=60)
+    assert claimed.status == "running" and claimed.owner == "host:1:aaaa"
+    assert claim_ingestion_job(db, job.id, owner="host:2:bbbb", stale_after_seconds=60) is None
+    assert job.id not in get_resumable_job_ids(db, stale_after_seconds=60)
+
+    _age(db, job.id, 120)
+    assert claim_ingestion_job(db, job.id, owner="host:2:bbbb", stale_after_seconds=60).owner == "host:2:bbbb"
+
+def test_job_of_a_dead_owner_is_claimable_at_once(db):
+    job = create_ingestion_job(db, filename="b.jsonl", file_path="b.jsonl", total_bytes=100)
+    claim_ingestion_job(db, job.id, owner="host:1:aaaa", stale_after_seconds=60)
+
+    assert job.id in get_resumable_job_ids(db, stale_after_seconds=60, dead_owners=["host:1:aaaa"])
+    assert claim_ingestion_job(db, job.id, owner="host:2:bbbb", stale_after_seconds=60, dead_owners=["host:1:aaaa"]) is not None
+
+def test_owner_liveness():
+    host = socket.gethostname()
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+
+    assert owner_is_alive(INSTANCE_ID)
+    assert not owner_is_alive(f"{host}:{os.getpid()}:previous") # Same pid after a restart
+    assert not owner_is_alive(f"{host}:{exited.pid}:aaaa")
+    assert owner_is_alive(f"other-{host}:{exited.pid}:aaaa") # Left to the heartbeat
+    assert not owner_is_alive("garbage")
+
+def test_run_job_resumes_from_the_checkpoint(db, tmp_path, monkeypatch):
+    upload = tmp_path / "c.jsonl"
+    upload.write_bytes(b"x" * 100)
+    job = create_ingestion_job(db, filename="c.jsonl", file_path=str(upload), total_bytes=100)
+    db.execute(update(IngestionJob).where(IngestionJob.id == job.id).values(
+        status="failed", byte_offset=40, last_batch=1, rows_processed=5, rows_failed=1
+    ))
+    db.commit()
+
+    calls = []
+    def fake_process_and_ingest(db, file_path, start_offset=0, on_checkpoint=None):
+        calls.append(start_offset)
+        on_checkpoint(100, 0, 3, 1)
+
+    monkeypatch.setattr(ingestion_service, "SessionLocal", lambda: Session(bind=db.connection()))
+    monkeypatch.setattr(IngestionService, "process_and_ingest", staticmethod(fake_process_and_ingest))
+    IngestionService.run_job(job.id)
+
+    db.expire_all()
+    job = db.get(IngestionJob, job.id)
+    assert calls == [40]
+    assert (job.status, job.byte_offset, job.last_batch, job.rows_processed, job.rows_failed) == ("completed", 100, 2, 8, 2)
+    assert job.run_start_offset == 40 and job.run_start_rows == 5
+    assert not upload.exists()
+
+def test_job_progress():
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    job = SimpleNamespace(
+        status="completed", started_at=started, updated_at=started + timedelta(seconds=10),
+        finished_at=started + timedelta(seconds=10), total_bytes=1000, byte_offset=1000,
+        run_start_offset=500, rows_processed=80, run_start_rows=30,
+    )
+    assert IngestionService.job_progress(job) == {"progress": 1.0, "rows_per_sec": 5.0, "eta_seconds": 0.0}
+
+    job.status, job.finished_at, job.byte_offset = "running", None, 750
+    job.started_at = datetime.now(timezone.utc) - timedelta(seconds=10)
+    progress = IngestionService.job_progress(job)
+    assert progress["progress"] == 0.75
+    assert progress["eta_seconds"] == pytest.approx(10, rel=0.1) # 250 bytes left at ~25 B/s
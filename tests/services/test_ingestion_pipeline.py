@@ -0,0 +1,188 @@
+import json
+import numpy as np
+import pytest
+from src.services.ingestion_pipeline import IngestionPipeline, iter_lines, point_id, content_hash
+
+class FakeEmbedder:
+    def encode_batch(self, texts, batch_size=32):
+        return np.zeros((len(texts), 384), dtype=np.float32)
+
+class FakeQdrant:
+    def __init__(self):
+        self.points = []
+
+    def upsert(self, collection_name, points):
+        self.points.extend(points)
+
+class InMemoryPipeline(IngestionPipeline):
+    """Skips the SQL stages so the queue plumbing can be tested on its own."""
+    def _preload(self):
+        self._doc_ids = {"act.txt": 1}
+
+    def _write_sql(self, batch):
+        self._ack("sql_writer", [batch.seq])
+
+    def _prune(self):
+        pass
+
+def make_lines(n):
+    return [
+        json.dumps({
+            "chunk_id": f"c{i}",
+            "text": "ধারা",
+            "token_count": 1,
+            "metadata": {"source_file": "act.txt", "hierarchy": ["Part I"]},
+        })
+        for i in range(n)
+    ]
+
+def test_pipeline_streams_all_records():
+    qdrant = FakeQdrant()
+    pipeline = InMemoryPipeline(None, FakeEmbedder(), qdrant, "test", batch_size=16, queue_size=2)
+    
+    assert pipeline.run(make_lines(100)) == 100
+    assert len(qdrant.points) == 100
+    assert set(qdrant.points[0].payload) == {"chunk_id", "hierarchy", "source_file"} # Text stays in SQL
+    assert pipeline.stats["embed"].batches == 7
+
+def test_pipeline_embeds_each_batch_in_one_call_and_keeps_order():
+    class RecordingEmbedder:
+        def __init__(self):
+            self.calls = []
+
+        def encode_batch(self, texts, batch_size=32):
+            self.calls.append(len(texts))
+            return np.array([[float(t)] + [0.0] * 383 for t in texts], dtype=np.float32)
+
+    lines = [
+        json.dumps({"chunk_id": f"c{i}", "text": str(i), "metadata": {"source_file": "act.txt"}})
+        for i in range(40)
+    ]
+    embedder, qdrant = RecordingEmbedder(), FakeQdrant()
+    pipeline = InMemoryPipeline(None, embedder, qdrant, "test", batch_size=16)
+    pipeline.run(lines)
+
+    assert embedder.calls == [16, 16, 8]
+    assert {p.id: p.vector[0] for p in qdrant.points} == {point_id(f"c{i}"): float(i) for i in range(40)}
+
+def test_pipeline_stage_failure_is_raised():
+    class FailingPipeline(InMemoryPipeline):
+        def _embed(self, batch):
+            raise RuntimeError("embedding failed")
+
+    pipeline = FailingPipeline(None, FakeEmbedder(), FakeQdrant(), "test", batch_size=16, queue_size=1)
+    with pytest.raises(RuntimeError):
+        pipeline.run(make_lines(200))
+
+def test_pipeline_checkpoints_byte_offsets_and_skips_malformed_lines():
+    lines = [line.encode("utf-8") + b"\n" for line in make_lines(40)]
+    lines.insert(10, b"{not json\n")
+    checkpoints = []
+    pipeline = InMemoryPipeline(None, FakeEmbedder(), FakeQdrant(), "test", batch_size=16, on_checkpoint=lambda *ckpt: checkpoints.append(ckpt))
+    
+    assert pipeline.run(lines, start_offset=100) == 40
+    byte_offset, last_batch, rows, failed = checkpoints[-1]
+    assert byte_offset == 100 + sum(len(line) for line in lines)
+    assert (last_batch, rows, failed) == (2, 40, 1)
+
+def test_rows_with_wrong_types_are_skipped():
+    bad = [
+        {"chunk_id": "b0", "text": "ধারা", "metadata": ["act.txt"]},
+        {"chunk_id": "b1", "text": "ধারা", "metadata": "act.txt"},
+        {"chunk_id": "b2", "text": "ধারা", "metadata": {"source_file": "act.txt", "hierarchy": "Part I"}},
+        {"chunk_id": "b3", "text": "ধারা", "token_count": "12", "metadata": {"source_file": "act.txt"}},
+        {"chunk_id": "b4", "text": None, "metadata": {"source_file": "act.txt"}},
+    ]
+    qdrant = FakeQdrant()
+    pipeline = InMemoryPipeline(None, FakeEmbedder(), qdrant, "test", batch_size=16)
+
+    assert pipeline.run(make_lines(3) + [json.dumps(row) for row in bad]) == 3
+    assert pipeline.failed_rows == len(bad)
+    assert len(qdrant.points) == 3
+
+def test_malformed_rows_disable_pruning():
+    class PruneRecordingPipeline(InMemoryPipeline):
+        pruned = False
+        def _prune(self):
+            self.pruned = True
+
+    clean = PruneRecordingPipeline(None, FakeEmbedder(), FakeQdrant(), "test", batch_size=16, prune_removed=True)
+    clean.run(make_lines(3))
+    dirty = PruneRecordingPipeline(None, FakeEmbedder(), FakeQdrant(), "test", batch_size=16, prune_removed=True)
+    dirty.run(make_lines(3) + ["{not json"])
+
+    assert clean.pruned and not dirty.pruned
+
+def test_repeated_chunk_ids_are_written_once_per_flush(monkeypatch):
+    from contextlib import nullcontext
+    from src.services import ingestion_pipeline
+    written = []
+    monkeypatch.setattr(ingestion_pipeline, "bulk_upsert_chunks", lambda db, chunks, batch_size: written.append(chunks))
+
+    pipeline = IngestionPipeline(lambda: nullcontext(), FakeEmbedder(), FakeQdrant(), "test", batch_size=16)
+    pipeline._pending_chunks = [
+        {"chunk_id": "c0", "content": "old"}, {"chunk_id": "c1", "content": "b"}, {"chunk_id": "c0", "content": "new"},
+    ]
+    pipeline._flush_sql()
+
+    assert written == [[{"chunk_id": "c0", "content": "new"}, {"chunk_id": "c1", "content": "b"}]]
+
+def test_rerun_after_a_failed_qdrant_write_upserts_every_chunk(db_engine):
+    import time
+    from tests.conftest import TestingSessionLocal
+
+    class FailingQdrant(FakeQdrant):
+        def upsert(self, collection_name, points):
+            time.sleep(0.2) # Give the SQL writer every chance to commit first
+            raise ConnectionError("qdrant unavailable")
+
+    lines = [
+        json.dumps({"chunk_id": f"rerun-c{i}", "text": "ধারা", "metadata": {"source_file": "rerun.txt"}})
+        for i in range(50)
+    ]
+    failed = IngestionPipeline(TestingSessionLocal, FakeEmbedder(), FailingQdrant(), "test", batch_size=10, prune_removed=False)
+    failed.sql_batch_size = 10 # Flush every batch
+    with pytest.raises(ConnectionError):
+        failed.run(lines)
+
+    qdrant = FakeQdrant()
+    rerun = IngestionPipeline(TestingSessionLocal, FakeEmbedder(), qdrant, "test", batch_size=10, prune_removed=False)
+    rerun.run(lines)
+
+    assert rerun.changes["unchanged"] == 0
+    assert {p.id for p in qdrant.points} == {point_id(f"rerun-c{i}") for i in range(50)}
+
+def test_point_ids_are_deterministic():
+    assert point_id("act.txt_0001") == point_id("act.txt_0001")
+    assert point_id("act.txt_0001") != point_id("act.txt_0002")
+
+def test_unchanged_chunks_are_not_reembedded():
+    class PreloadedPipeline(InMemoryPipeline):
+        def _preload(self):
+            self._doc_ids = {"act.txt": 1}
+            self._chunk_hashes = {"c0": content_hash("ধারা"), "c1": content_hash("old text"), "c2": None}
+
+    qdrant = FakeQdrant()
+    qdrant.delete = lambda collection_name, points_selector: None
+    pipeline = PreloadedPipeline(None, FakeEmbedder(), qdrant, "test", batch_size=16)
+    pipeline.run(make_lines(5))
+
+    assert pipeline.changes == {"new": 2, "changed": 2, "unchanged": 1, "removed": 0}
+    assert {p.id for p in qdrant.points} == {point_id(f"c{i}") for i in range(1, 5)}
+
+def test_iter_lines_reassembles_lines_across_chunks():
+    body = "".join(line + "\n" for line in make_lines(3)).encode("utf-8")
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+
+    lines = list(iter_lines(chunks))
+    assert b"".join(lines) == body
+    assert len(lines) == 3
+
+def test_pipeline_fails_on_truncated_stream():
+    def aborted_stream():
+        yield make_lines(1)[0].encode("utf-8") + b"\n"
+        raise ConnectionError("client disconnected")
+
+    pipeline = InMemoryPipeline(None, FakeEmbedder(), FakeQdrant(), "test", batch_size=16)
+    with pytest.raises(ConnectionError):
+        pipeline.run(iter_lines(aborted_stream()))
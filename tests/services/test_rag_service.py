@@ -0,0 +1,24 @@
+from src.data.crud.legal import get_corpus_version, bump_corpus_version
+from src.ml.loader import ml_models
+from src.ml.result_cache import ResultCache
+from src.ml.semantic_cache import SemanticCache
+from src.services.rag_service import _sync_corpus_version
+
+def test_ingestion_elsewhere_drops_this_workers_cached_results(db, monkeypatch):
+    cache = ResultCache(max_bytes=1 << 20)
+    answers = SemanticCache(dim=4)
+    monkeypatch.setitem(ml_models, "result_cache", cache)
+    monkeypatch.setitem(ml_models, "answer_cache", answers)
+    assert get_corpus_version(db) == 0
+
+    _sync_corpus_version(db)
+    cache.put("q", [{'id': "c0"}])
+    answers.put([1.0, 0.0, 0.0, 0.0], "q", "a", ["c0"])
+    _sync_corpus_version(db) # Nothing ingested: entries stay
+    assert cache.get("q") is not None
+
+    assert bump_corpus_version(db) == 1 # What _after_ingest does in the ingesting process
+    assert bump_corpus_version(db) == 2
+    _sync_corpus_version(db)
+    assert cache.version == 2 and cache.get("q") is None
+    assert answers.version == 2 and len(answers) == 0